@@ -0,0 +1,175 @@
+"""序列化基准测试
+
+比较 contract_auditor.utils.serialization 的二进制格式与 pickle、JSON 在以下数据上的
+编码/解码耗时和大小，并校验二进制格式的往返结果与原对象一致：
+- ast: 解析得到的 AST 列表
+- results: 检测问题、污点路径、控制流图和数据流结果
+
+数据集为 examples 目录下的合约，以及按 --functions 等参数生成的合成合约。
+JSON 的 AST 用 dataclasses.asdict 编码，解码只计 json.loads（不重建对象），
+因此 JSON 的解码耗时偏低。
+
+用法:
+    python -m benchmarks.bench_serialization
+    python -m benchmarks.bench_serialization --files 20 --functions 80 --repeat 5 -o serialization.json
+
+Author: tr3
+"""
+
+import dataclasses
+import json
+import pickle
+import platform
+import sys
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, List, Tuple
+
+import click
+
+from contract_auditor import __version__
+from contract_auditor.parser.solidity_parser import SolidityParser
+from contract_auditor.detectors.reentrancy_detector import ReentrancyDetector
+from contract_auditor.detectors.access_control_detector import AccessControlDetector
+from contract_auditor.detectors.external_call_detector import ExternalCallDetector
+from contract_auditor.detectors.unchecked_return_detector import UncheckedReturnDetector
+from contract_auditor.detectors.delegatecall_detector import DelegatecallDetector
+from contract_auditor.analyzer.taint_analysis import TaintAnalyzer
+from contract_auditor.analyzer.control_flow import ControlFlowAnalyzer
+from contract_auditor.analyzer.data_flow import DataFlowAnalyzer
+from contract_auditor.utils.file_utils import find_solidity_files
+from contract_auditor.utils import serialization
+
+from .generator import GeneratorConfig, SolidityGenerator
+from .run_benchmarks import _time
+
+
+EXAMPLES_DIR = Path(__file__).parent.parent / 'examples'
+
+
+def _results(asts) -> Dict:
+    """一组 AST 上的检测和分析结果"""
+    detectors = [ReentrancyDetector(), AccessControlDetector(), ExternalCallDetector(),
+                 UncheckedReturnDetector(), DelegatecallDetector()]
+    taint, control_flow, data_flow = TaintAnalyzer(), ControlFlowAnalyzer(), DataFlowAnalyzer()
+    return {
+        'issues': [issue for ast in asts for detector in detectors for issue in detector.detect(ast)],
+        'taint_paths': [path for ast in asts for path in taint.analyze(ast)],
+        'control_flow': {k: v for ast in asts for k, v in control_flow.analyze(ast).items()},
+        'data_flow': {k: v for ast in asts for k, v in data_flow.analyze(ast).items()},
+    }
+
+
+def _json_default(value):
+    """JSON 编码无法直接处理的对象"""
+    if dataclasses.is_dataclass(value):
+        return dataclasses.asdict(value)
+    if hasattr(value, 'to_dict'):
+        return value.to_dict()
+    return vars(value)
+
+
+def _same_results(a: Dict, b: Dict) -> bool:
+    taint = TaintAnalyzer()
+    return ([(i.to_dict(), i.related_lines) for i in a['issues']]
+            == [(i.to_dict(), i.related_lines) for i in b['issues']]
+            and taint.to_dict(a['taint_paths']) == taint.to_dict(b['taint_paths'])
+            and {k: vars(v) for k, v in a['control_flow'].items()}
+            == {k: vars(v) for k, v in b['control_flow'].items()}
+            and a['data_flow'] == b['data_flow'])
+
+
+def run_payload(value, repeat: int, same: Callable[[object, object], bool]) -> Dict:
+    """对一份数据测量各格式的编码/解码耗时和大小"""
+    codecs: List[Tuple[str, Callable, Callable]] = [
+        ('binary', serialization.dumps, serialization.loads),
+        ('pickle', lambda v: pickle.dumps(v, protocol=pickle.HIGHEST_PROTOCOL), pickle.loads),
+        ('json', lambda v: json.dumps(v, default=_json_default, ensure_ascii=False).encode('utf-8'),
+         json.loads),
+    ]
+    formats = {}
+    for name, encode, decode in codecs:
+        encode_stats, data = _time(lambda: encode(value), repeat)
+        decode_stats, decoded = _time(lambda: decode(data), repeat)
+        formats[name] = {'bytes': len(data), 'encode': encode_stats, 'decode': decode_stats}
+        if name == 'binary':
+            formats[name]['roundtrip'] = same(value, decoded)
+    return formats
+
+
+def run_dataset(files: List[Tuple[str, str]], repeat: int) -> Dict:
+    """对一组文件的 AST 和结果分别测量"""
+    parser = SolidityParser()
+    asts = [parser.parse(source, path) for path, source in files]
+    results = _results(asts)
+    return {
+        'counts': {
+            'files': len(files),
+            'source_bytes': sum(len(source.encode('utf-8')) for _, source in files),
+            'functions': sum(len(c.functions) for ast in asts for c in ast.contracts),
+            'issues': len(results['issues']),
+        },
+        'payloads': {
+            'ast': run_payload(asts, repeat, lambda a, b: a == b),
+            'results': run_payload(results, repeat, _same_results),
+        }
+    }
+
+
+def _summary(name: str, case: Dict) -> List[str]:
+    lines = [f"{name}: {case['counts']['files']} 个文件, {case['counts']['source_bytes']} 字节源码"]
+    for payload, formats in case['payloads'].items():
+        for fmt, stats in formats.items():
+            roundtrip = '' if 'roundtrip' not in stats else (' 往返一致' if stats['roundtrip'] else ' 往返不一致!')
+            lines.append(f"  {payload:<8}{fmt:<8}{stats['bytes']:>12} 字节  "
+                         f"编码 {stats['encode']['median'] * 1000:>8.1f} ms  "
+                         f"解码 {stats['decode']['median'] * 1000:>8.1f} ms{roundtrip}")
+    return lines
+
+
+@click.command(
+    help='序列化基准测试：比较二进制格式与 pickle、JSON 的耗时和大小。',
+    context_settings={'help_option_names': ['-h', '--help']}
+)
+@click.option('--files', 'file_count', type=int, default=10, help='合成数据集的文件数（默认：10）')
+@click.option('--functions', type=int, default=40, help='合成合约每个合约的函数数（默认：40）')
+@click.option('--repeat', type=int, default=3, help='每项重复次数（默认：3）')
+@click.option('--seed', type=int, default=42, help='随机种子（默认：42）')
+@click.option('--output', '-o', type=click.Path(), default='serialization_results.json',
+              help='结果输出文件（默认：serialization_results.json）')
+def main(file_count, functions, repeat, seed, output):
+    config = GeneratorConfig(functions=functions, seed=seed)
+    datasets = {
+        'examples': find_solidity_files(str(EXAMPLES_DIR)),
+        'synthetic': SolidityGenerator(config).generate_files(file_count),
+    }
+
+    results = {}
+    failed = False
+    for name, files in datasets.items():
+        results[name] = run_dataset(files, repeat)
+        for line in _summary(name, results[name]):
+            print(line)
+        failed |= not all(p['binary']['roundtrip'] for p in results[name]['payloads'].values())
+
+    report = {
+        'meta': {
+            'timestamp': datetime.now().isoformat(timespec='seconds'),
+            'version': __version__,
+            'format_version': serialization.FORMAT_VERSION,
+            'python': sys.version.split()[0],
+            'platform': platform.platform(),
+            'repeat': repeat,
+            'synthetic_config': config.to_dict(),
+        },
+        'results': results,
+    }
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    print(f"结果已保存到: {output}")
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
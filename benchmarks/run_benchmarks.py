@@ -0,0 +1,205 @@
+"""性能基准测试
+
+使用合成合约分别测量各阶段耗时：
+- parse: SolidityParser.parse
+- detector.<名称>: 每个检测器
+- analyzer.<名称>: contract_auditor/analyzer 中的每个分析器
+- reporter.json / reporter.html: 两种报告生成器
+
+每个维度（合约数、函数数、函数体大小、调用密度、嵌套深度）可以单独扫描，
+从而观察各阶段随规模增长的曲线。结果写入 JSON 文件，便于追踪性能回退。
+
+用法:
+    python -m benchmarks.run_benchmarks
+    python -m benchmarks.run_benchmarks --sweep functions=10,50,200 --repeat 5 -o bench.json
+
+Author: tr3
+"""
+
+import json
+import platform
+import statistics
+import sys
+import tempfile
+import time
+from dataclasses import replace
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, List, Tuple
+
+import click
+
+from contract_auditor import __version__
+from contract_auditor.parser.solidity_parser import SolidityParser
+from contract_auditor.detectors.reentrancy_detector import ReentrancyDetector
+from contract_auditor.detectors.access_control_detector import AccessControlDetector
+from contract_auditor.detectors.external_call_detector import ExternalCallDetector
+from contract_auditor.detectors.unchecked_return_detector import UncheckedReturnDetector
+from contract_auditor.detectors.delegatecall_detector import DelegatecallDetector
+from contract_auditor.analyzer.call_graph import CallGraphAnalyzer
+from contract_auditor.analyzer.taint_analysis import TaintAnalyzer
+from contract_auditor.analyzer.control_flow import ControlFlowAnalyzer
+from contract_auditor.analyzer.data_flow import DataFlowAnalyzer
+from contract_auditor.reporter.json_reporter import JSONReporter
+from contract_auditor.reporter.html_reporter import HTMLReporter
+
+from .generator import GeneratorConfig, SolidityGenerator
+
+
+# 默认扫描的维度和取值
+DEFAULT_SWEEPS = {
+    'contracts': [1, 4, 16],
+    'functions': [5, 20, 80],
+    'body_size': [4, 16, 64],
+    'call_density': [0.0, 0.3, 0.9],
+    'nesting': [0, 2, 4],
+}
+
+
+def _time(func: Callable, repeat: int) -> Tuple[Dict, object]:
+    """执行 repeat 次并返回耗时统计（秒）和最后一次的返回值"""
+    samples = []
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        samples.append(time.perf_counter() - start)
+    return {
+        'min': min(samples),
+        'median': statistics.median(samples),
+        'mean': statistics.fmean(samples),
+        'repeat': repeat,
+    }, result
+
+
+def run_case(files: List[Tuple[str, str]], repeat: int, output_dir: Path) -> Dict:
+    """
+    对一组文件测量所有阶段
+
+    Args:
+        files: (file_path, content) 列表
+        repeat: 每个阶段重复次数
+        output_dir: 报告生成器的临时输出目录
+
+    Returns:
+        {'stages': {阶段名: 耗时统计}, 'counts': {...}}
+    """
+    stages = {}
+    parser = SolidityParser()
+
+    stages['parse'], asts = _time(lambda: [parser.parse(src, path) for path, src in files], repeat)
+
+    issues = []
+    for detector in [ReentrancyDetector(), AccessControlDetector(), ExternalCallDetector(),
+                     UncheckedReturnDetector(), DelegatecallDetector()]:
+        stats, found = _time(lambda: [i for ast in asts for i in detector.detect(ast)], repeat)
+        stages[f'detector.{detector.name}'] = stats
+        issues.extend(found)
+
+    def call_graph():
+        analyzer = CallGraphAnalyzer()
+        for i, ast in enumerate(asts):
+            analyzer.analyze(ast, clear=(i == 0))
+        return analyzer.to_dict()
+
+    stages['analyzer.CallGraphAnalyzer'], call_graph_data = _time(call_graph, repeat)
+
+    taint = TaintAnalyzer()
+    stages['analyzer.TaintAnalyzer'], taint_paths = _time(
+        lambda: [p for ast in asts for p in taint.analyze(ast)], repeat)
+
+    control_flow = ControlFlowAnalyzer()
+    stages['analyzer.ControlFlowAnalyzer'], cfgs = _time(
+        lambda: {k: v for ast in asts for k, v in control_flow.analyze(ast).items()}, repeat)
+
+    data_flow = DataFlowAnalyzer()
+    stages['analyzer.DataFlowAnalyzer'], data_flows = _time(
+        lambda: {k: v for ast in asts for k, v in data_flow.analyze(ast).items()}, repeat)
+
+    json_reporter = JSONReporter()
+    stages['reporter.json'], _ = _time(
+        lambda: json_reporter.generate(issues, call_graph_data, taint_paths, cfgs, data_flows,
+                                       str(output_dir / 'report.json')), repeat)
+
+    html_reporter = HTMLReporter()
+    stages['reporter.html'], _ = _time(
+        lambda: html_reporter.generate(issues, call_graph_data, taint_paths, cfgs, data_flows,
+                                       str(output_dir / 'report.html')), repeat)
+
+    return {
+        'stages': stages,
+        'counts': {
+            'files': len(files),
+            'bytes': sum(len(src.encode('utf-8')) for _, src in files),
+            'lines': sum(src.count('\n') + 1 for _, src in files),
+            'contracts': sum(len(ast.contracts) for ast in asts),
+            'functions': sum(len(c.functions) for ast in asts for c in ast.contracts),
+            'issues': len(issues),
+            'taint_paths': len(taint_paths),
+            'call_graph_nodes': len(call_graph_data.get('nodes', [])),
+        }
+    }
+
+
+def _parse_sweep(value: str) -> Tuple[str, List]:
+    """解析 --sweep 参数，如 functions=10,50,200"""
+    name, _, raw = value.partition('=')
+    if name not in DEFAULT_SWEEPS:
+        raise click.BadParameter(f"未知维度: {name}（可选: {', '.join(DEFAULT_SWEEPS)}）")
+    cast = float if name == 'call_density' else int
+    try:
+        return name, [cast(v) for v in raw.split(',') if v]
+    except ValueError:
+        raise click.BadParameter(f"无效取值: {value}")
+
+
+@click.command(
+    help='性能基准测试：按规模生成合成合约并测量各阶段耗时。',
+    context_settings={'help_option_names': ['-h', '--help']}
+)
+@click.option('--sweep', 'sweeps', multiple=True,
+              help='扫描的维度和取值，如 functions=10,50,200（可重复；默认扫描所有维度）')
+@click.option('--files', 'file_count', type=int, default=1, help='每个用例生成的文件数（默认：1）')
+@click.option('--repeat', type=int, default=3, help='每个阶段重复次数（默认：3）')
+@click.option('--seed', type=int, default=42, help='随机种子（默认：42）')
+@click.option('--output', '-o', type=click.Path(), default='bench_results.json',
+              help='结果输出文件（默认：bench_results.json）')
+def main(sweeps, file_count, repeat, seed, output):
+    sweep_plan = dict(_parse_sweep(s) for s in sweeps) if sweeps else DEFAULT_SWEEPS
+    base = GeneratorConfig(seed=seed)
+
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for dimension, values in sweep_plan.items():
+            for value in values:
+                config = replace(base, **{dimension: value})
+                files = SolidityGenerator(config).generate_files(file_count)
+                case = run_case(files, repeat, Path(tmp))
+                case['dimension'] = dimension
+                case['config'] = config.to_dict()
+                results.append(case)
+
+                slowest = max(case['stages'].items(), key=lambda kv: kv[1]['median'])
+                total = sum(s['median'] for s in case['stages'].values())
+                print(f"{dimension}={value}: {case['counts']['lines']} 行, "
+                      f"总计 {total * 1000:.1f} ms, 最慢 {slowest[0]} {slowest[1]['median'] * 1000:.1f} ms")
+
+    report = {
+        'meta': {
+            'timestamp': datetime.now().isoformat(timespec='seconds'),
+            'version': __version__,
+            'python': sys.version.split()[0],
+            'platform': platform.platform(),
+            'repeat': repeat,
+            'files_per_case': file_count,
+            'base_config': base.to_dict(),
+        },
+        'results': results,
+    }
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    print(f"结果已保存到: {output}")
+
+
+if __name__ == '__main__':
+    main()
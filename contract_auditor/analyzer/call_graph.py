@@ -3,6 +3,14 @@
 from typing import Dict, List, Set, Tuple
 import networkx as nx
 from ..parser.ast_builder import AST, FunctionNode, ContractNode, CallNode
+from ..parser.ir import function_ir
+from ..utils.budget import check_budget
+from .inheritance import InheritanceResolver
+
+# 调用图贡献中的操作类型
+_NODE = 0  # (_NODE, 节点, 属性)：加入或更新节点
+_IMPORTED = 1  # (_IMPORTED, 函数节点, 合约名, 属性)：图中没有该函数节点时加入合约节点和函数节点
+_EDGE = 2  # (_EDGE, 起点, 终点, 调用类型)
 
 
 class CallGraphAnalyzer:
@@ -11,65 +19,104 @@ class CallGraphAnalyzer:
     def __init__(self):
         self.graph = nx.DiGraph()  # 有向图
     
-    def analyze(self, ast: AST, clear: bool = True) -> nx.DiGraph:
+    def analyze(self, ast: AST, clear: bool = True, dependencies: List[AST] = None,
+                inheritance: InheritanceResolver = None) -> nx.DiGraph:
         """
         构建调用图
         
         Args:
             ast: AST对象
             clear: 是否清空之前的图（默认True，用于单文件；False用于合并多文件）
+            dependencies: 该文件（直接或间接）导入的文件的AST，跨文件调用只在这些文件中解析
+            inheritance: 继承解析器；提供时调用先在合约及其基合约中解析（派生合约的定义优先）
             
         Returns:
             调用图（NetworkX DiGraph）
         """
         if clear:
             self.graph.clear()
+        self.merge(self.summarize(ast, dependencies, inheritance))
+        return self.graph
+    
+    def summarize(self, ast: AST, dependencies: List[AST] = None,
+                  inheritance: InheritanceResolver = None) -> List[Tuple]:
+        """
+        文件对调用图的贡献（按顺序记录的加点、加边操作，见 merge）
+        
+        按文件顺序 merge 各文件的贡献得到的图与依次 analyze 这些文件相同，
+        因此文件可以分别（如在不同的分片中）分析，之后再合并。
+        """
+        ops = []
+        
+        # 可见的合约：本文件和导入的文件
+        visible = list(ast.contracts)
+        for dependency in dependencies or []:
+            visible.extend(dependency.contracts)
         
         for contract in ast.contracts:
             contract_name = contract.name
             
             # 添加合约节点
-            self.graph.add_node(contract_name, type='contract')
+            ops.append((_NODE, contract_name, {'type': 'contract'}))
             
             # 添加函数节点
             for func in contract.functions:
                 func_id = f"{contract_name}.{func.name}"
-                self.graph.add_node(func_id, type='function', contract=contract_name, 
-                                  function=func.name, line=func.line)
+                ops.append((_NODE, func_id, {'type': 'function', 'contract': contract_name,
+                                             'function': func.name, 'line': func.line}))
             
             # 添加调用边
             for func in contract.functions:
                 func_id = f"{contract_name}.{func.name}"
                 
                 # 分析函数调用
-                called_functions = self._extract_function_calls(func, contract, ast)
+                called_functions = self._extract_function_calls(func, contract, visible, inheritance)
                 
-                for called_func in called_functions:
-                    self.graph.add_edge(func_id, called_func, call_type='internal')
+                for called_contract, called_func in called_functions:
+                    called_id = f"{called_contract.name}.{called_func.name}"
+                    # 导入文件中的函数（图中还没有时才加入）
+                    ops.append((_IMPORTED, called_id, called_contract.name,
+                                {'type': 'function', 'contract': called_contract.name,
+                                 'function': called_func.name, 'line': called_func.line}))
+                    ops.append((_EDGE, func_id, called_id, 'internal'))
                 
                 # 分析外部调用
                 external_calls = [c for c in func.calls if self._is_external_call(c)]
                 for ext_call in external_calls:
                     ext_node = f"external_{ext_call.call_type}_{func.line}"
-                    self.graph.add_node(ext_node, type='external_call', 
-                                      call_type=ext_call.call_type)
-                    self.graph.add_edge(func_id, ext_node, call_type='external')
+                    ops.append((_NODE, ext_node, {'type': 'external_call', 'call_type': ext_call.call_type}))
+                    ops.append((_EDGE, func_id, ext_node, 'external'))
         
-        return self.graph
+        return ops
+    
+    def merge(self, ops: List[Tuple]):
+        """把一个文件的贡献（summarize 的结果）合并到图中"""
+        graph = self.graph
+        for op in ops:
+            kind = op[0]
+            if kind == _NODE:
+                graph.add_node(op[1], **op[2])
+            elif kind == _EDGE:
+                graph.add_edge(op[1], op[2], call_type=op[3])
+            elif op[1] not in graph:
+                graph.add_node(op[2], type='contract')
+                graph.add_node(op[1], **op[3])
     
     def _extract_function_calls(self, func: FunctionNode, contract: ContractNode, 
-                                ast: AST) -> List[str]:
-        """提取函数调用"""
+                                visible: List[ContractNode],
+                                inheritance: InheritanceResolver = None) -> List[Tuple[ContractNode, FunctionNode]]:
+        """提取函数调用（先在继承链中解析，其次在可见的合约中按函数名解析）"""
+        view = inheritance.view(contract) if inheritance is not None else None
         called_functions = []
         
-        # 从函数体中提取函数调用
-        import re
-        
-        # 查找函数调用模式
-        call_pattern = re.compile(r'(\w+)\s*\(', re.MULTILINE)
-        
-        for match in call_pattern.finditer(func.body):
-            called_name = match.group(1)
+        # 函数中的调用（按源码顺序）：a.f(...) 取 f，.call/.transfer 等取调用类型
+        for ir_call in sorted(function_ir(func).calls, key=lambda call: call.node.start):
+            check_budget()
+            node = ir_call.node
+            if node.call_type == 'function_call':
+                called_name = node.target.rpartition('.')[2]
+            else:
+                called_name = node.call_type
             
             # 排除关键字
             keywords = ['if', 'while', 'for', 'require', 'assert', 'revert', 
@@ -77,22 +124,33 @@ class CallGraphAnalyzer:
             if called_name in keywords:
                 continue
             
+            # 合约自身或基合约中的函数
+            if view is not None:
+                target = view.functions.get(called_name)
+                if target is not None:
+                    called_functions.append((view.owner(target), target))
+                    continue
+            
             # 检查是否是合约内的函数
             for other_func in contract.functions:
                 if other_func.name == called_name:
-                    called_functions.append(f"{contract.name}.{called_name}")
+                    called_functions.append((contract, other_func))
                     break
             
             # 检查是否是其他合约的函数
-            for other_contract in ast.contracts:
+            for other_contract in visible:
                 if other_contract.name == called_name:
                     # 可能是合约实例调用
                     continue
                 for other_func in other_contract.functions:
                     if other_func.name == called_name:
-                        called_functions.append(f"{other_contract.name}.{called_name}")
+                        called_functions.append((other_contract, other_func))
         
-        return list(set(called_functions))  # 去重
+        # 去重（同名函数只保留第一个）
+        unique = {}
+        for called_contract, called_func in called_functions:
+            unique.setdefault(f"{called_contract.name}.{called_func.name}", (called_contract, called_func))
+        return list(unique.values())
     
     def _is_external_call(self, call: CallNode) -> bool:
         """判断是否是外部调用"""
@@ -101,11 +159,15 @@ class CallGraphAnalyzer:
     
     def get_call_paths(self, from_func: str, to_func: str) -> List[List[str]]:
         """获取调用路径"""
+        paths = []
         try:
-            paths = list(nx.all_simple_paths(self.graph, from_func, to_func))
-            return paths
-        except:
+            # 逐条取出路径并检查预算（路径数量可能随图规模指数增长）
+            for path in nx.all_simple_paths(self.graph, from_func, to_func):
+                check_budget()
+                paths.append(path)
+        except nx.NetworkXException:
             return []
+        return paths
     
     def to_simple_text(self) -> str:
         """生成简单的文本格式调用图"""
@@ -2,6 +2,8 @@
 
 from typing import Dict, List, Set, Tuple
 from ..parser.ast_builder import AST, FunctionNode, ContractNode
+from ..parser.ir import BRANCHES, FunctionIR, function_ir
+from ..utils.budget import check_budget
 
 
 class ControlFlowGraph:
@@ -29,21 +31,22 @@ class ControlFlowAnalyzer:
         
         for contract in ast.contracts:
             for func in contract.functions:
-                cfg = self._build_cfg(func)
                 key = f"{contract.name}.{func.name}"
-                cfgs[key] = cfg
+                cfgs[key] = self.analyze_function(func)
         
         return cfgs
     
+    def analyze_function(self, func: FunctionNode) -> ControlFlowGraph:
+        """构建单个函数的控制流图"""
+        return self._build_cfg(func)
+    
     def _build_cfg(self, func: FunctionNode) -> ControlFlowGraph:
         """构建函数的控制流图"""
         cfg = ControlFlowGraph()
         
-        # 简化版：基于函数体构建基本CFG
-        body = func.body
-        
+        # 简化版：基于函数的语句构建基本CFG
         # 提取基本块（简化：基于控制结构）
-        blocks = self._extract_blocks(body)
+        blocks = self._extract_blocks(function_ir(func))
         
         # 添加节点
         for i, block in enumerate(blocks):
@@ -55,51 +58,23 @@ class ControlFlowAnalyzer:
         for i in range(len(blocks) - 1):
             cfg.edges.append((f"block_{i}", f"block_{i+1}"))
         
-        # 处理控制结构（if, while, for）
-        self._process_control_structures(cfg, body, blocks)
-        
         return cfg
     
-    def _extract_blocks(self, body: str) -> List[str]:
-        """提取基本块"""
-        # 简化：按语句分割
-        import re
-        
-        # 移除大括号
-        body = body.strip('{}')
-        
-        # 按分号分割语句
-        statements = re.split(r';(?![^{]*})', body)
-        
+    def _extract_blocks(self, ir: FunctionIR) -> List[str]:
+        """提取基本块：按语句顺序，分支、循环和 return 结束当前块"""
         blocks = []
         current_block = []
         
-        for stmt in statements:
-            stmt = stmt.strip()
-            if not stmt:
-                continue
-            
-            current_block.append(stmt)
+        for stmt in ir.statements:
+            check_budget()
+            current_block.append(stmt.text)
             
             # 如果是控制结构，开始新块
-            if any(keyword in stmt for keyword in ['if', 'while', 'for', 'return']):
-                if current_block:
-                    blocks.append('; '.join(current_block))
-                    current_block = []
+            if stmt.kind in BRANCHES:
+                blocks.append('; '.join(current_block))
+                current_block = []
         
         if current_block:
             blocks.append('; '.join(current_block))
         
-        return blocks if blocks else [body]
-    
-    def _process_control_structures(self, cfg: ControlFlowGraph, body: str, blocks: List[str]):
-        """处理控制结构，添加条件边"""
-        import re
-        
-        # 查找if语句
-        if_pattern = re.compile(r'if\s*\([^)]+\)\s*\{', re.MULTILINE)
-        for match in if_pattern.finditer(body):
-            # 简化：添加条件分支边
-            # 实际应该更精确地分析
-            pass
-
+        return blocks if blocks else [""]
@@ -1,7 +1,12 @@
 """数据流分析"""
 
+import re
 from typing import Dict, List, Set
 from ..parser.ast_builder import AST, FunctionNode, ContractNode
+from ..parser.ir import ASSIGN, FunctionIR, function_ir
+from ..utils.budget import check_budget
+
+_ASSIGNED_NAME = re.compile(r'(\w+)$')
 
 
 class DataFlowAnalyzer:
@@ -22,22 +27,39 @@ class DataFlowAnalyzer:
         for contract in ast.contracts:
             for func in contract.functions:
                 key = f"{contract.name}.{func.name}"
-                data_flows[key] = self._analyze_function_data_flow(func)
+                data_flows[key] = self.analyze_function(func)
         
         return data_flows
     
+    def analyze_function(self, func: FunctionNode) -> List[Dict]:
+        """分析单个函数的数据流"""
+        return self._analyze_function_data_flow(func)
+    
+    def relocate(self, flows: List[Dict], delta_lines: int) -> List[Dict]:
+        """将数据流复制到另一处相同的函数上（内容相同的函数共享分析结果）"""
+        return [
+            {
+                "variable": flow["variable"],
+                "definition_line": flow["definition_line"] + delta_lines,
+                "use_lines": [line + delta_lines for line in flow["use_lines"]]
+            }
+            for flow in flows
+        ]
+    
     def _analyze_function_data_flow(self, func: FunctionNode) -> List[Dict]:
         """分析函数的数据流"""
         flows = []
         
-        # 提取变量定义和使用
-        var_defs = self._extract_variable_definitions(func)
-        var_uses = self._extract_variable_uses(func)
+        ir = function_ir(func)
+        
+        # 提取变量定义
+        var_defs = self._extract_variable_definitions(ir)
         
-        # 构建定义-使用链
+        # 构建定义-使用链（使用为变量最后出现的行）
         for var_name, def_line in var_defs.items():
-            uses = [use_line for use_var, use_line in var_uses.items() 
-                   if use_var == var_name and use_line > def_line]
+            check_budget()
+            last_use = ir.last_use(var_name)
+            uses = [last_use] if last_use is not None and last_use > def_line else []
             
             if uses:
                 flows.append({
@@ -48,48 +70,15 @@ class DataFlowAnalyzer:
         
         return flows
     
-    def _extract_variable_definitions(self, func: FunctionNode) -> Dict[str, int]:
-        """提取变量定义"""
+    def _extract_variable_definitions(self, ir: FunctionIR) -> Dict[str, int]:
+        """提取变量定义：uint x = ... 和 x = ... 形式的赋值语句（同名变量取最后一次定义的行）"""
         definitions = {}
         
-        import re
-        
-        # 查找变量声明和赋值
-        # 模式：类型 变量名 = 或 变量名 =
-        patterns = [
-            r'(uint|int|bool|address|string|bytes\d*)\s+(\w+)\s*=',
-            r'(\w+)\s*=\s*[^;]+;'
-        ]
-        
-        for pattern in patterns:
-            for match in re.finditer(pattern, func.body, re.MULTILINE):
-                var_name = match.group(2) if len(match.groups()) > 1 else match.group(1)
-                line = func.line + func.body[:match.start()].count('\n')
-                definitions[var_name] = line
-        
-        return definitions
-    
-    def _extract_variable_uses(self, func: FunctionNode) -> Dict[str, int]:
-        """提取变量使用"""
-        uses = {}
-        
-        import re
-        
-        # 查找变量使用（在赋值右侧、函数调用参数中等）
-        # 简化：查找变量名出现的位置
-        var_pattern = r'\b([a-zA-Z_][a-zA-Z0-9_]*)\b'
-        
-        for match in re.finditer(var_pattern, func.body):
-            var_name = match.group(1)
-            
-            # 排除关键字
-            keywords = ['if', 'else', 'while', 'for', 'return', 'require', 
-                       'assert', 'revert', 'emit', 'function', 'contract']
-            if var_name in keywords:
+        for stmt in ir.statements:
+            if stmt.kind != ASSIGN or stmt.operation != '=':
                 continue
-            
-            line = func.line + func.body[:match.start()].count('\n')
-            uses[var_name] = line
+            match = _ASSIGNED_NAME.search(stmt.target)
+            if match:
+                definitions[match.group(1)] = stmt.line
         
-        return uses
-
+        return definitions
@@ -0,0 +1,170 @@
+"""继承分析
+
+按 Solidity 规则对合约继承关系做 C3 线性化（is A, B 中越靠右的基合约越“派生”），
+并为每个合约生成扁平化视图：包含继承得到的函数、修饰符和状态变量，按名称 O(1) 查找。
+线性化结果和视图都按合约缓存，每个项目只计算一次。
+"""
+
+import re
+from typing import Dict, List, Optional
+
+from ..parser.ast_builder import AST, ContractNode, FunctionNode, ModifierNode, StateVariableNode
+
+
+_IDENTIFIER_PATTERN = re.compile(r'\b([A-Za-z_]\w*)\b')
+
+
+class ContractView:
+    """合约的扁平化视图（包含继承的成员，派生合约中的定义覆盖基合约）"""
+
+    def __init__(self, contract: ContractNode, linearization: List[ContractNode]):
+        self.contract = contract
+        self.linearization = linearization  # 从自身到最基础的合约
+        self.functions: Dict[str, FunctionNode] = {}
+        self.modifiers: Dict[str, ModifierNode] = {}
+        self.state_variables: Dict[str, StateVariableNode] = {}
+        self.owners: Dict[int, ContractNode] = {}  # id(成员节点) -> 定义该成员的合约
+
+        # 从最基础的合约开始，派生合约中的同名定义覆盖之前的
+        for base in reversed(linearization):
+            for table, members in ((self.functions, base.functions), (self.modifiers, base.modifiers),
+                                   (self.state_variables, base.state_variables)):
+                for member in members:
+                    table[member.name] = member
+                    self.owners[id(member)] = base
+
+    @property
+    def name(self) -> str:
+        return self.contract.name
+
+    def owner(self, member) -> Optional[ContractNode]:
+        """定义该成员的合约"""
+        return self.owners.get(id(member))
+
+    def function_modifiers(self, ast: AST, func: FunctionNode) -> List[ModifierNode]:
+        """
+        函数声明中使用的修饰符定义（包括基合约中定义的）
+
+        按函数头中出现的标识符匹配本视图中的修饰符，不依赖修饰符的命名习惯。
+        """
+        if not self.modifiers:
+            return []
+        header = ast.source_code[func.start:func.end - len(func.body)]
+        used = []
+        for name in _IDENTIFIER_PATTERN.findall(header):
+            modifier = self.modifiers.get(name)
+            if modifier is not None and not any(modifier is other for other in used):
+                used.append(modifier)
+        return used
+
+
+class InheritanceResolver:
+    """继承解析器（每个项目一个）"""
+
+    def __init__(self, asts: List[AST], dependencies: Dict[str, List[AST]] = None):
+        """
+        Args:
+            asts: 项目中的所有AST（包括导入的依赖）
+            dependencies: 文件路径 -> 该文件导入的文件的AST，用于在同名合约中选择可见的那个
+        """
+        self.dependencies = dependencies or {}
+        self._by_name: Dict[str, List[ContractNode]] = {}
+        self._files: Dict[int, str] = {}  # id(合约) -> 所在文件
+        self._file_contracts: Dict[str, Dict[str, ContractNode]] = {}
+        self._linearizations: Dict[int, List[ContractNode]] = {}
+        self._views: Dict[int, ContractView] = {}
+        self.errors: List[str] = []  # 无法线性化或找不到基合约的说明
+
+        for ast in asts:
+            if ast.file_path in self._file_contracts:
+                continue
+            contracts = self._file_contracts[ast.file_path] = {}
+            for contract in ast.contracts:
+                contracts.setdefault(contract.name, contract)
+                self._by_name.setdefault(contract.name, []).append(contract)
+                self._files.setdefault(id(contract), ast.file_path)
+
+    def lookup(self, name: str, from_contract: ContractNode = None) -> Optional[ContractNode]:
+        """
+        按名称查找合约：优先同一文件，其次该文件导入的文件，最后任意同名合约
+        """
+        file_path = self._files.get(id(from_contract)) if from_contract is not None else None
+        if file_path is not None:
+            found = self._file_contracts[file_path].get(name)
+            if found is not None:
+                return found
+            for dependency in self.dependencies.get(file_path, []):
+                found = self._file_contracts.get(dependency.file_path, {}).get(name)
+                if found is not None:
+                    return found
+        candidates = self._by_name.get(name)
+        return candidates[0] if candidates else None
+
+    def linearize(self, contract: ContractNode) -> List[ContractNode]:
+        """C3 线性化（从自身到最基础的合约）"""
+        return self._linearize(contract, set())
+
+    def view(self, contract: ContractNode) -> ContractView:
+        """合约的扁平化视图（缓存）"""
+        view = self._views.get(id(contract))
+        if view is None:
+            view = self._views[id(contract)] = ContractView(contract, self.linearize(contract))
+        return view
+
+    def resolve_function(self, contract: ContractNode, name: str) -> Optional[FunctionNode]:
+        """在合约及其基合约中查找函数（派生合约的定义优先）"""
+        return self.view(contract).functions.get(name)
+
+    def resolve_modifier(self, contract: ContractNode, name: str) -> Optional[ModifierNode]:
+        """在合约及其基合约中查找修饰符"""
+        return self.view(contract).modifiers.get(name)
+
+    def _linearize(self, contract: ContractNode, visiting: set) -> List[ContractNode]:
+        cached = self._linearizations.get(id(contract))
+        if cached is not None:
+            return cached
+
+        if id(contract) in visiting:
+            self.errors.append(f"{contract.name}: 循环继承")
+            return [contract]
+        visiting.add(id(contract))
+
+        bases = []
+        for name in contract.bases:
+            base = self.lookup(name, contract)
+            if base is None:
+                self.errors.append(f"{contract.name}: 找不到基合约 {name}")
+            elif base is not contract and not any(base is other for other in bases):
+                bases.append(base)
+
+        # Solidity 中越靠右的基合约越派生，因此按从右到左的顺序合并
+        bases.reverse()
+        sequences = [list(self._linearize(base, visiting)) for base in bases] + [list(bases)]
+        # 循环继承时合并结果中可能再次出现自身
+        result = [contract] + [item for item in self._merge(contract, sequences) if item is not contract]
+
+        visiting.discard(id(contract))
+        self._linearizations[id(contract)] = result
+        return result
+
+    def _merge(self, contract: ContractNode, sequences: List[List[ContractNode]]) -> List[ContractNode]:
+        """C3 合并；继承关系不一致时按深度优先顺序去重作为近似"""
+        result = []
+        sequences = [seq for seq in sequences if seq]
+        while sequences:
+            for seq in sequences:
+                head = seq[0]
+                if not any(item is head for other in sequences for item in other[1:]):
+                    break
+            else:
+                self.errors.append(f"{contract.name}: 无法线性化继承关系")
+                for seq in sequences:
+                    for item in seq:
+                        if not any(item is other for other in result):
+                            result.append(item)
+                return result
+
+            result.append(head)
+            sequences = [[item for item in seq if item is not head] for seq in sequences]
+            sequences = [seq for seq in sequences if seq]
+        return result
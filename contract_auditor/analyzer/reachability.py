@@ -0,0 +1,246 @@
+"""入口点可达性
+
+合约的攻击面是它的 public/external 函数（包括 receive/fallback）和构造函数（入口点）。
+每个合约的入口点只确定一次，
+从每个入口点沿内部调用计算可达的函数集合，以位集（整数，每个函数一位）缓存：
+- reachable(func)：函数是否从某个入口点可达，不可达的 private/internal 函数可以跳过检测和分析
+- entry_points(func)：能到达该函数的入口点，报告中为每个问题注明由哪些入口点暴露
+
+调用按调用方所在合约的继承视图解析：f() 和 this.f() 取派生合约中的定义，super.f() 取线性化中
+的下一个定义，Base.f()/Lib.f() 取该合约中的函数，x.f() 取可见的库中的同名函数（using for），
+函数使用的修饰符中的调用同样计入。其他合约的函数不跟随（它们是那个合约自己的入口点）。
+
+入口点按部署的合约区分：基合约的函数在派生合约中可达时，入口点记为“派生合约.函数”；
+合约及其基合约的构造函数合并为一个入口点“合约.constructor”。
+解析器没有建模的入口（旧式的无名 fallback function()）所在合约的函数全部视为可达。
+"""
+
+import re
+from typing import Dict, List, Optional, Tuple
+
+from ..parser.ast_builder import AST, ContractNode, FunctionNode
+from ..parser.ir import function_ir
+from ..utils.budget import check_budget
+from .inheritance import ContractView, InheritanceResolver
+
+ENTRY_VISIBILITIES = ('public', 'external')
+
+# 修饰符体中的调用（修饰符没有IR，只按名称匹配）
+_CALL_PATTERN = re.compile(r'\b([A-Za-z_]\w*)\s*\(')
+_NOT_CALLS = frozenset(['if', 'while', 'for', 'require', 'assert', 'revert', 'return', 'emit', 'new',
+                        'delete', 'keccak256', 'abi', 'address', 'payable'])
+
+# 解析器没有建模为函数的入口：旧版本的无名 fallback（也会匹配函数类型，只会更保守）
+_UNMODELED_ENTRY = re.compile(r'\bfunction\s*\(')
+
+
+class Reachability:
+    """项目中所有合约的入口点和可达函数（每个项目计算一次）"""
+
+    def __init__(self, asts: List[AST], inheritance: InheritanceResolver = None):
+        """
+        Args:
+            asts: 项目中的所有AST（包括导入的依赖）
+            inheritance: 继承解析器；未提供时每个合约只包含自身的成员
+        """
+        self.inheritance = inheritance
+        self._bits: Dict[int, int] = {}  # id(函数) -> 位
+        self._files: Dict[int, AST] = {}  # id(合约) -> 所在文件
+        self._owners: Dict[int, ContractNode] = {}  # id(函数) -> 定义该函数的合约
+        self._by_name: Dict[str, ContractNode] = {}
+        self._libraries: Dict[str, List[FunctionNode]] = {}  # 函数名 -> 库中的同名函数
+        self._names: Dict[int, Dict[str, List[FunctionNode]]] = {}  # id(合约) -> 视图中按名称的函数
+        self._callees: Dict[Tuple[int, int], List[Tuple[FunctionNode, ContractNode]]] = {}
+        self._contexts: List[ContractNode] = []
+        self._unmodeled: List[ContractNode] = []  # 有未建模入口的合约
+        self._entries: List[Tuple[str, int]] = []  # (入口点, 可达函数的位集)
+        self._contract_entries: Dict[int, List[str]] = {}  # id(合约) -> 该合约的入口点
+        self._exposure: Dict[int, List[str]] = {}  # 位 -> 能到达该函数的入口点
+        self.reachable_bits = 0  # 从任一入口点可达的函数
+
+        for ast in asts:
+            for contract in ast.contracts:
+                if id(contract) in self._files:
+                    continue
+                self._files[id(contract)] = ast
+                self._by_name.setdefault(contract.name, contract)
+                for func in contract.functions:
+                    self._bits[id(func)] = len(self._bits)
+                    self._owners[id(func)] = contract
+                    if contract.kind == 'library':
+                        self._libraries.setdefault(func.name, []).append(func)
+                if contract.constructor is not None:
+                    self._bits[id(contract.constructor)] = len(self._bits)
+                    self._owners[id(contract.constructor)] = contract
+                if contract.kind != 'interface':
+                    self._contexts.append(contract)
+                    if _UNMODELED_ENTRY.search(ast.source_code, contract.start, contract.end):
+                        self._unmodeled.append(contract)
+
+        for contract in self._contexts:
+            self._contract_entries[id(contract)] = self._add_entries(contract)
+        for contract in self._unmodeled:
+            # 不知道未建模的入口调用了哪些函数：不剪除合约视图中的任何函数
+            for functions in self._functions(contract).values():
+                for func in functions:
+                    self.reachable_bits |= self._reach(func, contract)
+        # 之后只按位查询：不再引用文件（源码随文件处理完成释放）和解析调用的缓存
+        self._files.clear()
+        self._callees.clear()
+        self._names.clear()
+
+    def __len__(self) -> int:
+        """入口点数"""
+        return len(self._entries)
+
+    def reachable(self, func: FunctionNode) -> bool:
+        """函数是否从某个入口点可达（不在项目中的函数视为可达）"""
+        bit = self._bits.get(id(func))
+        return bit is None or bool(self.reachable_bits >> bit & 1)
+
+    def entry_points(self, func: FunctionNode) -> List[str]:
+        """能到达该函数的入口点（合约.函数，按合约和入口点的顺序）"""
+        bit = self._bits.get(id(func))
+        if bit is None:
+            return []
+        exposure = self._exposure.get(bit)
+        if exposure is None:
+            exposure = self._exposure[bit] = [name for name, reach in self._entries if reach >> bit & 1]
+        return exposure
+
+    def summary(self, ast: AST) -> Dict[str, Dict]:
+        """文件中各合约的入口点和不可达的函数（报告的 entry_points 部分，键为 文件:合约）"""
+        summary = {}
+        for contract in ast.contracts:
+            entries = self._contract_entries.get(id(contract))
+            if entries is None:
+                continue
+            summary[f"{ast.file_path}:{contract.name}"] = {
+                'contract': contract.name,
+                'entry_points': entries,
+                'functions': len(contract.functions),
+                'unreachable': [func.name for func in contract.functions if not self.reachable(func)]
+            }
+        return summary
+
+    def _add_entries(self, contract: ContractNode) -> List[str]:
+        """确定合约的入口点，计算每个入口点可达的函数"""
+        names = []
+        reaches: Dict[str, int] = {}
+        for functions in self._functions(contract).values():
+            for func in functions:
+                if func.visibility not in ENTRY_VISIBILITIES:
+                    continue
+                name = f"{contract.name}.{func.name}"
+                if name not in reaches:
+                    names.append(name)
+                    reaches[name] = 0
+                # 同名重载合并为一个入口点
+                reaches[name] |= self._reach(func, contract)
+        # 部署时依次执行基合约和合约自身的构造函数（都在该合约中执行）
+        constructors = [base.constructor for base in self._view(contract).linearization
+                        if base.constructor is not None]
+        if constructors and contract.kind == 'contract':
+            name = f"{contract.name}.constructor"
+            names.append(name)
+            reaches[name] = 0
+            for constructor in constructors:
+                reaches[name] |= self._reach(constructor, contract)
+        for name in names:
+            self._entries.append((name, reaches[name]))
+            self.reachable_bits |= reaches[name]
+        return names
+
+    def _reach(self, entry: FunctionNode, contract: ContractNode) -> int:
+        """从入口点（在 contract 中执行）可达的函数的位集"""
+        reach = 0
+        stack = [(entry, contract)]
+        while stack:
+            func, context = stack.pop()
+            bit = self._bits.get(id(func))
+            if bit is None or reach >> bit & 1:
+                continue
+            reach |= 1 << bit
+            stack.extend(self._resolve_calls(func, context))
+        return reach
+
+    def _resolve_calls(self, func: FunctionNode, context: ContractNode) -> List[Tuple[FunctionNode, ContractNode]]:
+        """函数（在 context 中执行）调用的函数及其执行的合约（缓存）"""
+        key = (id(context), id(func))
+        callees = self._callees.get(key)
+        if callees is not None:
+            return callees
+        check_budget()
+        view = self._view(context)
+        owner = self._owners.get(id(func), context)
+        names = self._functions(context)
+        callees = []
+
+        def add(targets: List[FunctionNode], target_context: ContractNode = None):
+            # 未指定时在定义函数的合约（库）中执行
+            callees.extend((target, target_context or self._owners.get(id(target), context))
+                           for target in targets)
+
+        for call in function_ir(func).calls:
+            node = call.node
+            if node.call_type != 'function_call':
+                continue
+            qualifier, _, name = node.target.rpartition('.')
+            if qualifier in ('', 'this'):
+                add(names.get(name, []), context)
+            elif qualifier == 'super':
+                add(self._super(view, owner, name), context)
+            else:
+                target = self._lookup(qualifier, context)
+                if target is not None and (target.kind == 'library'
+                                           or any(base is target for base in view.linearization)):
+                    # Lib.f() 在库中执行，Base.f() 仍在当前合约中执行
+                    add([f for f in target.functions if f.name == name],
+                        None if target.kind == 'library' else context)
+                elif target is None:
+                    # x.f()：using for 绑定的库函数
+                    add(self._libraries.get(name, []))
+
+        ast = self._files.get(id(owner))
+        if ast is not None:
+            for modifier in view.function_modifiers(ast, func):
+                for name in _CALL_PATTERN.findall(modifier.body):
+                    if name not in _NOT_CALLS:
+                        add(names.get(name, []), context)
+
+        self._callees[key] = callees
+        return callees
+
+    def _functions(self, contract: ContractNode) -> Dict[str, List[FunctionNode]]:
+        """合约视图中按名称的函数（派生合约中的定义覆盖基合约中所有同名的重载）"""
+        names = self._names.get(id(contract))
+        if names is None:
+            names = self._names[id(contract)] = {}
+            for base in reversed(self._view(contract).linearization):
+                defined: Dict[str, List[FunctionNode]] = {}
+                for func in base.functions:
+                    defined.setdefault(func.name, []).append(func)
+                names.update(defined)
+        return names
+
+    def _super(self, view: ContractView, owner: ContractNode, name: str) -> List[FunctionNode]:
+        """super.name()：线性化中 owner 之后第一个定义了该函数的合约中的定义"""
+        found = False
+        for base in view.linearization:
+            if found:
+                functions = [func for func in base.functions if func.name == name]
+                if functions:
+                    return functions
+            elif base is owner:
+                found = True
+        return []
+
+    def _view(self, contract: ContractNode) -> ContractView:
+        if self.inheritance is not None:
+            return self.inheritance.view(contract)
+        return ContractView(contract, [contract])
+
+    def _lookup(self, name: str, from_contract: ContractNode) -> Optional[ContractNode]:
+        if self.inheritance is not None:
+            return self.inheritance.lookup(name, from_contract)
+        return self._by_name.get(name)
@@ -0,0 +1,139 @@
+"""分析调度
+
+每个分析注册为依赖图（DAG）中的一个节点，并声明它的输入（依赖的其他分析）。
+一次运行只计算所选检测器（BaseDetector.REQUIRES）和所选报告部分实际用到的分析，
+以及它们的传递依赖，其余分析不执行。
+
+文件级的结果在整个运行中按 (分析, 文件) 缓存（见 AnalysisPlan.memo），
+函数级的结果由 ResultCache 按函数指纹缓存。
+"""
+
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+import networkx as nx
+
+
+class Analysis:
+    """分析节点"""
+
+    def __init__(self, name: str, inputs: Tuple[str, ...] = (), section: Optional[str] = None,
+                 description: str = ""):
+        """
+        Args:
+            name: 分析名称
+            inputs: 依赖的分析
+            section: 该分析产生的报告部分（如 taint_paths），None 表示只被其他分析或检测器使用
+            description: 说明（用于 --help 和日志）
+        """
+        self.name = name
+        self.inputs = tuple(inputs)
+        self.section = section
+        self.description = description
+
+
+class AnalysisGraph:
+    """分析依赖图，边 A -> B 表示 B 以 A 的结果为输入"""
+
+    def __init__(self):
+        self.graph = nx.DiGraph()
+        self.analyses: Dict[str, Analysis] = {}
+
+    def register(self, name: str, inputs: Tuple[str, ...] = (), section: Optional[str] = None,
+                 description: str = "") -> Analysis:
+        """
+        注册分析（输入必须已注册，因此依赖图始终无环）
+
+        Raises:
+            ValueError: 重复注册或输入未注册
+        """
+        if name in self.analyses:
+            raise ValueError(f"分析已注册: {name}")
+        for dependency in inputs:
+            if dependency not in self.analyses:
+                raise ValueError(f"{name} 的输入未注册: {dependency}")
+
+        analysis = self.analyses[name] = Analysis(name, inputs, section, description)
+        self.graph.add_node(name)
+        for dependency in inputs:
+            self.graph.add_edge(dependency, name)
+        return analysis
+
+    @property
+    def sections(self) -> List[str]:
+        """可以单独选择的分析（产生报告部分的分析）"""
+        return [name for name, analysis in self.analyses.items() if analysis.section]
+
+    def plan(self, targets: Iterable[str]) -> List[str]:
+        """
+        计算目标分析及其传递依赖
+
+        Returns:
+            需要执行的分析，按依赖顺序（输入在前）
+
+        Raises:
+            ValueError: 目标分析未注册
+        """
+        needed = set()
+        for target in targets:
+            if target not in self.analyses:
+                raise ValueError(f"未知的分析: {target}")
+            needed.add(target)
+            needed |= nx.ancestors(self.graph, target)
+        return [name for name in nx.topological_sort(self.graph) if name in needed]
+
+
+def default_graph() -> AnalysisGraph:
+    """内置分析的依赖图"""
+    graph = AnalysisGraph()
+    graph.register('imports', description="导入解析")
+    graph.register('inheritance', inputs=('imports',), description="继承线性化")
+    graph.register('call_graph', inputs=('imports', 'inheritance'), section='call_graph',
+                   description="调用图")
+    graph.register('taint', section='taint_paths', description="污点分析")
+    graph.register('control_flow', section='control_flow', description="控制流分析")
+    graph.register('data_flow', section='data_flow', description="数据流分析")
+    graph.register('reachability', inputs=('imports', 'inheritance'), section='entry_points',
+                   description="入口点可达性")
+    return graph
+
+
+class AnalysisPlan:
+    """一次运行的分析计划：需要执行的分析，以及文件级结果的缓存"""
+
+    def __init__(self, graph: AnalysisGraph, analyses: Iterable[str], detectors: Iterable = ()):
+        """
+        Args:
+            graph: 分析依赖图
+            analyses: 报告中需要的分析
+            detectors: 要运行的检测器（其 REQUIRES 中的分析同样需要执行）
+        """
+        self.graph = graph
+        self.requested = list(analyses)
+        targets = list(self.requested)
+        for detector in detectors:
+            targets.extend(detector.REQUIRES)
+        self.order = graph.plan(targets)
+        self._needed = set(self.order)
+        self._memo: Dict[Tuple[str, str], object] = {}
+        self.hits = 0
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._needed
+
+    @property
+    def skipped(self) -> List[str]:
+        """不需要执行的分析"""
+        return [name for name in self.graph.analyses if name not in self._needed]
+
+    def memo(self, name: str, key: str, compute: Callable[[], object]) -> object:
+        """
+        获取分析在某个文件（或其他范围）上的结果，同一运行中只计算一次
+
+        计算中抛出的异常（如 BudgetExceeded）不缓存。
+        """
+        memo_key = (name, key)
+        if memo_key in self._memo:
+            self.hits += 1
+            return self._memo[memo_key]
+        result = self._memo[memo_key] = compute()
+        return result
@@ -1,7 +1,9 @@
 """污点分析"""
 
 from typing import Dict, List, Set, Tuple
-from ..parser.ast_builder import AST, FunctionNode, ContractNode, CallNode, StateChangeNode
+from ..parser.ast_builder import AST, FunctionNode, ContractNode, StateChangeNode
+from ..parser.ir import FunctionIR, function_ir
+from ..utils.budget import check_budget
 
 
 class TaintSource:
@@ -45,66 +47,74 @@ class TaintAnalyzer:
         
         for contract in ast.contracts:
             for func in contract.functions:
-                # 识别污点源
-                sources = self._identify_taint_sources(func)
-                
-                # 识别污点汇
-                sinks = self._identify_taint_sinks(func)
-                
-                # 追踪污点传播
-                for source in sources:
-                    for sink in sinks:
-                        path = self._trace_taint(func, source, sink)
-                        if path:
-                            taint_paths.append(TaintPath(source, sink, path))
+                taint_paths.extend(self.analyze_function(func))
         
         return taint_paths
     
-    def _identify_taint_sources(self, func: FunctionNode) -> List[TaintSource]:
+    def analyze_function(self, func: FunctionNode) -> List[TaintPath]:
+        """对单个函数执行污点分析"""
+        taint_paths = []
+        ir = function_ir(func)
+        
+        # 识别污点源
+        sources = self._identify_taint_sources(func, ir)
+        
+        # 识别污点汇
+        sinks = self._identify_taint_sinks(func, ir)
+        
+        # 追踪污点传播
+        for source in sources:
+            check_budget()
+            for sink in sinks:
+                path = self._trace_taint(ir, source, sink)
+                if path:
+                    taint_paths.append(TaintPath(source, sink, path))
+        
+        return taint_paths
+    
+    def _identify_taint_sources(self, func: FunctionNode, ir: FunctionIR) -> List[TaintSource]:
         """识别污点源"""
         sources = []
         
-        import re
-        
         # 函数参数
         for param in func.parameters:
             if 'address' in param.lower() or 'uint' in param.lower():
                 sources.append(TaintSource(param, func.line, 'parameter'))
         
         # msg.sender
-        if re.search(r'\bmsg\.sender\b', func.body, re.IGNORECASE):
+        if ir.mentions('msg.sender'):
             sources.append(TaintSource('msg.sender', func.line, 'msg.sender'))
         
         # msg.value
-        if re.search(r'\bmsg\.value\b', func.body, re.IGNORECASE):
+        if ir.mentions('msg.value'):
             sources.append(TaintSource('msg.value', func.line, 'msg.value'))
         
         # 外部调用返回值
-        for call in func.calls:
-            if self._is_external_call(call):
-                sources.append(TaintSource(f"external_call_{call.line}", call.line, 'external_call'))
+        for call in ir.external_calls:
+            sources.append(TaintSource(f"external_call_{call.node.line}", call.node.line, 'external_call'))
         
         return sources
     
-    def _identify_taint_sinks(self, func: FunctionNode) -> List[TaintSink]:
+    def _identify_taint_sinks(self, func: FunctionNode, ir: FunctionIR) -> List[TaintSink]:
         """识别污点汇（危险操作）"""
         sinks = []
         
         # 外部调用
-        for call in func.calls:
-            if self._is_external_call(call):
+        for ir_call in ir.calls:
+            call = ir_call.node
+            if ir_call.is_external:
                 sinks.append(TaintSink(f"external_call_{call.line}", call.line, 'external_call'))
             
             if call.call_type == 'delegatecall':
                 sinks.append(TaintSink(f"delegatecall_{call.line}", call.line, 'delegatecall'))
         
         # 状态修改（如果涉及用户输入）
-        for change in func.state_changes:
+        for change in ir.writes:
             sinks.append(TaintSink(f"state_change_{change.variable}", change.line, 'state_change'))
         
         return sinks
     
-    def _trace_taint(self, func: FunctionNode, source: TaintSource, sink: TaintSink) -> List[str]:
+    def _trace_taint(self, ir: FunctionIR, source: TaintSource, sink: TaintSink) -> List[str]:
         """追踪污点传播路径"""
         # 简化版污点追踪
         # 实际应该进行更精确的数据流分析
@@ -114,27 +124,45 @@ class TaintAnalyzer:
         # 检查source和sink是否在同一个函数中
         if source.line <= sink.line:
             # 简单检查：如果source在sink之前，可能存在传播
-            import re
+            # 行号限制在函数体的范围内
+            source_line = min(max(source.line, ir.first_line), ir.last_line)
+            sink_line = min(max(sink.line, ir.first_line), ir.last_line)
             
-            # 查找source到sink之间的变量使用
-            body_lines = func.body.split('\n')
-            source_line_idx = source.line - 1 if source.line <= len(body_lines) else 0
-            sink_line_idx = sink.line - 1 if sink.line <= len(body_lines) else len(body_lines) - 1
-            
-            if source_line_idx < sink_line_idx:
-                # 检查中间是否有相关变量
-                middle_code = '\n'.join(body_lines[source_line_idx:sink_line_idx+1])
-                
-                # 简化：如果source名称出现在中间代码中，认为有传播
-                if re.search(rf'\b{source.name}\b', middle_code, re.IGNORECASE):
+            if source_line < sink_line:
+                # 简化：如果source名称出现在两者之间的代码中，认为有传播
+                if ir.mentions(source.name, source_line, sink_line):
                     path = [source.name, sink.name]
         
         return path
     
-    def _is_external_call(self, call: CallNode) -> bool:
-        """判断是否是外部调用"""
-        external_types = ['call', 'send', 'transfer', 'delegatecall', 'staticcall']
-        return call.call_type in external_types or call.is_low_level
+    def relocate(self, taint_paths: List[TaintPath], delta_lines: int) -> List[TaintPath]:
+        """
+        将污点路径复制到另一处相同的函数上（内容相同的函数共享分析结果）
+        
+        Args:
+            taint_paths: 原函数的污点路径
+            delta_lines: 目标函数相对原函数的行号偏移
+        """
+        if not delta_lines:
+            return list(taint_paths)
+        
+        def shift_name(name: str, kind: str, line: int) -> str:
+            # 调用类的源/汇以行号命名
+            if kind in ('external_call', 'delegatecall') and name == f"{kind}_{line}":
+                return f"{kind}_{line + delta_lines}"
+            return name
+        
+        relocated = []
+        for path in taint_paths:
+            names = {}
+            source = TaintSource(shift_name(path.source.name, path.source.type, path.source.line),
+                                 path.source.line + delta_lines, path.source.type)
+            sink = TaintSink(shift_name(path.sink.name, path.sink.type, path.sink.line),
+                             path.sink.line + delta_lines, path.sink.type)
+            names[path.source.name] = source.name
+            names[path.sink.name] = sink.name
+            relocated.append(TaintPath(source, sink, [names.get(name, name) for name in path.path]))
+        return relocated
     
     def to_dict(self, taint_paths: List[TaintPath]) -> List[Dict]:
         """转换为字典格式"""
@@ -0,0 +1,856 @@
+"""嵌入式 API
+
+在其他程序（如长期运行的扫描服务）中直接调用审计，不经过命令行：
+
+    from contract_auditor.api import AuditOptions, Auditor
+
+    auditor = Auditor(AuditOptions(severity='medium'))
+    result = auditor.audit(['contracts/'])
+    for issue in result:          # 每个文件检测和分析完成后即产生该文件的问题
+        ...
+    result.groups['']             # 单文件组的分析数据（项目按项目名）
+
+默认不输出任何信息、不写文件：AuditOptions.verbose 打开进度输出，AuditOptions.output_dir
+指定时写出与命令行相同的报告。Auditor 在多次审计之间共享解析器和按函数内容缓存的结果，
+内容未变的函数不会重复检测和分析。
+
+命令行（main）也建立在这里的 iter_files / run_files 之上。
+
+Author: tr3
+"""
+
+import os
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Dict, FrozenSet, Generator, Iterable, Iterator, List, Optional, Sequence, Tuple, Union
+
+from colorama import Fore, Style
+
+from .parser.solidity_parser import SolidityParser
+from .parser.import_resolver import ImportResolver, SourceCache
+from .parser.parallel import ParallelParser
+from .parser.cost_model import CostModel, TimingCache
+from .parser.artifacts import ArtifactIndex, ArtifactParser
+from .analyzer.inheritance import InheritanceResolver
+from .analyzer.scheduler import AnalysisGraph, AnalysisPlan, default_graph
+from .analyzer.call_graph import CallGraphAnalyzer
+from .analyzer.taint_analysis import TaintAnalyzer
+from .analyzer.control_flow import ControlFlowAnalyzer
+from .analyzer.data_flow import DataFlowAnalyzer
+from .analyzer.reachability import Reachability
+from .detectors.base_detector import BaseDetector, Issue
+from .detectors.reentrancy_detector import ReentrancyDetector
+from .detectors.access_control_detector import AccessControlDetector
+from .detectors.external_call_detector import ExternalCallDetector
+from .detectors.unchecked_return_detector import UncheckedReturnDetector
+from .detectors.delegatecall_detector import DelegatecallDetector
+from .detectors.issue_store import IssueStore, IssueView
+from .reporter.json_reporter import JSONReporter
+from .reporter.html_reporter import HTMLReporter
+from .utils.file_utils import find_solidity_files, classify_files
+from .utils.severity import Severity
+from .utils.profiler import Profiler
+from .utils.budget import BudgetLimits, BudgetExceeded, check_budget, partial_record
+from .utils.dedup import ResultCache, function_fingerprint
+from .utils.keyword_index import KeywordScanner, KeywordIndex
+from .utils.source_store import SourceStore
+from .utils.pipeline import Prefetch
+from .utils.baseline import Baseline, fingerprint_issues
+from .parser.ast_builder import AST
+
+# 后台线程最多提前读取的文件数
+READ_AHEAD = 8
+
+# Auditor 在多次审计之间最多缓存的函数级结果数（按最近使用淘汰）
+RESULT_CACHE_SIZE = 100000
+
+
+def _quiet(message: str):
+    """不输出进度信息"""
+
+
+def default_detectors() -> List[BaseDetector]:
+    """所有内置检测器"""
+    return [
+        ReentrancyDetector(),
+        AccessControlDetector(),
+        ExternalCallDetector(),
+        UncheckedReturnDetector(),
+        DelegatecallDetector()
+    ]
+
+
+def select_analyses(names: Union[str, Sequence[str]], graph: AnalysisGraph) -> List[str]:
+    """
+    选择报告中包含的分析
+
+    Args:
+        names: 分析名称列表，或 'all'/'none'
+
+    Raises:
+        ValueError: 未知的分析名称
+    """
+    names = [names] if isinstance(names, str) else list(names)
+    if names == ['all']:
+        return graph.sections
+    if names == ['none']:
+        return []
+    unknown = [name for name in names if name not in graph.sections]
+    if unknown:
+        raise ValueError(f"未知的分析: {', '.join(unknown)}（可选: {', '.join(graph.sections)}, all, none）")
+    return names
+
+
+def detector_key(name: str) -> str:
+    """检测器名称的比较键：ReentrancyDetector、reentrancy、access-control 等写法等价"""
+    key = name.lower().replace('-', '').replace('_', '')
+    return key[:-len('detector')] if key.endswith('detector') else key
+
+
+def select_detectors(names: Union[str, Sequence[str]], detectors: List[BaseDetector]) -> List[BaseDetector]:
+    """
+    按名称选择检测器
+
+    Args:
+        names: 检测器名称列表（写法见 detector_key），或 'all'/'none'
+
+    Raises:
+        ValueError: 未知的检测器名称
+    """
+    names = [names] if isinstance(names, str) else list(names)
+    if names == ['all']:
+        return detectors
+    if names == ['none']:
+        return []
+    by_key = {detector_key(detector.name): detector for detector in detectors}
+    unknown = [name for name in names if detector_key(name) not in by_key]
+    if unknown:
+        raise ValueError(
+            f"未知的检测器: {', '.join(unknown)}（可选: {', '.join(d.name for d in detectors)}, all, none）")
+    keys = {detector_key(name) for name in names}
+    return [detector for detector in detectors if detector_key(detector.name) in keys]
+
+
+def schedule_detectors(detectors: List[BaseDetector], min_severity: Severity) -> Tuple[List[BaseDetector], List[str]]:
+    """只保留可能产生不低于 min_severity 的问题的检测器，返回 (保留的检测器, 跳过的检测器名)"""
+    scheduled = [detector for detector in detectors if detector.can_report(min_severity)]
+    return scheduled, [detector.name for detector in detectors if detector not in scheduled]
+
+
+def _function_key(ast, contract, func) -> str:
+    """函数的剖析统计键"""
+    return f"{ast.file_path}:{contract.name}.{func.name}"
+
+
+def _has_bodies(ast: AST) -> bool:
+    """文件中是否有带函数体的函数（只有接口和抽象声明的文件没有）"""
+    return any(contract.functions for contract in ast.contracts)
+
+
+def _drain(items: List):
+    """依次取出并移除列表中的元素（已处理的元素不再被列表引用）"""
+    items.reverse()
+    while items:
+        yield items.pop()
+
+
+def iter_files(files: List[Tuple[str, Any]], parser, detectors,
+               call_graph_analyzer, taint_analyzer,
+               control_flow_analyzer, data_flow_analyzer, profiler: Profiler = None,
+               limits: BudgetLimits = None, sources: SourceCache = None,
+               results: ResultCache = None, min_severity: Severity = Severity.LOW,
+               plan: AnalysisPlan = None, store: SourceStore = None,
+               parallel: ParallelParser = None, issue_store: IssueStore = None,
+               project: str = '', records: Dict[str, Dict] = None,
+               log: Callable[[str], None] = None,
+               stop: Callable[[range], bool] = None,
+               reachable_only: bool = False) -> Generator[Tuple[str, range], None, Tuple[IssueView, Dict]]:
+    """
+    处理一组文件（单文件或一个项目）
+    
+    每个文件检测和分析完成后产生 (文件路径, 该文件的问题在 issue_store 中的行)；
+    全部完成后返回（StopIteration.value）问题（issue_store 中该组文件的 IssueView）和分析数据。
+    不需要逐个文件的结果时使用 run_files。
+    
+    files 中的源码可以是文本，也可以是 SourceHandle（由 store 按需读取）；
+    提供 parallel 时文件在工作进程中解析（parser 为 ArtifactParser 时，有编译产物的文件除外），
+    文本源码先放入 store 的共享内存块（SourceStore.add_text），解析完成后释放。
+    sources、results 和 plan 在一次运行的所有文件组之间共享：每个文件（包括被导入的依赖）
+    只解析一次，内容相同的函数只检测和分析一次。
+    低于 min_severity 的问题在产生时即被丢弃；detectors 应已按该等级筛选过。
+    问题加入 issue_store（可在各组之间共享，按 project 区分），不同检测器在同一位置报告的
+    根因相同的问题合并为一个。
+    只执行 plan 中的分析（检测器和报告部分用到的），未执行的分析在返回数据中为空。
+    plan 中有 reachability 时每个问题注明能到达它的入口点（Issue.entry_points）；
+    reachable_only 时只检测和分析从入口点可达的函数（plan 中应有 reachability）。
+    提供 records 时还按文件记录结果（文件路径 -> 问题、调用图贡献和各项分析结果），
+    用于分片审计的结果包；按文件顺序合并这些记录得到与返回值相同的数据（见 main._merge_files）。
+    进度信息交给 log（默认不输出）。
+    提供 stop 时，每加入一个新问题就以新增的行调用 stop，返回 True 时提前结束：
+    跳过该文件其余的检测器和分析以及之后的所有文件，返回已完成部分的数据，
+    数据中的 truncated 记录已检测的文件数（未提前结束时为 None）。
+    """
+    log = log or _quiet
+    profiler = profiler or Profiler(enabled=False)
+    sources = sources or SourceCache(parser, ImportResolver())
+    results = results if results is not None else ResultCache()
+    limits = limits or BudgetLimits()
+    store = store or SourceStore()
+    if plan is None:
+        graph = default_graph()
+        plan = AnalysisPlan(graph, graph.sections, detectors)
+    # 每个文件扫描一次所有检测器的触发词
+    scanner = KeywordScanner(token for detector in detectors for token in (detector.TRIGGER_TOKENS or ()))
+    all_issues = issue_store if issue_store is not None else IssueStore()
+    merged = all_issues.merged
+    file_budgets = {}
+    dependencies = {}  # 文件路径 -> 导入的文件的AST
+    inheritance = None
+    reachability = None
+    fingerprints = {}  # id(FunctionNode) -> 函数指纹
+    partial = []  # 超出预算、只完成了部分分析的文件/检测器
+    
+    def cached(kind, ast, contract, func, compute, relocate=None):
+        """内容相同的函数复用之前的结果（按行号偏移重新定位）"""
+        fingerprint = fingerprints.get(id(func))
+        if fingerprint is None:
+            # 未执行继承分析时，没有检测器依赖基合约中的修饰符
+            view = inheritance.view(contract) if inheritance is not None else None
+            fingerprint = fingerprints[id(func)] = function_fingerprint(ast, contract, func, view)
+        return results.get_or_compute(kind, fingerprint, func.line, compute, relocate)
+    
+    def run_stage(ast, stage, func, detector=None):
+        """在文件预算内执行一个分析阶段，超出预算时记录为部分分析"""
+        try:
+            with file_budgets[ast.file_path]:
+                func()
+        except BudgetExceeded as e:
+            partial.append(partial_record(ast.file_path, stage, e, detector))
+            log(Fore.RED + f"  部分分析: {ast.file_path} ({stage}) - {e}" + Style.RESET_ALL)
+    
+    # 解析：源码由后台线程提前读取（有界队列），提供 parallel 时由工作进程提前解析
+    def parse_files():
+        shared = {}  # 文件路径 -> 放入共享内存块的文本源码
+        if parallel is not None:
+            # 已解析的文件和使用编译产物中的AST的文件不交给工作进程；
+            # 文本源码（不在磁盘上）放入共享内存块，同样不经过管道复制
+            submitted = []
+            for file_path, source in files:
+                if sources.get(file_path) is not None \
+                        or (isinstance(parser, ArtifactParser) and parser.has_artifact(file_path)):
+                    continue
+                if isinstance(source, str):
+                    source = shared[file_path] = store.add_text(file_path, source)
+                submitted.append((file_path, source))
+            parallel.submit(submitted)
+        try:
+            yield from read_and_parse(shared)
+        finally:
+            for handle in shared.values():
+                store.release(handle)
+
+    def read_and_parse(shared):
+        # 主进程与工作进程读取同一份源码（共享内存块中的文本与文件一样转换换行符）
+        with Prefetch(files, lambda item: (item[0], store.read(shared.get(item[0], item[1]))),
+                      maxsize=READ_AHEAD, name='read') as reader:
+            for file_path, source_code in reader:
+                log(f"  解析: {file_path}")
+                file_budgets[file_path] = limits.for_file(file_path)
+                # 在预算外等待工作进程，工作进程中的解析耗时计入文件预算
+                prepared = parallel.take(file_path, source_code) if parallel is not None else None
+                if prepared is not None:
+                    file_budgets[file_path].spent += prepared[1]
+                try:
+                    with file_budgets[file_path], profiler.stage('parse', file=file_path) as record:
+                        parsed = sources.misses - sources.content_hits
+                        ast = sources.parse(file_path, source_code, parse=prepared[0] if prepared else None)
+                        if sources.misses - sources.content_hits > parsed:
+                            record.items = sum(len(c.functions) for c in ast.contracts)
+                        else:
+                            profiler.count('parse.cache_hits')
+                except BudgetExceeded as e:
+                    # 保留已解析的部分合约，继续后续阶段
+                    ast = e.partial_result or AST(source_code=source_code, file_path=file_path)
+                    partial.append(partial_record(file_path, 'parse', e))
+                    log(Fore.RED + f"  部分分析: {file_path} (parse) - {e}" + Style.RESET_ALL)
+                yield ast
+    
+    log(Fore.YELLOW + "正在解析合约..." + Style.RESET_ALL)
+    if 'imports' in plan or 'inheritance' in plan:
+        # 导入和继承需要整个项目：先解析所有文件，再逐个文件检测和分析
+        all_asts = list(parse_files())
+        
+        # 导入的文件只解析一次，所有导入它的项目共享同一个AST
+        for ast in all_asts:
+            def load_imports():
+                with profiler.stage('parse.imports', file=ast.file_path):
+                    dependencies[ast.file_path] = plan.memo(
+                        'imports', ast.file_path, lambda: sources.dependencies(ast.file_path))
+            
+            dependencies[ast.file_path] = []
+            if 'imports' in plan:
+                run_stage(ast, 'parse.imports', load_imports)
+        
+        # 继承关系（每个项目计算一次，检测器和调用图共享）
+        project_asts = list(all_asts)
+        for dependency_asts in dependencies.values():
+            project_asts.extend(dependency_asts)
+        if 'inheritance' in plan:
+            with profiler.stage('analysis.inheritance'):
+                inheritance = InheritanceResolver(project_asts, dependencies)
+        
+        # 入口点和可达的函数（每个项目计算一次）
+        if 'reachability' in plan:
+            with profiler.stage('analysis.reachability') as record:
+                reachability = Reachability(project_asts, inheritance)
+                record.items = len(reachability)
+        del project_asts
+        asts = _drain(all_asts)
+        del all_asts
+    else:
+        # 不需要跨文件信息：解析、检测和分析逐个文件流水进行
+        asts = parse_files()
+    for detector in detectors:
+        detector.inheritance = inheritance
+    
+    # 执行分析
+    call_graph_data = None
+    taint_paths = []
+    control_flow_data = {}
+    data_flow_data = {}
+    entry_points_data = {}
+    
+    def file_functions(ast) -> List[Tuple[Any, Any]]:
+        """文件中要检测和分析的 (合约, 函数)：reachable_only 时去掉从入口点不可达的函数"""
+        functions = [(contract, func) for contract in ast.contracts for func in contract.functions]
+        if reachable_only and reachability is not None:
+            reachable = [(contract, func) for contract, func in functions if reachability.reachable(func)]
+            profiler.count('reachability.pruned_functions', len(functions) - len(reachable))
+            return reachable
+        return functions
+    
+    def detect_file(ast, functions) -> bool:
+        """在一个文件的函数上执行所有检测器，stop 要求提前结束时返回 True"""
+        if not _has_bodies(ast):
+            # 只有声明的文件（如接口）：检测器只检查函数体，没有可检测的内容
+            profiler.count('prefilter.declaration_only_files')
+            return False
+        with profiler.stage('prefilter', file=ast.file_path):
+            index = KeywordIndex(scanner, ast.source_code)
+        lines = ast.source_code.split('\n')
+        
+        for detector in detectors:
+            issues = []
+            prefix = f'prefilter.{detector.name}'
+            for unit, total in (('files', 1), ('functions', len(functions))):
+                profiler.count(f'{prefix}.{unit}.total', total)
+                profiler.count(f'{prefix}.{unit}.skipped', 0)
+            # 文件中没有任何触发词时跳过整个文件
+            if not detector.triggered(index):
+                profiler.count(f'{prefix}.files.skipped')
+                profiler.count(f'{prefix}.functions.skipped', len(functions))
+                continue
+            
+            def detect():
+                with limits.for_detector(detector.name, ast.file_path), \
+                        profiler.stage(f'detector.{detector.name}', file=ast.file_path) as record:
+                    for contract, func in functions:
+                        if not detector.triggered(index, func.start, func.end):
+                            profiler.count(f'{prefix}.functions.skipped')
+                            continue
+                        check_budget()
+                        with profiler.function(_function_key(ast, contract, func)):
+                            found = cached(
+                                f'detector.{detector.name}', ast, contract, func,
+                                lambda: detector.detect_function(ast, contract, func),
+                                lambda issues, delta: [detector.relocate(issue, ast.file_path, delta)
+                                                       for issue in issues])
+                        found = _filter_by_severity(found, min_severity)
+                        fingerprint_issues(found, contract.name, lines)
+                        if reachability is not None:
+                            exposed = reachability.entry_points(func)
+                            for issue in found:
+                                issue.entry_points = exposed
+                        issues.extend(found)
+                        record.items += len(found)
+            
+            run_stage(ast, 'detector', detect, detector=detector.name)
+            if issues:
+                log(f"  {detector.name}: 发现 {len(issues)} 个问题")
+            if stop is None:
+                all_issues.extend(issues, detector, project)
+                continue
+            # 逐个加入，达到上限后不再加入其余的问题
+            for issue in issues:
+                first_row = len(all_issues)
+                all_issues.add(issue, detector, project)
+                if len(all_issues) > first_row and stop(range(first_row, len(all_issues))):
+                    return True
+        return False
+    
+    def analyze_file(ast, functions, clear_graph, record=None):
+        """在一个文件上执行调用图（合并到所有文件的调用图中）和按函数的分析（只分析 functions）"""
+        def call_graph():
+            with profiler.stage('analysis.call_graph', file=ast.file_path):
+                if record is not None:
+                    record['call_graph'] = []  # 超出预算时该文件没有贡献
+                ops = call_graph_analyzer.summarize(ast, dependencies=dependencies.get(ast.file_path, []),
+                                                    inheritance=inheritance)
+                if clear_graph:
+                    call_graph_analyzer.graph.clear()
+                call_graph_analyzer.merge(ops)
+                if record is not None:
+                    record['call_graph'] = ops
+        
+        # 污点分析
+        def taint():
+            with profiler.stage('analysis.taint', file=ast.file_path) as stage_record:
+                for contract, func in functions:
+                    with profiler.function(_function_key(ast, contract, func)):
+                        paths = cached('analysis.taint', ast, contract, func,
+                                       lambda: taint_analyzer.analyze_function(func),
+                                       taint_analyzer.relocate)
+                    taint_paths.extend(paths)
+                    if record is not None:
+                        record['taint_paths'].extend(paths)
+                    stage_record.items += len(paths)
+        
+        # 控制流分析
+        flows = record['control_flow'] if record is not None else control_flow_data
+        
+        def control_flow():
+            with profiler.stage('analysis.control_flow', file=ast.file_path) as stage_record:
+                for contract, func in functions:
+                    with profiler.function(_function_key(ast, contract, func)):
+                        # 控制流图与行号无关，直接共享
+                        flows[f"{contract.name}.{func.name}"] = cached(
+                            'analysis.control_flow', ast, contract, func,
+                            lambda: control_flow_analyzer.analyze_function(func))
+                    stage_record.items += 1
+        
+        # 数据流分析
+        data_flows = record['data_flow'] if record is not None else data_flow_data
+        
+        def data_flow():
+            with profiler.stage('analysis.data_flow', file=ast.file_path) as stage_record:
+                for contract, func in functions:
+                    with profiler.function(_function_key(ast, contract, func)):
+                        data_flows[f"{contract.name}.{func.name}"] = cached(
+                            'analysis.data_flow', ast, contract, func,
+                            lambda: data_flow_analyzer.analyze_function(func),
+                            data_flow_analyzer.relocate)
+                    stage_record.items += 1
+        
+        # 只有声明的文件只加入调用图（合约节点），跳过按函数体的分析
+        stages = [('call_graph', call_graph)]
+        if _has_bodies(ast):
+            stages += [('taint', taint), ('control_flow', control_flow), ('data_flow', data_flow)]
+        for name, stage in stages:
+            if name in plan:
+                run_stage(ast, f'analysis.{name}', stage)
+        if record is not None:
+            control_flow_data.update(flows)
+            data_flow_data.update(data_flows)
+    
+    # 逐个文件检测和分析，完成后释放文件的AST（不再被其他文件导入时）
+    log(Fore.YELLOW + "正在执行安全检测..." + Style.RESET_ALL)
+    processed = 0
+    stopped = False
+    try:
+        for ast in asts:
+            record = None
+            if records is not None:
+                record = records[ast.file_path] = {'issues': [], 'call_graph': None, 'taint_paths': [],
+                                                   'control_flow': {}, 'data_flow': {}, 'entry_points': {},
+                                                   'partial': []}
+            first_row = len(all_issues)
+            functions = file_functions(ast)
+            if reachability is not None:
+                entry_points = reachability.summary(ast)
+                entry_points_data.update(entry_points)
+                if record is not None:
+                    record['entry_points'] = entry_points
+            stopped = detect_file(ast, functions)
+            if stopped:
+                # 不再需要其余的分析：已完成部分的数据作为截断的结果
+                if parallel is not None:
+                    parallel.cancel()
+                remaining = len(files) - processed - 1
+                log(Fore.RED + f"  提前结束: {ast.file_path}" + (f"，之后的 {remaining} 个文件未检测" if remaining else "")
+                    + Style.RESET_ALL)
+                yield ast.file_path, range(first_row, len(all_issues))
+                break
+            if record is not None:
+                # 一个文件的问题是存储中连续的行（去重键包含文件路径，合并只发生在同一文件内）
+                record['issues'] = [all_issues.issue(row) for row in range(first_row, len(all_issues))]
+            # 第一个文件清空调用图，后续文件追加到图中
+            analyze_file(ast, functions, clear_graph=(processed == 0), record=record)
+            processed += 1
+            sources.release(ast.file_path)
+            dependencies.pop(ast.file_path, None)
+            file_budgets.pop(ast.file_path, None)
+            fingerprints.clear()
+            yield ast.file_path, range(first_row, len(all_issues))
+    finally:
+        asts.close()
+    
+    # 所有文件分析完成后，生成调用图数据
+    if processed and 'call_graph' in plan:
+        with profiler.stage('analysis.call_graph') as record:
+            call_graph_data = call_graph_analyzer.to_dict()
+            record.items = len(call_graph_data.get('nodes', []))
+    
+    # 部分分析记录按文件顺序排列（同一文件内保持发生的顺序），与分片合并的结果一致
+    order = {file_path: i for i, (file_path, _) in enumerate(files)}
+    partial.sort(key=lambda entry: order.get(entry['file'], len(order)))
+    if records is not None:
+        for entry in partial:
+            if entry['file'] in records:
+                records[entry['file']]['partial'].append(entry)
+    
+    if call_graph_data:
+        log(f"  调用图: {len(call_graph_data.get('nodes', []))} 个节点")
+    if taint_paths:
+        log(f"  污点分析: 发现 {len(taint_paths)} 条传播路径")
+    if control_flow_data:
+        log(f"  控制流分析: 分析了 {len(control_flow_data)} 个函数")
+    if data_flow_data:
+        log(f"  数据流分析: 分析了 {len(data_flow_data)} 个函数")
+    if reachability is not None:
+        log(f"  入口点: {len(reachability)} 个" + ("（只检测和分析可达的函数）" if reachable_only else ""))
+    if all_issues.merged > merged:
+        log(f"  合并重复问题: {all_issues.merged - merged} 个")
+    if partial:
+        log(Fore.RED + f"  部分分析: {len(partial)} 项超出预算" + Style.RESET_ALL)
+    for error in (inheritance.errors if inheritance is not None else []):
+        log(Fore.YELLOW + f"  继承: {error}" + Style.RESET_ALL)
+    
+    return all_issues.view(project), {
+        'call_graph': call_graph_data,
+        'taint_paths': taint_paths,
+        'control_flow': control_flow_data,
+        'data_flow': data_flow_data,
+        'entry_points': entry_points_data,
+        'partial': partial,
+        'truncated': {'files_scanned': processed + 1, 'files_total': len(files)} if stopped else None
+    }
+
+
+def run_files(*args, **kwargs) -> Tuple[IssueView, Dict]:
+    """处理一组文件，返回问题和分析数据（参数与 iter_files 相同）"""
+    stream = iter_files(*args, **kwargs)
+    while True:
+        try:
+            next(stream)
+        except StopIteration as done:
+            return done.value
+
+
+def _filter_by_severity(issues: List, min_severity: Severity):
+    """按风险等级过滤问题"""
+    if min_severity is Severity.LOW:
+        return issues
+    return [issue for issue in issues if issue.severity.at_least(min_severity)]
+
+
+def issue_limit(issue_store: IssueStore, limit: int,
+                exclude_fingerprints: FrozenSet[str] = frozenset()) -> Callable[[range], bool]:
+    """iter_files 的 stop：不在 exclude_fingerprints（基线）中的问题达到 limit 个时提前结束"""
+    found = 0
+
+    def stop(rows: range) -> bool:
+        nonlocal found
+        found += sum(1 for row in rows if issue_store.fingerprint(row) not in exclude_fingerprints)
+        return found >= limit
+
+    return stop
+
+
+def report_dir(base_output_dir: str, has_both: bool, project: str = None) -> Path:
+    """一组文件的报告目录：单文件和项目都有时分别放在 single_files/ 和 projects/ 下"""
+    if project is None:
+        return Path(base_output_dir) / "single_files" if has_both else Path(base_output_dir)
+    return (Path(base_output_dir) / "projects" if has_both else Path(base_output_dir)) / project
+
+
+def write_reports(issues, data: Dict, output_dir: Path, format: str = 'both',
+                  profiler: Profiler = None, performance: Dict = None) -> List[str]:
+    """
+    写出一组文件的报告
+
+    Args:
+        issues: 问题（IssueView 或 Issue 列表）
+        data: run_files 返回的分析数据
+        output_dir: 报告目录（需已存在）
+        format: json、html 或 both
+        profiler: 剖析器（在其他线程中写报告时应使用单独的剖析器）
+        performance: JSON报告中的性能剖析数据
+
+    Returns:
+        生成的报告路径
+    """
+    profiler = profiler or Profiler(enabled=False)
+    generated = []
+    if format in ['json', 'both']:
+        json_path = str(Path(output_dir) / "report.json")
+        with profiler.stage('report.json'):
+            JSONReporter().generate(issues, data['call_graph'], data['taint_paths'],
+                                    data['control_flow'], data['data_flow'], json_path,
+                                    partial=data['partial'], performance=performance,
+                                    truncated=data.get('truncated'), entry_points=data['entry_points'])
+        generated.append(json_path)
+    
+    if format in ['html', 'both']:
+        html_path = str(Path(output_dir) / "report.html")
+        with profiler.stage('report.html'):
+            HTMLReporter().generate(issues, data['call_graph'], data['taint_paths'],
+                                    data['control_flow'], data['data_flow'], html_path,
+                                    partial=data['partial'], truncated=data.get('truncated'),
+                                    entry_points=data['entry_points'])
+        generated.append(html_path)
+    return generated
+
+
+@dataclass
+class AuditOptions:
+    """审计选项（与命令行选项对应）"""
+    severity: str = 'low'  # 最低风险等级：critical/high/medium/low
+    analyses: Union[str, Sequence[str]] = 'all'  # 分析名称列表，或 'all'/'none'
+    detectors: Union[str, Sequence[str]] = 'all'  # 检测器名称列表，或 'all'/'none'
+    reachable_only: bool = False  # 只检测和分析从 public/external 入口点可达的函数
+    jobs: int = 1  # 解析文件的工作进程数，0 表示 CPU 核数
+    timings: Optional[str] = None  # 解析耗时记录文件（多进程解析时按之前的实际耗时安排任务）
+    artifacts: Sequence[str] = ()  # 编译产物文件或目录：使用其中编译器生成的AST（见 parser.artifacts）
+    file_timeout: Optional[float] = None  # 秒
+    file_memory: Optional[int] = None  # MB
+    detector_timeout: Optional[float] = None  # 秒
+    detector_memory: Optional[int] = None  # MB
+    baseline: Optional[str] = None  # 之前生成的 JSON 报告或报告目录，只报告不在基线中的问题
+    max_issues: Optional[int] = None  # 发现这么多（不在基线中的）问题后提前结束，结果标记为截断
+    output_dir: Optional[str] = None  # 指定时写出报告（目录结构与命令行相同）
+    format: str = 'both'  # 报告格式：json/html/both
+    verbose: bool = False  # 输出进度信息
+
+    def limits(self) -> BudgetLimits:
+        """预算配置"""
+        return BudgetLimits(
+            file_time=self.file_timeout,
+            file_memory=self.file_memory * 1024 * 1024 if self.file_memory else None,
+            detector_time=self.detector_timeout,
+            detector_memory=self.detector_memory * 1024 * 1024 if self.detector_memory else None
+        )
+
+
+@dataclass
+class AuditGroup:
+    """一组文件（单文件或一个项目）的审计结果"""
+    project: str  # 项目名；单文件为空字符串
+    files: List[str]
+    issues: IssueView  # 已按基线过滤
+    call_graph: Optional[Dict] = None
+    taint_paths: List = field(default_factory=list)
+    control_flow: Dict = field(default_factory=dict)
+    data_flow: Dict = field(default_factory=dict)
+    entry_points: Dict = field(default_factory=dict)  # 文件:合约 -> 入口点和不可达的函数
+    partial: List[Dict] = field(default_factory=list)  # 超出预算、只完成了部分分析的文件/检测器
+    truncated: Optional[Dict] = None  # 达到 max_issues 提前结束时的截断信息
+    reports: List[str] = field(default_factory=list)  # 写出的报告路径
+
+
+class AuditResult:
+    """
+    一次审计的结果
+
+    遍历结果时逐个文件检测和分析，每个文件完成后产生该文件的问题（已按风险等级和基线过滤）。
+    遍历结束（或调用 wait）后 groups 中是各组文件的分析数据；达到 max_issues 提前结束时
+    truncated 为 True，之后的组不在 groups 中。
+    提前结束遍历时应调用 close（或使用 with），释放源码映射和工作进程。
+    """
+
+    def __init__(self, issue_store: IssueStore, baseline: Baseline):
+        self.groups: Dict[str, AuditGroup] = {}  # 项目名 -> 结果；单文件组的键为空字符串
+        self.reports: List[str] = []
+        self.truncated = False
+        self.issue_store = issue_store
+        self.baseline = baseline
+        self._stream: Iterator[Issue] = iter(())
+
+    def __iter__(self) -> Iterator[Issue]:
+        return self
+
+    def __next__(self) -> Issue:
+        return next(self._stream)
+
+    def wait(self) -> 'AuditResult':
+        """完成剩余的文件"""
+        for _ in self._stream:
+            pass
+        return self
+
+    @property
+    def issues(self) -> IssueView:
+        """所有问题（完成剩余的文件后）"""
+        self.wait()
+        return self.issue_store.view().where(exclude_fingerprints=self.baseline.fingerprints)
+
+    def summary(self) -> Dict:
+        """按风险等级的计数（与报告中的 summary 格式相同）"""
+        return self.issues.summary()
+
+    def close(self):
+        """停止审计"""
+        self._stream.close()
+
+    def __enter__(self) -> 'AuditResult':
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+
+class Auditor:
+    """
+    可重复使用的审计器（不是线程安全的，同一时间只应进行一次审计）
+
+    解析器、按函数指纹缓存的检测和分析结果以及解析耗时记录在多次审计之间共享；文件的解析结果
+    只在一次审计内复用（两次审计之间文件可能被修改，函数指纹和耗时记录由内容计算，不受影响）。
+    编译产物每次审计重新索引（两次审计之间可能重新编译）。
+
+    结果缓存最多保留 cache_size 个函数级结果（按最近使用淘汰）；长期运行的调用方可以在
+    审计之间调用 clear_cache() 释放全部缓存。
+    """
+
+    def __init__(self, options: AuditOptions = None, cache_size: Optional[int] = RESULT_CACHE_SIZE):
+        """
+        Args:
+            options: 默认的审计选项
+            cache_size: 最多缓存的函数级结果数，None 表示不限制
+        """
+        self.options = options or AuditOptions()
+        self.parser = SolidityParser()
+        self.results = ResultCache(cache_size)
+        self.cost_model = CostModel(TimingCache(self.options.timings))
+
+    def clear_cache(self):
+        """丢弃之前审计缓存的检测和分析结果（不影响解析耗时记录）"""
+        self.results.clear()
+
+    def audit(self, paths: Union[str, os.PathLike, Iterable[Union[str, os.PathLike]]],
+              options: AuditOptions = None) -> AuditResult:
+        """
+        审计文件或目录
+
+        目录中的文件与命令行一样分为单文件和项目（classify_files），每个项目单独分析。
+
+        Args:
+            paths: 一个或多个 .sol 文件或目录
+            options: 本次审计的选项（默认为创建审计器时的选项）
+
+        Raises:
+            FileNotFoundError: 路径不存在
+            ValueError: 选项无效（未知的分析或检测器、无法读取的基线）
+        """
+        options = options or self.options
+        if options.max_issues is not None and options.max_issues < 1:
+            raise ValueError(f"max_issues 应大于 0: {options.max_issues}")
+        paths = [paths] if isinstance(paths, (str, os.PathLike)) else list(paths)
+        for path in paths:
+            if not Path(path).exists():
+                raise FileNotFoundError(f"路径不存在: {path}")
+
+        graph = default_graph()
+        analyses = select_analyses(options.analyses, graph)
+        if options.reachable_only and 'reachability' not in analyses:
+            analyses.append('reachability')
+        min_severity = Severity.from_string(options.severity)
+        detectors, _ = schedule_detectors(select_detectors(options.detectors, default_detectors()), min_severity)
+        plan = AnalysisPlan(graph, analyses, detectors)
+        baseline = Baseline.load(options.baseline) if options.baseline else Baseline()
+
+        result = AuditResult(IssueStore(), baseline)
+        result._stream = self._run(result, paths, options, detectors, plan, min_severity)
+        return result
+
+    def _run(self, result: AuditResult, paths: List, options: AuditOptions, detectors: List[BaseDetector],
+             plan: AnalysisPlan, min_severity: Severity) -> Iterator[Issue]:
+        log = print if options.verbose else _quiet
+        limits = options.limits()
+        jobs = options.jobs if options.jobs > 0 else (os.cpu_count() or 1)
+        store = SourceStore()
+        if options.timings != self.cost_model.timings.path:
+            self.cost_model = CostModel(TimingCache(options.timings))
+        parallel = ParallelParser(jobs, limits, cost_model=self.cost_model) if jobs > 1 else None
+        parser = ArtifactParser(ArtifactIndex(list(options.artifacts))) if options.artifacts else self.parser
+        known = result.baseline.fingerprints
+        issue_store = result.issue_store
+        stop = issue_limit(issue_store, options.max_issues, known) if options.max_issues else None
+        try:
+            groups = _classify(paths, store)
+            has_both = bool(groups) and groups[0][0] == '' and len(groups) > 1
+            sources = SourceCache(parser, ImportResolver())
+            for project, files in groups:
+                log(Fore.YELLOW + (f"\n处理项目: {project}" if project else "\n处理单文件...") + Style.RESET_ALL)
+                stream = iter_files(files, parser, detectors,
+                                    call_graph_analyzer=CallGraphAnalyzer(),
+                                    taint_analyzer=TaintAnalyzer(),
+                                    control_flow_analyzer=ControlFlowAnalyzer(),
+                                    data_flow_analyzer=DataFlowAnalyzer(),
+                                    limits=limits, sources=sources, results=self.results,
+                                    min_severity=min_severity, plan=plan, store=store, parallel=parallel,
+                                    issue_store=issue_store, project=project, log=log, stop=stop,
+                                    reachable_only=options.reachable_only)
+                while True:
+                    try:
+                        _, rows = next(stream)
+                    except StopIteration as done:
+                        issues, data = done.value
+                        break
+                    for row in rows:
+                        issue = issue_store.issue(row)
+                        if issue.fingerprint not in known:
+                            yield issue
+
+                if data['truncated'] is not None:
+                    data['truncated'].update(reason='max-issues', limit=options.max_issues)
+                group = result.groups[project] = AuditGroup(
+                    project, [file_path for file_path, _ in files],
+                    issues.where(exclude_fingerprints=known), **data)
+                if options.output_dir:
+                    output_dir = report_dir(options.output_dir, has_both, project or None)
+                    output_dir.mkdir(parents=True, exist_ok=True)
+                    group.reports = write_reports(group.issues, data, output_dir, options.format)
+                    result.reports.extend(group.reports)
+                if group.truncated is not None:
+                    result.truncated = True
+                    break
+        finally:
+            if parallel is not None:
+                parallel.close()
+                self.cost_model.timings.save()
+            if parser is not self.parser:
+                parser.index.close()
+            store.close()
+
+
+def _classify(paths: List, store: SourceStore) -> List[Tuple[str, List[Tuple[str, Any]]]]:
+    """查找并分类文件，返回 [(项目名, 文件)]，单文件组（项目名为空字符串）在前"""
+    single_files = []
+    projects: Dict[str, List] = {}
+    for path in paths:
+        files = find_solidity_files(str(path), store)
+        if Path(path).is_file():
+            single_files.extend(files)
+            continue
+        classified = classify_files(files, str(path))
+        single_files.extend(classified['single_files'])
+        for name, project_files in classified['projects'].items():
+            projects.setdefault(name, []).extend(project_files)
+    groups = [('', single_files)] if single_files else []
+    return groups + list(projects.items())
+
+
+def audit(paths: Union[str, os.PathLike, Iterable[Union[str, os.PathLike]]],
+          options: AuditOptions = None) -> AuditResult:
+    """审计文件或目录（使用一次性的 Auditor，见 Auditor.audit）"""
+    return Auditor(options).audit(paths)
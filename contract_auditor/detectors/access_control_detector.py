@@ -2,54 +2,65 @@
 
 from typing import List
 from .base_detector import BaseDetector, Issue
-from ..parser.ast_builder import AST, FunctionNode
+from ..parser.ast_builder import AST, ContractNode, FunctionNode
+from ..parser.ir import function_ir
 from ..utils.severity import Severity
 
 
 class AccessControlDetector(BaseDetector):
     """检测权限控制缺失"""
     
-    def detect(self, ast: AST) -> List[Issue]:
+    SEVERITIES = (Severity.HIGH, Severity.MEDIUM)
+    REQUIRES = ('inheritance',)  # 修饰符可能定义在基合约中
+    
+    # 关键函数名模式
+    CRITICAL_FUNCTIONS = [
+        'withdraw', 'transfer', 'mint', 'burn', 'pause', 'unpause',
+        'setOwner', 'setAdmin', 'upgrade', 'destroy', 'kill', 'selfdestruct'
+    ]
+    
+    def detect_function(self, ast: AST, contract: ContractNode, func: FunctionNode) -> List[Issue]:
         """检测权限控制问题"""
-        issues = []
+        # 检查关键函数
+        is_critical = any(cf in func.name.lower() for cf in self.CRITICAL_FUNCTIONS)
         
-        # 关键函数名模式
-        critical_functions = [
-            'withdraw', 'transfer', 'mint', 'burn', 'pause', 'unpause',
-            'setOwner', 'setAdmin', 'upgrade', 'destroy', 'kill', 'selfdestruct'
-        ]
+        if not is_critical:
+            # 检查是否修改状态变量
+            if not func.state_changes:
+                return []
+        
+        # 检查有权限控制
+        has_access_control = (self._has_access_control(func, contract)
+                              or self._has_checking_modifier(ast, contract, func))
+        
+        if has_access_control or not (is_critical or func.state_changes):
+            return []
         
-        for contract in ast.contracts:
-            for func in contract.functions:
-                # 检查关键函数
-                is_critical = any(cf in func.name.lower() for cf in critical_functions)
-                
-                if not is_critical:
-                    # 检查是否修改状态变量
-                    if not func.state_changes:
-                        continue
-                
-                # 检查有权限控制
-                has_access_control = self._has_access_control(func, contract)
-                
-                if not has_access_control and (is_critical or func.state_changes):
-                    # 检查构造函数或view函数
-                    if func.name == contract.name or func.is_view or func.is_pure:
-                        continue
-                    
-                    severity = Severity.HIGH if is_critical else Severity.MEDIUM
-                    
-                    issues.append(Issue(
-                        issue_type="Access Control",
-                        severity=severity,
-                        file_path=ast.file_path,
-                        line=func.line,
-                        function=func.name,
-                        description=f"函数 {func.name} 缺少访问控制修饰符，可能允许未授权访问。",
-                        recommendation="添加 onlyOwner、onlyRole 或其他访问控制修饰符，确保只有授权用户可以调用此函数。"
-                    ))
+        # 检查构造函数或view函数
+        if func.name == contract.name or func.is_view or func.is_pure:
+            return []
         
-        return issues
+        severity = Severity.HIGH if is_critical else Severity.MEDIUM
+        
+        return [Issue(
+            issue_type="Access Control",
+            severity=severity,
+            file_path=ast.file_path,
+            line=func.line,
+            function=func.name,
+            description=f"函数 {func.name} 缺少访问控制修饰符，可能允许未授权访问。",
+            recommendation="添加 onlyOwner、onlyRole 或其他访问控制修饰符，确保只有授权用户可以调用此函数。"
+        )]
+    
+    def _has_checking_modifier(self, ast: AST, contract: ContractNode, func: FunctionNode) -> bool:
+        """函数使用的修饰符（包括基合约中定义的）是否检查调用者"""
+        for modifier in self._resolved_modifiers(ast, contract, func):
+            body = modifier.body.lower()
+            if 'msg.sender' in body and any(kw in body for kw in ('require', 'if', 'revert', 'assert')):
+                return True
+            if any(check in body for check in ('_checkowner', '_checkrole', 'hasrole')):
+                return True
+        return False
     
     def _has_access_control(self, func: FunctionNode, contract) -> bool:
         """检查是否有访问控制"""
@@ -63,11 +74,11 @@ class AccessControlDetector(BaseDetector):
             if any(acm in mod for acm in access_control_modifiers):
                 return True
         
-        # 检查函数体中是否有权限检查
-        access_control_keywords = ['require', 'assert', 'onlyOwner', 'msg.sender']
-        body_lower = func.body.lower()
+        # 检查函数体中是否有权限检查（注释和字符串中的不算）
+        ir = function_ir(func)
+        has_require = any('require' in name.lower() for name in ir.names)
         
-        if 'require' in body_lower and 'msg.sender' in body_lower:
+        if has_require and ir.mentions('msg.sender'):
             return True
         
         return False
@@ -1,16 +1,23 @@
 """检测器基类"""
 
+import copy
 from abc import ABC, abstractmethod
-from typing import List, Dict
-from ..parser.ast_builder import AST
+from typing import List, Dict, Optional, Tuple
+from ..parser.ast_builder import AST, ContractNode, FunctionNode, ModifierNode
+from ..analyzer.inheritance import ContractView, InheritanceResolver
+from ..utils.keyword_index import KeywordIndex
 from ..utils.severity import Severity
 
 
 class Issue:
     """漏洞问题"""
+    
+    __slots__ = ('type', 'severity', 'file_path', 'line', 'function', 'description', 'recommendation',
+                 'related_lines', 'contract', 'fingerprint', 'detectors', 'merged_types', 'entry_points')
+    
     def __init__(self, issue_type: str, severity: Severity, file_path: str, 
                  line: int, function: str = "", description: str = "", 
-                 recommendation: str = ""):
+                 recommendation: str = "", related_lines: List[int] = None):
         self.type = issue_type
         self.severity = severity
         self.file_path = file_path
@@ -18,6 +25,12 @@ class Issue:
         self.function = function
         self.description = description
         self.recommendation = recommendation
+        self.related_lines = related_lines or []  # 与问题相关的其他行（如重入中的状态修改）
+        self.contract = ""  # 所在合约（由调用方设置）
+        self.fingerprint: Optional[str] = None  # 稳定指纹（见 utils.baseline，由调用方设置）
+        self.detectors: List[str] = []  # 报告此问题的检测器（见 IssueStore）
+        self.merged_types: List[str] = []  # 合并到此问题中的其他问题类型
+        self.entry_points: List[str] = []  # 能到达问题所在函数的入口点（见 analyzer.reachability，由调用方设置）
     
     def to_dict(self) -> Dict:
         """转换为字典"""
@@ -28,17 +41,35 @@ class Issue:
             "line": self.line,
             "function": self.function,
             "description": self.description,
-            "recommendation": self.recommendation
+            "recommendation": self.recommendation,
+            "fingerprint": self.fingerprint,
+            "detectors": self.detectors,
+            "merged_types": self.merged_types,
+            "entry_points": self.entry_points
         }
 
 
 class BaseDetector(ABC):
     """检测器基类"""
     
+    # 检测器可能产生的风险等级（子类应声明，用于按 --severity 跳过检测器）
+    SEVERITIES: Tuple[Severity, ...] = tuple(Severity)
+    
+    # 检测器用到的分析（见 analyzer.scheduler），只有被选中的检测器需要的分析才会执行
+    REQUIRES: Tuple[str, ...] = ()
+    
+    # 触发词：函数源码中不出现其中任何一个时检测器不可能报告问题（见 utils.keyword_index），
+    # None 表示不做预过滤
+    TRIGGER_TOKENS: Optional[Tuple[str, ...]] = None
+    
+    # 问题类型 -> 根因：不同检测器在同一位置报告的根因相同的问题合并为一个（见 IssueStore），
+    # 未列出的类型以类型本身为根因
+    ROOT_CAUSES: Dict[str, str] = {}
+    
     def __init__(self):
         self.name = self.__class__.__name__
+        self.inheritance: InheritanceResolver = None  # 当前项目的继承解析器（由调用方设置）
     
-    @abstractmethod
     def detect(self, ast: AST) -> List[Issue]:
         """
         检测漏洞
@@ -46,8 +77,68 @@ class BaseDetector(ABC):
         Args:
             ast: AST对象
             
+        Returns:
+            漏洞列表
+        """
+        issues = []
+        for contract in ast.contracts:
+            for func in contract.functions:
+                issues.extend(self.detect_function(ast, contract, func))
+        return issues
+    
+    @abstractmethod
+    def detect_function(self, ast: AST, contract: ContractNode, func: FunctionNode) -> List[Issue]:
+        """
+        检测单个函数（检测器按函数独立工作）
+        
+        Args:
+            ast: 函数所在文件的AST
+            contract: 函数所在合约
+            func: 函数节点
+            
         Returns:
             漏洞列表
         """
         pass
-
+    
+    def can_report(self, min_severity: Severity) -> bool:
+        """是否可能产生不低于给定等级的问题"""
+        return any(severity.at_least(min_severity) for severity in self.SEVERITIES)
+    
+    def triggered(self, index: KeywordIndex, start: int = 0, end: int = None) -> bool:
+        """源码范围 [start, end) 内是否出现触发词（未声明触发词时总是返回 True）"""
+        if self.TRIGGER_TOKENS is None or index is None:
+            return True
+        return index.any_of(self.TRIGGER_TOKENS, start, end)
+    
+    def issue_key(self, issue: Issue) -> Tuple[str, int, str]:
+        """问题的去重键 (文件, 行号, 根因)"""
+        return issue.file_path, issue.line, self.ROOT_CAUSES.get(issue.type, issue.type)
+    
+    def _view(self, contract: ContractNode) -> ContractView:
+        """合约的扁平化视图；未设置继承解析器时只包含合约自身的成员"""
+        if self.inheritance is not None:
+            return self.inheritance.view(contract)
+        return ContractView(contract, [contract])
+    
+    def _resolved_modifiers(self, ast: AST, contract: ContractNode, func: FunctionNode) -> List[ModifierNode]:
+        """函数使用的修饰符定义（包括基合约中定义的）"""
+        return self._view(contract).function_modifiers(ast, func)
+    
+    def relocate(self, issue: Issue, file_path: str, delta_lines: int) -> Issue:
+        """
+        将问题复制到另一处相同的函数上（内容相同的函数共享检测结果）
+        
+        Args:
+            issue: 原问题
+            file_path: 目标文件
+            delta_lines: 目标函数相对原函数的行号偏移
+            
+        Returns:
+            新的问题对象
+        """
+        relocated = copy.copy(issue)
+        relocated.file_path = file_path
+        relocated.line = issue.line + delta_lines
+        relocated.related_lines = [line + delta_lines for line in issue.related_lines]
+        return relocated
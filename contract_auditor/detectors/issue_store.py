@@ -0,0 +1,310 @@
+"""问题存储与合并
+
+不同检测器经常从不同角度报告同一个问题，例如同一个未检查返回值的低级别 call
+会同时被 ExternalCallDetector 和 UncheckedReturnDetector 报告；同一组状态修改之前的
+多个外部调用会被 ReentrancyDetector 分别报告。IssueStore 按 (文件, 行号, 根因) 建立索引
+（见 BaseDetector.issue_key），检测器每产生一个问题就查一次索引：
+- 新的键：加入存储，保持产生的顺序
+- 已有的键：合并到已有问题中，记录检测器标签，保留风险等级最高的问题作为主问题，
+  其他问题的行号并入 related_lines，类型记入 merged_types
+
+存储按列组织，不为每个问题保留 Issue 对象：类型、文件、函数等字符串在字符串表中只存一份，
+各列只存索引（array），风险等级存为小整数。按风险等级、类型、文件和项目的计数在加入和
+合并时随之更新，摘要不需要再遍历问题。IssueView 是存储中一组行的视图，
+遍历时才按行构造 Issue 对象。
+"""
+
+from array import array
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+from .base_detector import BaseDetector, Issue
+from ..utils.severity import Severity
+
+_SEVERITY_BY_RANK = {severity.rank: severity for severity in Severity}
+_SUMMARY_KEYS = [(severity.rank, severity.name.lower()) for severity in Severity]
+
+
+def _summary(total: int, counts: List[int]) -> Dict:
+    """与报告中 summary 格式相同的摘要"""
+    summary = {"total_issues": total}
+    for rank, name in _SUMMARY_KEYS:
+        summary[name] = counts[rank]
+    return summary
+
+
+class IssueStore:
+    """按 (文件, 行号, 根因) 去重的列式问题存储"""
+
+    def __init__(self):
+        self._strings: List[str] = []
+        self._string_ids: Dict[str, int] = {}
+        self._groups: List[Tuple[int, ...]] = [()]  # 字符串索引的元组（检测器标签、合并的类型）
+        self._group_ids: Dict[Tuple[int, ...], int] = {(): 0}
+        self._index: Dict[int, int] = {}  # 去重键（打包为一个整数，见 _key）-> 行
+
+        # 列
+        self._type = array('I')
+        self._severity = array('b')
+        self._file = array('I')
+        self._line = array('i')
+        self._function = array('I')
+        self._contract = array('I')
+        self._description = array('I')
+        self._recommendation = array('I')
+        self._project = array('I')
+        self._detectors = array('I')
+        self._merged_types = array('I')
+        self._entry_points = array('I')
+        self._related: List[Tuple[int, ...]] = []
+        self._fingerprint: List[Optional[str]] = []
+
+        # 汇总（加入和合并时更新）
+        self._severity_counts = [0] * (max(_SEVERITY_BY_RANK) + 1)
+        self._type_counts: Dict[int, int] = {}
+        self._file_counts: Dict[int, int] = {}
+        self._project_rows: Dict[int, array] = {}
+        self._project_severity_counts: Dict[int, List[int]] = {}
+        self.merged = 0  # 被合并掉的问题数
+
+    def add(self, issue: Issue, detector: BaseDetector, project: str = '') -> int:
+        """
+        加入一个问题
+
+        Args:
+            issue: 检测器产生的问题（不会被修改或保留）
+            detector: 产生问题的检测器（提供去重键和标签）
+            project: 问题所属的项目（单文件为空字符串）
+
+        Returns:
+            问题所在的行
+        """
+        key = self._key(*detector.issue_key(issue))
+        row = self._index.get(key)
+        if row is None:
+            row = self._index[key] = self._append(issue, [detector.name], project)
+            return row
+
+        self.merged += 1
+        lines = set(self._related[row])
+        lines.update(issue.related_lines)
+        merged_types = [self._strings[i] for i in self._groups[self._merged_types[row]]]
+        current_type = self._strings[self._type[row]]
+        if issue.severity.rank > self._severity[row]:
+            # 新问题风险更高，作为主问题，原来的主问题并入其中
+            if self._line[row] != issue.line:
+                lines.add(self._line[row])
+            merged_types = [t for t in [current_type] + merged_types + list(issue.merged_types)
+                            if t != issue.type]
+            self._set_primary(row, issue)
+        else:
+            if issue.line != self._line[row]:
+                lines.add(issue.line)
+            merged_types.extend(t for t in [issue.type] + list(issue.merged_types) if t != current_type)
+        self._set_related(row, sorted(lines), list(dict.fromkeys(merged_types)))
+
+        detectors = self._groups[self._detectors[row]]
+        name_id = self._intern(detector.name)
+        if name_id not in detectors:
+            self._detectors[row] = self._group_id(detectors + (name_id,))
+        return row
+
+    def insert(self, issue: Issue, project: str = '') -> int:
+        """
+        原样加入一个已经合并过的问题（如分片结果中的问题），不查去重索引
+
+        检测器标签、related_lines 和 merged_types 取自 issue。
+        """
+        return self._append(issue, issue.detectors, project)
+
+    def extend(self, issues: Iterable[Issue], detector: BaseDetector, project: str = ''):
+        """加入一个检测器产生的一组问题"""
+        for issue in issues:
+            self.add(issue, detector, project)
+
+    def view(self, project: Optional[str] = None) -> 'IssueView':
+        """所有问题，或某个项目（单文件为空字符串）的问题"""
+        if project is None:
+            return IssueView(self)
+        project_id = self._string_ids.get(project)
+        if project_id is None or project_id not in self._project_rows:
+            return IssueView(self, array('I'))
+        return IssueView(self, self._project_rows[project_id], project_id)
+
+    def issues(self) -> List[Issue]:
+        """所有问题（按首次产生的顺序）"""
+        return list(self.view())
+
+    def __len__(self) -> int:
+        return len(self._type)
+
+    def summary(self) -> Dict:
+        """按风险等级的计数"""
+        return _summary(len(self), self._severity_counts)
+
+    def counts_by_type(self) -> Dict[str, int]:
+        """按问题类型的计数"""
+        return {self._strings[i]: count for i, count in self._type_counts.items() if count}
+
+    def counts_by_file(self) -> Dict[str, int]:
+        """按文件的计数"""
+        return {self._strings[i]: count for i, count in self._file_counts.items()}
+
+    def counts_by_project(self) -> Dict[str, Dict]:
+        """按项目的摘要"""
+        return {self._strings[project_id]: _summary(len(rows), self._project_severity_counts[project_id])
+                for project_id, rows in self._project_rows.items()}
+
+    def issue(self, row: int) -> Issue:
+        """按行构造 Issue 对象"""
+        strings = self._strings
+        issue = Issue(issue_type=strings[self._type[row]], severity=_SEVERITY_BY_RANK[self._severity[row]],
+                      file_path=strings[self._file[row]], line=self._line[row],
+                      function=strings[self._function[row]],
+                      description=strings[self._description[row]],
+                      recommendation=strings[self._recommendation[row]],
+                      related_lines=list(self._related[row]))
+        issue.contract = strings[self._contract[row]]
+        issue.fingerprint = self._fingerprint[row]
+        issue.detectors = [strings[i] for i in self._groups[self._detectors[row]]]
+        issue.merged_types = [strings[i] for i in self._groups[self._merged_types[row]]]
+        issue.entry_points = [strings[i] for i in self._groups[self._entry_points[row]]]
+        return issue
+
+    def _append(self, issue: Issue, detectors: Iterable[str], project: str) -> int:
+        """加入一个新行"""
+        row = len(self._type)
+        project_id = self._intern(project)
+        self._type.append(0)
+        self._severity.append(0)
+        self._line.append(0)
+        for column in (self._file, self._function, self._contract, self._description,
+                       self._recommendation, self._merged_types, self._entry_points):
+            column.append(0)
+        self._related.append(())
+        self._fingerprint.append(None)
+        self._project.append(project_id)
+        self._detectors.append(self._group_of(detectors))
+        self._project_rows.setdefault(project_id, array('I')).append(row)
+        self._project_severity_counts.setdefault(project_id, [0] * len(self._severity_counts))
+        file_id = self._intern(issue.file_path)
+        self._file_counts[file_id] = self._file_counts.get(file_id, 0) + 1
+        self._set_primary(row, issue)
+        self._set_related(row, issue.related_lines, issue.merged_types)
+        return row
+
+    def fingerprint(self, row: int) -> Optional[str]:
+        """行的问题指纹"""
+        return self._fingerprint[row]
+
+    def _key(self, file_path: str, line: int, cause: str) -> int:
+        """(文件, 行号, 根因) 打包为一个整数（各占 32 位），比元组键省内存"""
+        return (((line << 32) | self._intern(cause)) << 32) | self._intern(file_path)
+
+    def _intern(self, text: str) -> int:
+        index = self._string_ids.get(text)
+        if index is None:
+            index = self._string_ids[text] = len(self._strings)
+            self._strings.append(text)
+        return index
+
+    def _group_of(self, items: Iterable[str]) -> int:
+        return self._group_id(tuple(self._intern(item) for item in items))
+
+    def _group_id(self, group: Tuple[int, ...]) -> int:
+        index = self._group_ids.get(group)
+        if index is None:
+            index = self._group_ids[group] = len(self._groups)
+            self._groups.append(group)
+        return index
+
+    def _set_primary(self, row: int, issue: Issue):
+        """设置行的主问题字段，并更新按等级和类型的计数"""
+        old_rank, old_type = self._severity[row], self._type[row]
+        project_counts = self._project_severity_counts[self._project[row]]
+        if old_rank:
+            self._severity_counts[old_rank] -= 1
+            project_counts[old_rank] -= 1
+            self._type_counts[old_type] -= 1
+        rank = issue.severity.rank
+        type_id = self._intern(issue.type)
+        self._severity_counts[rank] += 1
+        project_counts[rank] += 1
+        self._type_counts[type_id] = self._type_counts.get(type_id, 0) + 1
+
+        self._type[row] = type_id
+        self._severity[row] = rank
+        self._file[row] = self._intern(issue.file_path)
+        self._line[row] = issue.line
+        self._function[row] = self._intern(issue.function)
+        self._contract[row] = self._intern(issue.contract)
+        self._description[row] = self._intern(issue.description)
+        self._recommendation[row] = self._intern(issue.recommendation)
+        self._entry_points[row] = self._group_of(issue.entry_points)
+        self._fingerprint[row] = issue.fingerprint
+
+    def _set_related(self, row: int, lines: Iterable[int], merged_types: Iterable[str]):
+        self._related[row] = tuple(lines)
+        self._merged_types[row] = self._group_of(merged_types)
+
+
+class IssueView:
+    """存储中一组行的只读视图（遍历时按行构造 Issue）"""
+
+    def __init__(self, store: IssueStore, rows: Optional[array] = None, project_id: Optional[int] = None):
+        """
+        Args:
+            store: 问题存储
+            rows: 视图中的行；None 表示存储中的所有行
+            project_id: 视图是某个项目的全部问题时为项目名的字符串索引（摘要直接取项目的计数）
+        """
+        self._store = store
+        self._rows = rows
+        self._project_id = project_id
+
+    def rows(self) -> Iterable[int]:
+        """视图中的行"""
+        return range(len(self._store)) if self._rows is None else self._rows
+
+    def __len__(self) -> int:
+        return len(self._store) if self._rows is None else len(self._rows)
+
+    def __iter__(self) -> Iterator[Issue]:
+        issue = self._store.issue
+        for row in self.rows():
+            yield issue(row)
+
+    def __bool__(self) -> bool:
+        return len(self) > 0
+
+    def summary(self) -> Dict:
+        """按风险等级的计数（整个存储或整个项目的视图直接取汇总）"""
+        store = self._store
+        if self._rows is None:
+            return store.summary()
+        if self._project_id is not None:
+            return _summary(len(self), store._project_severity_counts[self._project_id])
+        counts = [0] * len(store._severity_counts)
+        severity = store._severity
+        for row in self._rows:
+            counts[severity[row]] += 1
+        return _summary(len(self), counts)
+
+    def where(self, min_severity: Severity = None, exclude_fingerprints: Set[str] = None) -> 'IssueView':
+        """
+        过滤后的视图
+
+        Args:
+            min_severity: 只保留不低于该等级的问题
+            exclude_fingerprints: 去掉指纹在集合中的问题（如基线中的已知问题）
+        """
+        store = self._store
+        rows = original = self.rows()
+        if min_severity is not None:
+            severity, rank = store._severity, min_severity.rank
+            rows = [row for row in rows if severity[row] >= rank]
+        if exclude_fingerprints:
+            fingerprint = store._fingerprint
+            rows = [row for row in rows if fingerprint[row] not in exclude_fingerprints]
+        if rows is original:
+            return self
+        return IssueView(store, array('I', rows))
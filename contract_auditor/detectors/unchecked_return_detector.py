@@ -1,34 +1,42 @@
 """未检查返回值检测器"""
 
+import re
 from typing import List
 from .base_detector import BaseDetector, Issue
-from ..parser.ast_builder import AST, FunctionNode, CallNode
+from ..parser.ast_builder import AST, ContractNode, FunctionNode, CallNode
+from ..parser.ir import ASSIGN, IF, REQUIRE, FunctionIR, function_ir
 from ..utils.severity import Severity
 
+_SUCCESS_TARGET = re.compile(r'\(bool\s+success', re.IGNORECASE)
+
 
 class UncheckedReturnDetector(BaseDetector):
     """检测未检查返回值"""
     
-    def detect(self, ast: AST) -> List[Issue]:
+    SEVERITIES = (Severity.MEDIUM,)
+    TRIGGER_TOKENS = ('.send', '.call', '.delegatecall', '.staticcall')
+    ROOT_CAUSES = {'Unchecked Return Value': 'unchecked-call'}  # 与 ExternalCallDetector 的同一调用合并
+    
+    def detect_function(self, ast: AST, contract: ContractNode, func: FunctionNode) -> List[Issue]:
         """检测未检查返回值问题"""
         issues = []
         
-        for contract in ast.contracts:
-            for func in contract.functions:
-                # 查找可能失败的调用
-                risky_calls = [c for c in func.calls if self._is_risky_call(c)]
-                
-                for call in risky_calls:
-                    if not self._is_return_checked(func, call):
-                        issues.append(Issue(
-                            issue_type="Unchecked Return Value",
-                            severity=Severity.MEDIUM,
-                            file_path=ast.file_path,
-                            line=call.line,
-                            function=func.name,
-                            description=f"函数 {func.name} 中的 {call.call_type} 调用未检查返回值，调用可能失败但代码继续执行。",
-                            recommendation="检查调用返回值，特别是 send() 和低级别 call() 的返回值，使用 require 确保调用成功。"
-                        ))
+        ir = function_ir(func)
+        
+        # 查找可能失败的调用
+        risky_calls = [c for c in func.calls if self._is_risky_call(c)]
+        
+        for call in risky_calls:
+            if not self._is_return_checked(ir, call):
+                issues.append(Issue(
+                    issue_type="Unchecked Return Value",
+                    severity=Severity.MEDIUM,
+                    file_path=ast.file_path,
+                    line=call.line,
+                    function=func.name,
+                    description=f"函数 {func.name} 中的 {call.call_type} 调用未检查返回值，调用可能失败但代码继续执行。",
+                    recommendation="检查调用返回值，特别是 send() 和低级别 call() 的返回值，使用 require 确保调用成功。"
+                ))
         
         return issues
     
@@ -37,34 +45,12 @@ class UncheckedReturnDetector(BaseDetector):
         risky_types = ['send', 'call', 'delegatecall', 'staticcall']
         return call.call_type in risky_types
     
-    def _is_return_checked(self, func: FunctionNode, call: CallNode) -> bool:
-        """检查返回值是否被检查"""
-        call_line = call.line
-        body_after_call = self._get_code_after_line(func.body, call_line)
-        
-        if not body_after_call:
-            return False
-        
-        import re
-        # 检查返回值检查模式
-        patterns = [
-            r'require\s*\([^)]*\)',
-            r'if\s*\([^)]*\)',
-            r'assert\s*\(',
-            r'\(bool\s+success',
-            r'if\s*\(!\s*\w+\)'
-        ]
-        
-        for pattern in patterns:
-            if re.search(pattern, body_after_call, re.IGNORECASE):
+    def _is_return_checked(self, ir: FunctionIR, call: CallNode) -> bool:
+        """检查返回值是否被检查：调用所在行及之后有 require/assert、if，或把结果赋给 (bool success, ...)"""
+        for stmt in ir.statements_from(call.line):
+            if stmt.kind in (REQUIRE, IF):
+                return True
+            if stmt.kind == ASSIGN and _SUCCESS_TARGET.search(stmt.target):
                 return True
         
         return False
-    
-    def _get_code_after_line(self, body: str, line: int) -> str:
-        """获取指定行之后的代码"""
-        lines = body.split('\n')
-        if line <= len(lines):
-            return '\n'.join(lines[line-1:])
-        return ""
-
@@ -0,0 +1,229 @@
+"""内存中的 LSP 客户端
+
+在内存管道上驱动 AuditLanguageServer（不启动子进程，不经过 stdio），消息按 Content-Length
+分帧收发，与编辑器的交互相同。check 按以下步骤校验文档同步和诊断：
+- didOpen 后发布诊断
+- 在第一个函数体内插入两行（增量 didChange）：被编辑的函数重新检测，其后函数的诊断平移两行，
+  结果与整体重新解析编辑后的文本一致
+- didClose 清空诊断，shutdown/exit 后服务以 0 退出
+
+用法:
+    python -m contract_auditor.lsp.fake_client examples/single_file_1.sol
+
+Author: tr3
+"""
+
+import sys
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import click
+
+from .server import AuditLanguageServer, _utf16_len, read_message, write_message
+from ..parser.solidity_parser import SolidityParser
+
+
+class _Pipe:
+    """内存中的单向字节管道（读取在没有数据时阻塞，直到写入或关闭）"""
+
+    def __init__(self):
+        self._buffer = bytearray()
+        self._closed = False
+        self._ready = threading.Condition()
+
+    def write(self, data: bytes) -> int:
+        with self._ready:
+            self._buffer.extend(data)
+            self._ready.notify_all()
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def close(self):
+        with self._ready:
+            self._closed = True
+            self._ready.notify_all()
+
+    def readline(self) -> bytes:
+        with self._ready:
+            while b'\n' not in self._buffer and not self._closed:
+                self._ready.wait()
+            end = self._buffer.find(b'\n') + 1 or len(self._buffer)
+            return self._take(end)
+
+    def read(self, size: int) -> bytes:
+        with self._ready:
+            while len(self._buffer) < size and not self._closed:
+                self._ready.wait()
+            return self._take(min(size, len(self._buffer)))
+
+    def _take(self, size: int) -> bytes:
+        data = bytes(self._buffer[:size])
+        del self._buffer[:size]
+        return data
+
+
+class FakeClient:
+    """在后台线程中运行 AuditLanguageServer，通过内存管道收发消息"""
+
+    def __init__(self, debounce: float = 0.0):
+        """
+        Args:
+            debounce: 服务的诊断发布防抖时间（秒）
+        """
+        self._to_server = _Pipe()
+        self._from_server = _Pipe()
+        self.server = AuditLanguageServer(self._to_server, self._from_server, debounce=debounce)
+        self.diagnostics: Dict[str, List[Dict]] = {}  # uri -> 最近一次发布的诊断
+        self.exit_code: Optional[int] = None
+        self._next_id = 0
+        self._thread = threading.Thread(target=self._serve, name='lsp-server', daemon=True)
+        self._thread.start()
+
+    def _serve(self):
+        self.exit_code = self.server.serve()
+        self._from_server.close()
+
+    def request(self, method: str, params: Dict = None):
+        """发送请求并等待响应（期间收到的诊断记入 diagnostics）"""
+        self._next_id += 1
+        msg_id = self._next_id
+        write_message(self._to_server, {'jsonrpc': '2.0', 'id': msg_id, 'method': method,
+                                        'params': params or {}})
+        while True:
+            message = self._receive()
+            if message.get('id') == msg_id:
+                if 'error' in message:
+                    raise RuntimeError(message['error']['message'])
+                return message.get('result')
+
+    def notify(self, method: str, params: Dict = None):
+        """发送通知"""
+        write_message(self._to_server, {'jsonrpc': '2.0', 'method': method, 'params': params or {}})
+
+    def wait_diagnostics(self, uri: str) -> List[Dict]:
+        """等待文档的下一次诊断发布"""
+        while True:
+            message = self._receive()
+            if message.get('method') == 'textDocument/publishDiagnostics' \
+                    and message['params']['uri'] == uri:
+                return message['params']['diagnostics']
+
+    def _receive(self) -> Dict:
+        message = read_message(self._from_server)
+        if message is None:
+            raise RuntimeError("服务已关闭输出流")
+        if message.get('method') == 'textDocument/publishDiagnostics':
+            self.diagnostics[message['params']['uri']] = message['params']['diagnostics']
+        return message
+
+    def open(self, uri: str, text: str, version: int = 1) -> List[Dict]:
+        """didOpen，返回发布的诊断"""
+        self.notify('textDocument/didOpen', {'textDocument': {'uri': uri, 'languageId': 'solidity',
+                                                              'version': version, 'text': text}})
+        return self.wait_diagnostics(uri)
+
+    def change(self, uri: str, start: Tuple[int, int], end: Tuple[int, int], text: str,
+               version: int) -> List[Dict]:
+        """增量 didChange（start/end 为 (行, 列)，从 0 开始），返回发布的诊断"""
+        change = {'range': {'start': {'line': start[0], 'character': start[1]},
+                            'end': {'line': end[0], 'character': end[1]}},
+                  'text': text}
+        self.notify('textDocument/didChange', {'textDocument': {'uri': uri, 'version': version},
+                                               'contentChanges': [change]})
+        return self.wait_diagnostics(uri)
+
+    def close(self, uri: str) -> List[Dict]:
+        """didClose，返回发布的（空）诊断"""
+        self.notify('textDocument/didClose', {'textDocument': {'uri': uri}})
+        return self.wait_diagnostics(uri)
+
+    def stop(self, timeout: float = 5.0) -> Optional[int]:
+        """shutdown + exit，等待服务退出，返回退出码"""
+        self.request('shutdown')
+        self.notify('exit')
+        self._thread.join(timeout)
+        self._to_server.close()
+        return self.exit_code
+
+
+def _position(text: str, offset: int) -> Tuple[int, int]:
+    """字符串偏移转换为 LSP 的 (行, 列)"""
+    line = text.count('\n', 0, offset)
+    return line, _utf16_len(text[text.rfind('\n', 0, offset) + 1:offset])
+
+
+def _key(diagnostic: Dict) -> Tuple[int, str]:
+    """诊断的行号（从 1 开始）和问题类型（消息中含有行号，重新检测后会变化，不参与比较）"""
+    return diagnostic['range']['start']['line'] + 1, diagnostic['code']
+
+
+def check(text: str, uri: str = 'file:///fake/Contract.sol') -> List[str]:
+    """
+    按模块说明中的步骤驱动服务
+
+    Returns:
+        不符合预期的步骤（为空表示全部通过）
+    """
+    failures = []
+    ast = SolidityParser().parse(text)
+    functions = [func for contract in ast.contracts for func in contract.functions]
+    if not functions:
+        return ["源码中没有带函数体的函数"]
+
+    client = FakeClient()
+    try:
+        client.request('initialize', {'processId': None, 'rootUri': None, 'capabilities': {}})
+        client.notify('initialized')
+
+        opened = client.open(uri, text)
+        if not opened:
+            failures.append("didOpen: 没有发布诊断")
+
+        # 在第一个函数体的左大括号后插入两行
+        edited_func = functions[0]
+        brace = text.index('{', edited_func.start)
+        inserted = "\n        // fake client\n        // fake client"
+        position = _position(text, brace + 1)
+        changed = client.change(uri, position, position, inserted, version=2)
+
+        edit_line = position[0] + 1  # 插入点所在行（从 1 开始）
+        expected = sorted((line + 2 if line > edit_line else line, code) for line, code in map(_key, opened))
+        actual = sorted(map(_key, changed))
+        if actual != expected:
+            failures.append(f"didChange: 诊断未按插入的两行平移\n  期望: {expected}\n  实际: {actual}")
+        if not any(line > edit_line for line, _ in expected):
+            failures.append("didChange: 被编辑的函数之后没有诊断，未覆盖诊断平移")
+
+        # 整体重新解析编辑后的文本，结果应与增量更新一致
+        edited_text = text[:brace + 1] + inserted + text[brace + 1:]
+        reopened = client.open(uri + '.full', edited_text)
+        if sorted(map(_key, reopened)) != sorted(map(_key, changed)):
+            failures.append("didChange: 增量更新的诊断与整体重新解析不一致")
+
+        if client.close(uri):
+            failures.append("didClose: 诊断未清空")
+        client.close(uri + '.full')
+    finally:
+        exit_code = client.stop()
+    if exit_code != 0:
+        failures.append(f"exit: 服务退出码为 {exit_code}")
+    return failures
+
+
+@click.command(help='在内存中驱动 LSP 服务，校验 didOpen、增量 didChange 和诊断平移')
+@click.argument('path', type=click.Path(exists=True, dir_okay=False),
+                default='examples/single_file_1.sol')
+def main(path):
+    failures = check(Path(path).read_text(encoding='utf-8'), Path(path).resolve().as_uri())
+    for failure in failures:
+        click.echo(f"失败: {failure}", err=True)
+    if not failures:
+        click.echo("通过")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,390 @@
+"""Language Server Protocol 服务
+
+通过 stdio 与编辑器通信，在编辑/保存时审计合约并以诊断信息的形式发布问题。
+编辑时通过 SolidityParser.update 只重新解析被修改的函数（或合约），并只对这些函数
+重新执行检测；诊断发布带防抖。
+
+Author: tr3
+"""
+
+import json
+import sys
+import threading
+from dataclasses import dataclass, field
+from typing import BinaryIO, Dict, List, Optional, Set
+from urllib.parse import urlparse, unquote
+
+import click
+
+from ..parser.solidity_parser import SolidityParser, TextEdit
+from ..parser.ast_builder import AST, ContractNode, FunctionNode
+from ..analyzer.inheritance import InheritanceResolver
+from ..detectors.base_detector import Issue
+from ..detectors.reentrancy_detector import ReentrancyDetector
+from ..detectors.access_control_detector import AccessControlDetector
+from ..detectors.external_call_detector import ExternalCallDetector
+from ..detectors.unchecked_return_detector import UncheckedReturnDetector
+from ..detectors.delegatecall_detector import DelegatecallDetector
+from ..utils.severity import Severity
+
+
+# LSP 诊断等级
+DIAGNOSTIC_SEVERITY = {
+    Severity.CRITICAL: 1,  # Error
+    Severity.HIGH: 1,  # Error
+    Severity.MEDIUM: 2,  # Warning
+    Severity.LOW: 3,  # Information
+}
+
+
+def read_message(stream: BinaryIO) -> Optional[Dict]:
+    """
+    读取一条 JSON-RPC 消息（Content-Length 分帧）
+
+    Returns:
+        消息字典；流结束时返回 None
+    """
+    headers = {}
+    while True:
+        line = stream.readline()
+        if not line:
+            return None
+        line = line.strip()
+        if not line:
+            break
+        key, _, value = line.decode('ascii').partition(':')
+        headers[key.strip().lower()] = value.strip()
+
+    length = int(headers.get('content-length', 0))
+    body = stream.read(length)
+    if len(body) < length:
+        return None
+    return json.loads(body.decode('utf-8'))
+
+
+def write_message(stream: BinaryIO, payload: Dict):
+    """写入一条 JSON-RPC 消息（Content-Length 分帧）"""
+    body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+    stream.write(f"Content-Length: {len(body)}\r\n\r\n".encode('ascii'))
+    stream.write(body)
+    stream.flush()
+
+
+def _utf16_len(text: str) -> int:
+    """文本的 UTF-16 码元长度（LSP 的列号单位）"""
+    return len(text) + sum(1 for ch in text if ord(ch) > 0xFFFF)
+
+
+def offset_at(text: str, position: Dict) -> int:
+    """将 LSP 位置（行号 + UTF-16 列号）转换为字符串偏移"""
+    line_start = 0
+    for _ in range(position['line']):
+        next_newline = text.find('\n', line_start)
+        if next_newline == -1:
+            return len(text)
+        line_start = next_newline + 1
+
+    line_end = text.find('\n', line_start)
+    if line_end == -1:
+        line_end = len(text)
+
+    units = 0
+    offset = line_start
+    while offset < line_end and units < position['character']:
+        units += 2 if ord(text[offset]) > 0xFFFF else 1
+        offset += 1
+    return offset
+
+
+def _uri_to_path(uri: str) -> str:
+    """将 file:// URI 转换为文件路径"""
+    parsed = urlparse(uri)
+    if parsed.scheme == 'file':
+        return unquote(parsed.path)
+    return uri
+
+
+@dataclass
+class _Document:
+    """编辑器中打开的文档"""
+    uri: str
+    text: str
+    version: int = 0
+    ast: Optional[AST] = None
+    function_issues: Dict[int, List[Issue]] = field(default_factory=dict)  # id(FunctionNode) -> 问题
+    dirty: Set[int] = field(default_factory=set)  # 需要重新检测的函数 id(FunctionNode)
+
+
+class AuditLanguageServer:
+    """审计 LSP 服务"""
+
+    def __init__(self, reader: BinaryIO, writer: BinaryIO, debounce: float = 0.3):
+        """
+        Args:
+            reader: 客户端输入流（二进制）
+            writer: 客户端输出流（二进制）
+            debounce: 诊断发布防抖时间（秒），0 表示立即发布
+        """
+        self.reader = reader
+        self.writer = writer
+        self.debounce = debounce
+        self.parser = SolidityParser()
+        self.detectors = [
+            ReentrancyDetector(),
+            AccessControlDetector(),
+            ExternalCallDetector(),
+            UncheckedReturnDetector(),
+            DelegatecallDetector()
+        ]
+        self.documents: Dict[str, _Document] = {}
+        self._timers: Dict[str, threading.Timer] = {}
+        self._lock = threading.RLock()
+        self._shutdown = False
+        self._running = False
+
+    def serve(self) -> int:
+        """
+        处理消息直到收到 exit 或输入流结束
+
+        Returns:
+            进程退出码（收到 shutdown 后退出为 0，否则为 1）
+        """
+        self._running = True
+        while self._running:
+            message = read_message(self.reader)
+            if message is None:
+                break
+            self.handle(message)
+
+        with self._lock:
+            for timer in self._timers.values():
+                timer.cancel()
+            self._timers.clear()
+
+        return 0 if self._shutdown else 1
+
+    def handle(self, message: Dict):
+        """分发一条客户端消息"""
+        method = message.get('method')
+        params = message.get('params') or {}
+        msg_id = message.get('id')
+
+        handlers = {
+            'initialize': self._on_initialize,
+            'initialized': lambda p: None,
+            'shutdown': self._on_shutdown,
+            'exit': self._on_exit,
+            'textDocument/didOpen': self._on_did_open,
+            'textDocument/didChange': self._on_did_change,
+            'textDocument/didSave': self._on_did_save,
+            'textDocument/didClose': self._on_did_close,
+        }
+
+        handler = handlers.get(method)
+        if handler is None:
+            # 未知请求返回 MethodNotFound，未知通知直接忽略
+            if msg_id is not None and method is not None:
+                self._send({'jsonrpc': '2.0', 'id': msg_id,
+                            'error': {'code': -32601, 'message': f"未支持的方法: {method}"}})
+            return
+
+        try:
+            result = handler(params)
+        except Exception as e:
+            if msg_id is not None:
+                self._send({'jsonrpc': '2.0', 'id': msg_id,
+                            'error': {'code': -32603, 'message': str(e)}})
+            return
+
+        if msg_id is not None:
+            self._send({'jsonrpc': '2.0', 'id': msg_id, 'result': result})
+
+    def _send(self, payload: Dict):
+        """线程安全地向客户端发送消息"""
+        with self._lock:
+            write_message(self.writer, payload)
+
+    # ---- 生命周期 ----
+
+    def _on_initialize(self, params: Dict) -> Dict:
+        from .. import __version__
+        return {
+            'capabilities': {
+                'textDocumentSync': {
+                    'openClose': True,
+                    'change': 2,  # Incremental
+                    'save': {'includeText': False}
+                }
+            },
+            'serverInfo': {'name': 'contract-auditor', 'version': __version__}
+        }
+
+    def _on_shutdown(self, params: Dict):
+        self._shutdown = True
+        return None
+
+    def _on_exit(self, params: Dict):
+        self._running = False
+
+    # ---- 文档同步 ----
+
+    def _on_did_open(self, params: Dict):
+        text_document = params['textDocument']
+        uri = text_document['uri']
+        with self._lock:
+            doc = _Document(uri=uri, text=text_document['text'],
+                            version=text_document.get('version', 0))
+            self.documents[uri] = doc
+            self._reparse_full(doc)
+        self._schedule(uri)
+
+    def _on_did_change(self, params: Dict):
+        uri = params['textDocument']['uri']
+        with self._lock:
+            doc = self.documents.get(uri)
+            if doc is None:
+                return
+            doc.version = params['textDocument'].get('version', doc.version)
+            for change in params.get('contentChanges', []):
+                if 'range' not in change:
+                    doc.text = change['text']
+                    self._reparse_full(doc)
+                    continue
+
+                edit = TextEdit(start=offset_at(doc.text, change['range']['start']),
+                                end=offset_at(doc.text, change['range']['end']),
+                                text=change['text'])
+                self._reparse_incremental(doc, edit)
+        self._schedule(uri)
+
+    def _on_did_save(self, params: Dict):
+        uri = params['textDocument']['uri']
+        # 保存时立即发布，不等待防抖
+        with self._lock:
+            timer = self._timers.pop(uri, None)
+            if timer:
+                timer.cancel()
+        self._publish(uri)
+
+    def _on_did_close(self, params: Dict):
+        uri = params['textDocument']['uri']
+        with self._lock:
+            timer = self._timers.pop(uri, None)
+            if timer:
+                timer.cancel()
+            self.documents.pop(uri, None)
+        self._send({'jsonrpc': '2.0', 'method': 'textDocument/publishDiagnostics',
+                    'params': {'uri': uri, 'diagnostics': []}})
+
+    # ---- 解析 ----
+
+    def _reparse_full(self, doc: _Document):
+        """整体重新解析文档，所有函数都需要重新检测"""
+        doc.ast = self.parser.parse(doc.text, _uri_to_path(doc.uri))
+        doc.function_issues.clear()
+        doc.dirty = {id(func) for contract in doc.ast.contracts for func in contract.functions}
+
+    def _reparse_incremental(self, doc: _Document, edit: TextEdit):
+        """增量解析，只让被重新解析的函数失效；其后函数的诊断随之平移"""
+        update = self.parser.update(doc.ast, edit)
+        doc.text = doc.ast.source_code
+
+        for func in update.removed_functions:
+            doc.function_issues.pop(id(func), None)
+            doc.dirty.discard(id(func))
+        changed = {id(func) for func in update.changed_functions}
+        doc.dirty.update(changed)
+        if update.changed_contracts:
+            # 合约的修饰符或基合约可能变化，继承它的合约也要重新检测
+            doc.dirty.update(id(func) for contract in doc.ast.contracts for func in contract.functions)
+
+        if update.delta_lines:
+            edit_end = edit.start + len(edit.text)
+            for contract in doc.ast.contracts:
+                for func in contract.functions:
+                    if id(func) in changed or func.start < edit_end:
+                        continue
+                    for issue in doc.function_issues.get(id(func), []):
+                        issue.line += update.delta_lines
+
+    # ---- 诊断 ----
+
+    def _schedule(self, uri: str):
+        """防抖：在最后一次编辑之后 debounce 秒再发布诊断"""
+        if self.debounce <= 0:
+            self._publish(uri)
+            return
+
+        with self._lock:
+            timer = self._timers.pop(uri, None)
+            if timer:
+                timer.cancel()
+            timer = threading.Timer(self.debounce, self._publish, args=(uri,))
+            timer.daemon = True
+            self._timers[uri] = timer
+            timer.start()
+
+    def _publish(self, uri: str):
+        """对需要重新检测的函数执行检测并发布诊断"""
+        with self._lock:
+            self._timers.pop(uri, None)
+            doc = self.documents.get(uri)
+            if doc is None:
+                return
+
+            inheritance = InheritanceResolver([doc.ast])
+            for detector in self.detectors:
+                detector.inheritance = inheritance
+            for contract in doc.ast.contracts:
+                for func in contract.functions:
+                    if id(func) in doc.dirty:
+                        doc.function_issues[id(func)] = self._detect_function(doc.ast, contract, func)
+            doc.dirty.clear()
+
+            lines = doc.text.split('\n')
+            diagnostics = [
+                self._to_diagnostic(issue, lines)
+                for contract in doc.ast.contracts for func in contract.functions
+                for issue in doc.function_issues.get(id(func), [])
+            ]
+            self._send({'jsonrpc': '2.0', 'method': 'textDocument/publishDiagnostics',
+                        'params': {'uri': uri, 'version': doc.version,
+                                   'diagnostics': diagnostics}})
+
+    def _detect_function(self, ast: AST, contract: ContractNode, func: FunctionNode) -> List[Issue]:
+        """只对单个函数执行检测"""
+        issues = []
+        for detector in self.detectors:
+            issues.extend(detector.detect_function(ast, contract, func))
+        return issues
+
+    def _to_diagnostic(self, issue: Issue, lines: List[str]) -> Dict:
+        """将问题转换为 LSP 诊断"""
+        line = max(issue.line - 1, 0)
+        line_text = lines[line] if line < len(lines) else ""
+        indent = len(line_text) - len(line_text.lstrip())
+        return {
+            'range': {
+                'start': {'line': line, 'character': _utf16_len(line_text[:indent])},
+                'end': {'line': line, 'character': _utf16_len(line_text.rstrip())}
+            },
+            'severity': DIAGNOSTIC_SEVERITY.get(issue.severity, 3),
+            'source': 'contract-auditor',
+            'code': issue.type,
+            'message': f"{issue.description}\n建议: {issue.recommendation}"
+        }
+
+
+@click.command(
+    help='智能合约安全审计 LSP 服务\n\n通过 stdio 与编辑器通信，编辑/保存时发布诊断信息。',
+    context_settings={'help_option_names': ['-h', '--help']}
+)
+@click.option('--debounce', type=float, default=0.3,
+              help='诊断发布防抖时间，单位秒（默认：0.3）')
+def main(debounce):
+    server = AuditLanguageServer(sys.stdin.buffer, sys.stdout.buffer, debounce=debounce)
+    sys.exit(server.serve())
+
+
+if __name__ == '__main__':
+    main()
@@ -4,44 +4,63 @@ Author: tr3
 """
 
 import click
+import os
 import sys
 from pathlib import Path
-from typing import List, Tuple, Dict
+from typing import List, Dict
 
 try:
     from .parser.solidity_parser import SolidityParser
-    from .detectors.reentrancy_detector import ReentrancyDetector
-    from .detectors.access_control_detector import AccessControlDetector
-    from .detectors.external_call_detector import ExternalCallDetector
-    from .detectors.unchecked_return_detector import UncheckedReturnDetector
-    from .detectors.delegatecall_detector import DelegatecallDetector
+    from .parser.import_resolver import ImportResolver, SourceCache
+    from .parser.parallel import ParallelParser
+    from .parser.cost_model import CostModel, TimingCache
+    from .parser.artifacts import ArtifactIndex, ArtifactParser
+    from .analyzer.scheduler import AnalysisPlan, default_graph
+    from .detectors.issue_store import IssueStore
     from .analyzer.call_graph import CallGraphAnalyzer
     from .analyzer.taint_analysis import TaintAnalyzer
     from .analyzer.control_flow import ControlFlowAnalyzer
     from .analyzer.data_flow import DataFlowAnalyzer
-    from .reporter.json_reporter import JSONReporter
-    from .reporter.html_reporter import HTMLReporter
+    from .api import (default_detectors, issue_limit, report_dir, run_files, schedule_detectors, select_analyses,
+                      select_detectors, write_reports)
     from .utils.file_utils import find_solidity_files, get_output_directory, classify_files
     from .utils.severity import Severity
+    from .utils.profiler import Profiler
+    from .utils.budget import BudgetLimits
+    from .utils.dedup import ResultCache
+    from .utils.source_store import SourceStore
+    from .utils.pipeline import BackgroundTasks
+    from .utils.baseline import Baseline
+    from .utils.shard import (ShardError, layout_of, parse_shard, read_bundles, select_shard,
+                              write_bundle)
 except ImportError:
     import os
     project_root = Path(__file__).parent.parent
     sys.path.insert(0, str(project_root))
     
     from contract_auditor.parser.solidity_parser import SolidityParser
-    from contract_auditor.detectors.reentrancy_detector import ReentrancyDetector
-    from contract_auditor.detectors.access_control_detector import AccessControlDetector
-    from contract_auditor.detectors.external_call_detector import ExternalCallDetector
-    from contract_auditor.detectors.unchecked_return_detector import UncheckedReturnDetector
-    from contract_auditor.detectors.delegatecall_detector import DelegatecallDetector
+    from contract_auditor.parser.import_resolver import ImportResolver, SourceCache
+    from contract_auditor.parser.parallel import ParallelParser
+    from contract_auditor.parser.cost_model import CostModel, TimingCache
+    from contract_auditor.parser.artifacts import ArtifactIndex, ArtifactParser
+    from contract_auditor.analyzer.scheduler import AnalysisPlan, default_graph
+    from contract_auditor.detectors.issue_store import IssueStore
     from contract_auditor.analyzer.call_graph import CallGraphAnalyzer
     from contract_auditor.analyzer.taint_analysis import TaintAnalyzer
     from contract_auditor.analyzer.control_flow import ControlFlowAnalyzer
     from contract_auditor.analyzer.data_flow import DataFlowAnalyzer
-    from contract_auditor.reporter.json_reporter import JSONReporter
-    from contract_auditor.reporter.html_reporter import HTMLReporter
-    from contract_auditor.utils.file_utils import find_solidity_files, get_output_directory
+    from contract_auditor.api import (default_detectors, issue_limit, report_dir, run_files,
+                                      schedule_detectors, select_analyses, select_detectors, write_reports)
+    from contract_auditor.utils.file_utils import find_solidity_files, get_output_directory, classify_files
     from contract_auditor.utils.severity import Severity
+    from contract_auditor.utils.profiler import Profiler
+    from contract_auditor.utils.budget import BudgetLimits
+    from contract_auditor.utils.dedup import ResultCache
+    from contract_auditor.utils.source_store import SourceStore
+    from contract_auditor.utils.pipeline import BackgroundTasks
+    from contract_auditor.utils.baseline import Baseline
+    from contract_auditor.utils.shard import (ShardError, layout_of, parse_shard, read_bundles, select_shard,
+                                              write_bundle)
 
 from colorama import init, Fore, Style
 
@@ -49,92 +68,151 @@ from colorama import init, Fore, Style
 init(autoreset=True)
 
 
-def _process_files(files: List[Tuple[str, str]], parser, detectors, 
-                   call_graph_analyzer, taint_analyzer, 
-                   control_flow_analyzer, data_flow_analyzer):
-    """处理文件列表，返回问题和分析数据"""
-    all_issues = []
-    all_asts = []
-    
-    # 解析和检测
-    print(Fore.YELLOW + "正在解析合约..." + Style.RESET_ALL)
-    for file_path, source_code in files:
-        print(f"  解析: {file_path}")
-        ast = parser.parse(source_code, file_path)
-        all_asts.append(ast)
-    
-    print(Fore.YELLOW + "正在执行安全检测..." + Style.RESET_ALL)
-    for ast in all_asts:
-        for detector in detectors:
-            issues = detector.detect(ast)
-            all_issues.extend(issues)
-            if issues:
-                print(f"  {detector.name}: 发现 {len(issues)} 个问题")
-    
-    # 执行分析
-    call_graph_data = None
+def _merge_files(paths: List[str], records: Dict[str, Dict], issue_store: IssueStore, project: str = ''):
+    """
+    按文件顺序合并一组文件在各分片中的结果，返回值与 run_files 相同
+
+    Args:
+        paths: 组中的文件（分类中的顺序）
+        records: 文件路径 -> 结果包中该文件的结果
+        issue_store: 问题存储（按 project 区分）
+        project: 项目名（单文件为空字符串）
+    """
+    missing = [path for path in paths if path not in records]
+    if missing:
+        raise ShardError(f"结果包中缺少文件: {', '.join(missing)}")
+
+    call_graph_analyzer = None
     taint_paths = []
     control_flow_data = {}
     data_flow_data = {}
-    
-    # 调用图分析：合并所有文件的调用图
-    for i, ast in enumerate(all_asts):
-        # 第一个文件清空图，后续文件追加到图中
-        clear_graph = (i == 0)
-        call_graph = call_graph_analyzer.analyze(ast, clear=clear_graph)
-    
-    # 所有文件分析完成后，生成调用图数据
-    if all_asts:
-        call_graph_data = call_graph_analyzer.to_dict()
-    
-    # 其他分析
-    for ast in all_asts:
-        # 污点分析
-        paths = taint_analyzer.analyze(ast)
-        taint_paths.extend(paths)
-        
-        # 控制流分析
-        cfgs = control_flow_analyzer.analyze(ast)
-        control_flow_data.update(cfgs)
-        
-        # 数据流分析
-        data_flows = data_flow_analyzer.analyze(ast)
-        data_flow_data.update(data_flows)
-    
-    if call_graph_data:
-        print(f"  调用图: {len(call_graph_data.get('nodes', []))} 个节点")
-    if taint_paths:
-        print(f"  污点分析: 发现 {len(taint_paths)} 条传播路径")
-    if control_flow_data:
-        print(f"  控制流分析: 分析了 {len(control_flow_data)} 个函数")
-    if data_flow_data:
-        print(f"  数据流分析: 分析了 {len(data_flow_data)} 个函数")
-    
-    return all_issues, {
-        'call_graph': call_graph_data,
+    entry_points_data = {}
+    partial = []
+    for path in paths:
+        record = records[path]
+        for issue in record['issues']:
+            issue_store.insert(issue, project)
+        if record['call_graph'] is not None:
+            call_graph_analyzer = call_graph_analyzer or CallGraphAnalyzer()
+            call_graph_analyzer.merge(record['call_graph'])
+        taint_paths.extend(record['taint_paths'])
+        control_flow_data.update(record['control_flow'])
+        data_flow_data.update(record['data_flow'])
+        entry_points_data.update(record['entry_points'])
+        partial.extend(record['partial'])
+
+    return issue_store.view(project), {
+        'call_graph': call_graph_analyzer.to_dict() if call_graph_analyzer is not None else None,
         'taint_paths': taint_paths,
         'control_flow': control_flow_data,
-        'data_flow': data_flow_data
+        'data_flow': data_flow_data,
+        'entry_points': entry_points_data,
+        'partial': partial,
+        'truncated': None
     }
 
 
-def _filter_by_severity(issues: List, severity: str):
-    """按风险等级过滤问题"""
-    min_severity = Severity.from_string(severity)
-    severity_order = {
-        Severity.CRITICAL: 4,
-        Severity.HIGH: 3,
-        Severity.MEDIUM: 2,
-        Severity.LOW: 1
-    }
-    return [
-        issue for issue in issues
-        if severity_order.get(issue.severity, 0) >= severity_order.get(min_severity, 0)
-    ]
+def _write_reports(issues, data: Dict, output_dir: Path, label: str, format: str,
+                   profiler: Profiler, performance: Dict = None) -> List[str]:
+    """
+    写出一组文件的报告并显示路径（在后台线程中执行）
+
+    Args:
+        issues: 问题（IssueView）
+        data: run_files 返回的分析数据
+        output_dir: 报告目录
+        label: 输出提示中的名称前缀
+        format: json、html 或 both
+        profiler: 报告线程专用的剖析器
+        performance: JSON报告中的性能剖析数据
+
+    Returns:
+        生成的报告路径
+    """
+    generated = write_reports(issues, data, output_dir, format, profiler, performance)
+    for path in generated:
+        kind = 'JSON' if path.endswith('.json') else 'HTML'
+        print(Fore.GREEN + f"  {label}{kind}报告: {path}" + Style.RESET_ALL)
+    return generated
+
+
+def _schedule_detectors(detectors: List, min_severity: Severity) -> List:
+    """只保留可能产生不低于 min_severity 的问题的检测器"""
+    scheduled, skipped = schedule_detectors(detectors, min_severity)
+    if skipped:
+        print(Fore.CYAN + f"跳过检测器（不会产生 {min_severity} 及以上的问题）: {', '.join(skipped)}"
+              + Style.RESET_ALL)
+    return scheduled
+
+
+def _split_names(spec: str) -> List[str]:
+    return [name.strip() for name in spec.split(',') if name.strip()]
+
+
+def _select_analyses(spec: str, graph) -> List[str]:
+    """解析 --analyses：逗号分隔的分析名称，或 all/none"""
+    try:
+        return select_analyses(_split_names(spec), graph)
+    except ValueError as e:
+        raise click.BadParameter(str(e), param_hint='--analyses')
 
 
-@click.command(
-    help='智能合约安全审计工具\n\n扫描 Solidity 智能合约，检测安全漏洞并生成报告。',
+def _select_detectors(spec: str, detectors: List) -> List:
+    """解析 --detectors：逗号分隔的检测器名称，或 all/none"""
+    try:
+        return select_detectors(_split_names(spec), detectors)
+    except ValueError as e:
+        raise click.BadParameter(str(e), param_hint='--detectors')
+
+
+def _print_summary(all_filtered_issues, single_issues, project_issues_map: Dict, has_single: bool):
+    """显示问题总数、按风险等级的计数，以及单文件/各项目的问题数"""
+    if not all_filtered_issues:
+        return
+    summary = all_filtered_issues.summary()
+    print(f"\n总计发现: {summary['total_issues']} 个问题")
+    print(f"  Critical: {summary['critical']}")
+    print(f"  High: {summary['high']}")
+    print(f"  Medium: {summary['medium']}")
+    print(f"  Low: {summary['low']}")
+    
+    if has_single and project_issues_map:
+        print(f"\n  单文件: {len(single_issues)} 个问题")
+        print(f"  项目: {len(all_filtered_issues) - len(single_issues)} 个问题")
+    elif project_issues_map:
+        # 显示每个项目的问题数
+        for project_name, project_issues in project_issues_map.items():
+            print(f"  {project_name}: {len(project_issues)} 个问题")
+
+
+def _print_report_locations(base_output_dir: str, has_single: bool, project_names: List[str]):
+    print(Fore.GREEN + f"\n报告已保存到: {base_output_dir}" + Style.RESET_ALL)
+    if has_single and project_names:
+        print(Fore.CYAN + f"  单文件报告: {base_output_dir}/single_files/" + Style.RESET_ALL)
+        print(Fore.CYAN + f"  项目报告: {base_output_dir}/projects/" + Style.RESET_ALL)
+    elif project_names:
+        print(Fore.CYAN + f"  项目报告: {base_output_dir}/projects/" + Style.RESET_ALL)
+        for project_name in project_names:
+            print(Fore.CYAN + f"    - {project_name}: {base_output_dir}/projects/{project_name}/" + Style.RESET_ALL)
+
+
+class _DefaultGroup(click.Group):
+    """第一个参数不是子命令名时执行 audit，contract-auditor <路径> 的用法保持不变"""
+    
+    def parse_args(self, ctx, args):
+        if not args or args[0] not in self.commands:
+            args = ['audit'] + list(args)
+        return super().parse_args(ctx, args)
+
+
+@click.group(cls=_DefaultGroup, context_settings={'help_option_names': ['-h', '--help']})
+def main():
+    """智能合约安全审计工具"""
+
+
+@main.command(
+    help='智能合约安全审计工具\n\n扫描 Solidity 智能合约，检测安全漏洞并生成报告。\n\n'
+         '大的代码库可以用 --shard i/N 分片在多台机器上审计，再用 contract-auditor merge 合并结果。',
     context_settings={'help_option_names': ['-h', '--help']}
 )
 @click.argument('input_path', required=False)
@@ -144,7 +222,46 @@ def _filter_by_severity(issues: List, severity: str):
               default='both', help='输出格式：json/html/both（默认：both）')
 @click.option('--severity', '-s', type=click.Choice(['critical', 'high', 'medium', 'low'], case_sensitive=False),
               default='low', help='最低风险等级过滤：critical/high/medium/low（默认：low）')
-def main(input_path, output_dir, format, severity):
+@click.option('--profile', is_flag=True,
+              help='记录各阶段、检测器、文件和函数的耗时与内存，并在JSON报告中加入 performance 部分')
+@click.option('--profile-top', type=int, default=10,
+              help='剖析报告中显示最慢的前 N 个文件/函数（默认：10）')
+@click.option('--profile-output', type=click.Path(),
+              help='将 cProfile 统计保存到指定文件（pstats 格式，隐含 --profile）')
+@click.option('--file-timeout', type=float,
+              help='每个文件的时间预算（秒），超出后该文件标记为部分分析并继续扫描其他文件')
+@click.option('--file-memory', type=int,
+              help='每个文件的内存预算（MB）')
+@click.option('--detector-timeout', type=float,
+              help='每个检测器在每个文件上的时间预算（秒）')
+@click.option('--detector-memory', type=int,
+              help='每个检测器在每个文件上的内存预算（MB）')
+@click.option('--analyses', default='all',
+              help='报告中包含的分析，逗号分隔：call_graph,taint,control_flow,data_flow,reachability，'
+                   '或 all/none（默认：all）；只执行所选分析和检测器实际用到的分析')
+@click.option('--detectors', 'detector_names', default='all',
+              help='运行的检测器，逗号分隔（如 reentrancy,access-control），或 all/none（默认：all）')
+@click.option('--reachable-only', is_flag=True,
+              help='只检测和分析从 public/external 入口点可达的函数（跳过没有入口点调用到的 private/internal 函数）')
+@click.option('--jobs', '-j', type=int, default=1,
+              help='解析文件的工作进程数，0 表示 CPU 核数（默认：1，不使用子进程）')
+@click.option('--timings', type=click.Path(dir_okay=False),
+              help='解析耗时记录文件：多进程解析时按之前运行的实际耗时安排任务，并写回本次的耗时')
+@click.option('--artifacts', type=click.Path(exists=True), multiple=True,
+              help='编译产物（Foundry/Hardhat 的 out 目录、solc 标准 JSON 输出或 --ast-compact-json 输出，'
+                   '可多次指定）：使用其中编译器生成的AST，没有产物或产物已过期的文件仍按源码解析')
+@click.option('--baseline', type=click.Path(exists=True),
+              help='基线：之前生成的 JSON 报告或报告目录，只报告不在基线中的新问题（按问题指纹比较）')
+@click.option('--shard',
+              help='只审计第 i 个分片（共 N 个，格式 i/N），结果包写入输出目录，'
+                   '所有分片完成后用 contract-auditor merge 合并生成报告')
+@click.option('--fail-fast', is_flag=True,
+              help='发现第一个不低于 --severity 的问题（使用基线时为新问题）后立即停止，写出标记为截断的报告')
+@click.option('--max-issues', type=click.IntRange(min=1),
+              help='发现 N 个问题（使用基线时为新问题）后停止，写出标记为截断的报告')
+def audit(input_path, output_dir, format, severity, profile, profile_top, profile_output,
+          file_timeout, file_memory, detector_timeout, detector_memory, analyses, detector_names, jobs,
+          baseline, shard, fail_fast, max_issues, timings, artifacts, reachable_only):
 
     # 检查是否提供了输入路径
     if input_path is None:
@@ -166,6 +283,51 @@ def main(input_path, output_dir, format, severity):
         print(Fore.CYAN + "使用 -h 或 --help 查看帮助信息" + Style.RESET_ALL)
         sys.exit(1)
     
+    # 选择分析和检测器
+    analysis_graph = default_graph()
+    selected_analyses = _select_analyses(analyses, analysis_graph)
+    if reachable_only and 'reachability' not in selected_analyses:
+        selected_analyses.append('reachability')
+    selected_detectors = _select_detectors(detector_names, default_detectors())
+    
+    # 分片（基线在合并时应用）
+    if shard:
+        try:
+            shard_index, shard_count = parse_shard(shard)
+        except ShardError as e:
+            raise click.BadParameter(str(e), param_hint='--shard')
+        if baseline:
+            raise click.BadParameter("分片审计不使用基线，请在 merge 时指定", param_hint='--baseline')
+        if fail_fast or max_issues:
+            raise click.BadParameter("分片审计需要完整的结果才能合并", param_hint='--fail-fast/--max-issues')
+    
+    # 提前结束：问题数达到上限（--fail-fast 即上限为 1）
+    issue_cap = 1 if fail_fast else max_issues
+    
+    # 加载基线（已知问题的指纹）
+    known = Baseline()
+    if baseline:
+        try:
+            known = Baseline.load(baseline)
+        except ValueError as e:
+            raise click.BadParameter(str(e), param_hint='--baseline')
+    
+    # 性能剖析
+    profile = profile or bool(profile_output)
+    profiler = Profiler(enabled=profile)
+    profiler.start()
+    cprofiler = None
+    if profile_output:
+        import cProfile
+        cprofiler = cProfile.Profile()
+        cprofiler.enable()
+    
+    # 源码按需从内存映射读取，工作进程只接收文件句柄
+    store = SourceStore()
+    parser = None
+    parallel = None
+    reports = None
+    
     try:
         print(Fore.CYAN + Style.BRIGHT + "\n" + "="*60)
         print("  智能合约安全审计工具")
@@ -173,7 +335,9 @@ def main(input_path, output_dir, format, severity):
         
         # 查找Solidity文件
         print(Fore.YELLOW + "正在查找 Solidity 文件..." + Style.RESET_ALL)
-        files = find_solidity_files(input_path)
+        with profiler.stage('discover') as record:
+            files = find_solidity_files(input_path, store)
+            record.items = len(files)
         
         if not files:
             print(Fore.RED + f"错误: 在 {input_path} 中未找到 .sol 文件" + Style.RESET_ALL)
@@ -189,7 +353,8 @@ def main(input_path, output_dir, format, severity):
             classified = {'single_files': files, 'projects': {}}
         else:
             # 目录模式：分类文件
-            classified = classify_files(files, str(input_path_obj))
+            with profiler.stage('classify'):
+                classified = classify_files(files, str(input_path_obj))
             print(Fore.CYAN + f"  单文件: {len(classified['single_files'])} 个" + Style.RESET_ALL)
             # projects 现在是字典
             total_project_files = sum(len(files) for files in classified['projects'].values())
@@ -204,167 +369,244 @@ def main(input_path, output_dir, format, severity):
         # 判断是否需要分开报告
         has_both = len(classified['single_files']) > 0 and len(classified['projects']) > 0
         
+        # 分片：只处理分配到本分片的项目和单文件，按文件记录结果
+        records = None
+        if shard:
+            layout = layout_of(classified)
+            classified = select_shard(classified, shard_index, shard_count,
+                                      lambda path, source: store.read(source).encode('utf-8'))
+            records = {}
+            print(Fore.CYAN + f"分片 {shard_index}/{shard_count}: 单文件 {len(classified['single_files'])} 个，"
+                  f"项目 {len(classified['projects'])} 个" + Style.RESET_ALL)
+        
         # 初始化组件
-        parser = SolidityParser()
-        detectors = [
-            ReentrancyDetector(),
-            AccessControlDetector(),
-            ExternalCallDetector(),
-            UncheckedReturnDetector(),
-            DelegatecallDetector()
-        ]
-        
-        json_reporter = JSONReporter()
-        html_reporter = HTMLReporter()
+        limits = BudgetLimits(
+            file_time=file_timeout,
+            file_memory=file_memory * 1024 * 1024 if file_memory else None,
+            detector_time=detector_timeout,
+            detector_memory=detector_memory * 1024 * 1024 if detector_memory else None
+        )
+        if artifacts:
+            parser = ArtifactParser(ArtifactIndex(list(artifacts)))
+            print(Fore.CYAN + f"编译产物: {len(parser.index)} 个源文件的AST" + Style.RESET_ALL)
+            for error in parser.index.errors:
+                print(Fore.YELLOW + f"  无法读取编译产物: {error}" + Style.RESET_ALL)
+        else:
+            parser = SolidityParser()
+        jobs = jobs if jobs > 0 else (os.cpu_count() or 1)
+        if jobs > 1:
+            parallel = ParallelParser(jobs, limits, cost_model=CostModel(TimingCache(timings)))
+        sources = SourceCache(parser, ImportResolver())
+        results = ResultCache()
+        issue_store = IssueStore()
+        min_severity = Severity.from_string(severity)
+        detectors = _schedule_detectors(selected_detectors, min_severity)
+        plan = AnalysisPlan(analysis_graph, selected_analyses, detectors)
+        if plan.skipped:
+            print(Fore.CYAN + f"跳过分析（所选检测器和报告不需要）: {', '.join(plan.skipped)}"
+                  + Style.RESET_ALL)
+        
+        # 报告在后台线程中写出（最多一组报告等待写出），使用单独的剖析器，结束时合并
+        reports = BackgroundTasks(maxsize=1, name='report')
+        report_profiler = Profiler(enabled=profile, track_memory=False)
+        
+        # 问题数达到上限时提前结束：当前组写出截断的报告，之后的组跳过
+        stop = issue_limit(issue_store, issue_cap, known.fingerprints) if issue_cap else None
+        truncated = None
+        skipped_projects = []
+        
+        def mark_truncated(data):
+            nonlocal truncated
+            if data['truncated'] is not None:
+                data['truncated'].update(reason='fail-fast' if fail_fast else 'max-issues', limit=issue_cap)
+                truncated = data['truncated']
         
         # 处理单文件和项目，分别生成报告
-        reports_generated = []
         filtered_single_issues = []
-        all_projects_issues = []  # 存储所有项目的问题
         
         # 处理单文件
         if classified['single_files']:
             print(Fore.YELLOW + "\n" + "="*60 + Style.RESET_ALL)
             print(Fore.YELLOW + "处理单文件..." + Style.RESET_ALL)
             
-            single_files_issues, single_files_data = _process_files(
+            single_profiler = profiler.child()
+            single_files_issues, single_files_data = run_files(
                 classified['single_files'], parser, detectors,
                 call_graph_analyzer=CallGraphAnalyzer(),
                 taint_analyzer=TaintAnalyzer(),
                 control_flow_analyzer=ControlFlowAnalyzer(),
-                data_flow_analyzer=DataFlowAnalyzer()
+                data_flow_analyzer=DataFlowAnalyzer(),
+                profiler=single_profiler,
+                limits=limits,
+                sources=sources,
+                results=results,
+                min_severity=min_severity,
+                plan=plan,
+                store=store,
+                parallel=parallel,
+                issue_store=issue_store,
+                records=records,
+                log=print,
+                stop=stop,
+                reachable_only=reachable_only
             )
+            mark_truncated(single_files_data)
             
-            # 过滤风险等级
-            filtered_single_issues = _filter_by_severity(single_files_issues, severity)
+            # 问题在产生时已按风险等级过滤；基线中已有的问题不再报告
+            filtered_single_issues = single_files_issues.where(exclude_fingerprints=known.fingerprints)
             
-            # 生成报告
-            if has_both:
-                # 有单文件和项目，使用子目录
-                single_output_dir = Path(base_output_dir) / "single_files"
+            # 生成报告（后台线程写出，同时处理项目；分片审计只记录结果，合并时生成报告）
+            if records is None:
+                # 有单文件和项目时使用子目录，只有单文件时使用原输出目录
+                single_output_dir = report_dir(base_output_dir, has_both)
                 single_output_dir.mkdir(parents=True, exist_ok=True)
-            else:
-                # 只有单文件，使用原输出目录
-                single_output_dir = Path(base_output_dir)
+                reports.submit(_write_reports, filtered_single_issues, single_files_data, single_output_dir,
+                               '单文件', format, report_profiler,
+                               single_profiler.to_dict(profile_top) if profile else None)
             
-            if format in ['json', 'both']:
-                json_path = str(single_output_dir / "report.json")
-                json_reporter.generate(filtered_single_issues, single_files_data['call_graph'],
-                                     single_files_data['taint_paths'],
-                                     single_files_data['control_flow'],
-                                     single_files_data['data_flow'], json_path)
-                print(Fore.GREEN + f"  单文件JSON报告: {json_path}" + Style.RESET_ALL)
-                reports_generated.append(json_path)
-            
-            if format in ['html', 'both']:
-                html_path = str(single_output_dir / "report.html")
-                html_reporter.generate(filtered_single_issues, single_files_data['call_graph'],
-                                      single_files_data['taint_paths'],
-                                      single_files_data['control_flow'],
-                                      single_files_data['data_flow'], html_path)
-                print(Fore.GREEN + f"  单文件HTML报告: {html_path}" + Style.RESET_ALL)
-                reports_generated.append(html_path)
+            profiler.merge(single_profiler)
         
         # 处理项目（为每个项目单独生成报告）
-        all_projects_issues = []
         project_issues_map = {}  # 存储每个项目的问题列表
         if classified['projects']:
             print(Fore.YELLOW + "\n" + "="*60 + Style.RESET_ALL)
             print(Fore.YELLOW + "处理项目文件..." + Style.RESET_ALL)
             
-            # 确定项目报告的基础目录
-            if has_both:
-                # 有单文件和项目，使用子目录
-                projects_base_dir = Path(base_output_dir) / "projects"
-            else:
-                # 只有项目，使用原输出目录
-                projects_base_dir = Path(base_output_dir)
-            projects_base_dir.mkdir(parents=True, exist_ok=True)
-            
             # 为每个项目单独生成报告
             for project_name, project_files in classified['projects'].items():
+                if truncated is not None:
+                    skipped_projects.append(project_name)
+                    continue
                 print(Fore.YELLOW + f"\n处理项目: {project_name}" + Style.RESET_ALL)
                 
                 # 处理当前项目的文件
-                project_issues, project_data = _process_files(
+                project_profiler = profiler.child()
+                project_issues, project_data = run_files(
                     project_files, parser, detectors,
                     call_graph_analyzer=CallGraphAnalyzer(),
                     taint_analyzer=TaintAnalyzer(),
                     control_flow_analyzer=ControlFlowAnalyzer(),
-                    data_flow_analyzer=DataFlowAnalyzer()
+                    data_flow_analyzer=DataFlowAnalyzer(),
+                    profiler=project_profiler,
+                    limits=limits,
+                    sources=sources,
+                    results=results,
+                    min_severity=min_severity,
+                    plan=plan,
+                    store=store,
+                    parallel=parallel,
+                    issue_store=issue_store,
+                    project=project_name,
+                    records=records,
+                    log=print,
+                    stop=stop,
+                    reachable_only=reachable_only
                 )
+                mark_truncated(project_data)
                 
-                # 过滤风险等级
-                filtered_project_issues = _filter_by_severity(project_issues, severity)
-                all_projects_issues.extend(filtered_project_issues)
+                # 问题在产生时已按风险等级过滤；基线中已有的问题不再报告
+                filtered_project_issues = project_issues.where(exclude_fingerprints=known.fingerprints)
                 project_issues_map[project_name] = filtered_project_issues  # 保存每个项目的问题
                 
-                # 为当前项目创建单独的报告目录
-                project_output_dir = projects_base_dir / project_name
-                project_output_dir.mkdir(parents=True, exist_ok=True)
-                
-                # 生成报告
-                if format in ['json', 'both']:
-                    json_path = str(project_output_dir / "report.json")
-                    json_reporter.generate(filtered_project_issues, project_data['call_graph'],
-                                         project_data['taint_paths'],
-                                         project_data['control_flow'],
-                                         project_data['data_flow'], json_path)
-                    print(Fore.GREEN + f"  {project_name} JSON报告: {json_path}" + Style.RESET_ALL)
-                    reports_generated.append(json_path)
+                # 为当前项目创建单独的报告目录，生成报告（后台线程写出，同时处理下一个项目）
+                if records is None:
+                    project_output_dir = report_dir(base_output_dir, has_both, project_name)
+                    project_output_dir.mkdir(parents=True, exist_ok=True)
+                    reports.submit(_write_reports, filtered_project_issues, project_data, project_output_dir,
+                                   f'{project_name} ', format, report_profiler,
+                                   project_profiler.to_dict(profile_top) if profile else None)
                 
-                if format in ['html', 'both']:
-                    html_path = str(project_output_dir / "report.html")
-                    html_reporter.generate(filtered_project_issues, project_data['call_graph'],
-                                          project_data['taint_paths'],
-                                          project_data['control_flow'],
-                                          project_data['data_flow'], html_path)
-                    print(Fore.GREEN + f"  {project_name} HTML报告: {html_path}" + Style.RESET_ALL)
-                    reports_generated.append(html_path)
+                profiler.merge(project_profiler)
+        
+        # 等待报告写完
+        reports_generated = [path for paths in reports.wait() for path in paths]
+        profiler.merge(report_profiler)
+        
+        # 写出分片的结果包
+        if records is not None:
+            bundle_path = Path(base_output_dir) / f"shard-{shard_index}-of-{shard_count}.bundle"
+            bundle_path.parent.mkdir(parents=True, exist_ok=True)
+            with profiler.stage('shard.bundle') as record:
+                write_bundle(str(bundle_path), shard_index, shard_count, layout, records, {
+                    'severity': min_severity.name.lower(),
+                    'analyses': selected_analyses,
+                    'detectors': [detector.name for detector in detectors]
+                })
+                record.items = len(records)
+        
+        # 导入解析和去重统计
+        profiler.count('parse.unique_files', sources.misses - sources.content_hits)
+        if parallel is not None:
+            profiler.count('parse.parallel', parallel.parsed)
+            profiler.count('parse.split_files', parallel.split)
+        if isinstance(parser, ArtifactParser):
+            profiler.count('parse.artifact_files', parser.mapped)
+            profiler.count('parse.stale_artifacts', parser.stale)
+        profiler.count('dedup.files.hits', sources.content_hits)
+        profiler.count('dedup.files.total', sources.misses)
+        for kind, stats in results.stats().items():
+            profiler.count(f'dedup.functions.{kind}.hits', stats['hits'])
+            profiler.count(f'dedup.functions.{kind}.total', stats['total'])
+        for importer, paths in sources.unresolved.items():
+            for path in paths:
+                print(Fore.YELLOW + f"  无法解析导入: {path} ({importer})" + Style.RESET_ALL)
         
         # 显示摘要
         print(Fore.CYAN + Style.BRIGHT + "\n" + "="*60)
         print("  检测完成")
         print("="*60 + Style.RESET_ALL)
         
-        from collections import Counter
+        # 汇总所有问题（没有基线时直接使用存储中的计数）
+        all_filtered_issues = issue_store.view().where(exclude_fingerprints=known.fingerprints)
+        _print_summary(all_filtered_issues, filtered_single_issues, project_issues_map,
+                       bool(classified['single_files']))
         
-        # 汇总所有问题
-        all_filtered_issues = []
-        if classified['single_files']:
-            all_filtered_issues.extend(filtered_single_issues)
-        if classified['projects']:
-            all_filtered_issues.extend(all_projects_issues)
+        if baseline:
+            baseline_hits = len(issue_store) - len(all_filtered_issues)
+            print(f"\n基线: 忽略 {baseline_hits} 个已知问题（基线共 {len(known)} 个指纹），"
+                  f"新问题 {len(all_filtered_issues)} 个")
         
-        if all_filtered_issues:
-            severity_counts = Counter([str(issue.severity) for issue in all_filtered_issues])
-            
-            print(f"\n总计发现: {len(all_filtered_issues)} 个问题")
-            print(f"  Critical: {severity_counts.get('Critical', 0)}")
-            print(f"  High: {severity_counts.get('High', 0)}")
-            print(f"  Medium: {severity_counts.get('Medium', 0)}")
-            print(f"  Low: {severity_counts.get('Low', 0)}")
-            
-            if classified['single_files'] and classified['projects']:
-                print(f"\n  单文件: {len(filtered_single_issues)} 个问题")
-                print(f"  项目: {len(all_projects_issues)} 个问题")
-            elif classified['projects']:
-                # 显示每个项目的问题数
-                for project_name in classified['projects'].keys():
-                    project_issues_count = len(project_issues_map.get(project_name, []))
-                    print(f"  {project_name}: {project_issues_count} 个问题")
-        
-        print(Fore.GREEN + f"\n报告已保存到: {base_output_dir}" + Style.RESET_ALL)
-        if classified['single_files'] and classified['projects']:
-            print(Fore.CYAN + f"  单文件报告: {base_output_dir}/single_files/" + Style.RESET_ALL)
-            print(Fore.CYAN + f"  项目报告: {base_output_dir}/projects/" + Style.RESET_ALL)
-        elif classified['projects']:
-            print(Fore.CYAN + f"  项目报告: {base_output_dir}/projects/" + Style.RESET_ALL)
-            for project_name in classified['projects'].keys():
-                print(Fore.CYAN + f"    - {project_name}: {base_output_dir}/projects/{project_name}/" + Style.RESET_ALL)
+        if truncated is not None:
+            option = '--fail-fast' if fail_fast else f'--max-issues {issue_cap}'
+            print(Fore.RED + f"\n提前结束（{option}）: 报告不完整" + Style.RESET_ALL)
+            if skipped_projects:
+                print(Fore.RED + f"  未检测的项目: {', '.join(skipped_projects)}" + Style.RESET_ALL)
+        
+        # 去重命中率
+        dedup_stats = results.stats()
+        function_hits = sum(stats['hits'] for stats in dedup_stats.values())
+        function_total = sum(stats['total'] for stats in dedup_stats.values())
+        # 读取的文件数（misses 已包括内容与已解析文件相同而复用的文件）
+        file_total = sources.misses
+        rates = []
+        if sources.content_hits and file_total:
+            rates.append(f"相同文件 {sources.content_hits}/{file_total} "
+                         f"({sources.content_hits / file_total:.1%})")
+        if function_hits and function_total:
+            rates.append(f"函数结果复用 {function_hits}/{function_total} "
+                         f"({function_hits / function_total:.1%})")
+        if rates:
+            print(f"\n去重: {'，'.join(rates)}")
+        
+        if profile:
+            profiler.stop()
+            print(Fore.CYAN + Style.BRIGHT + "\n性能剖析" + Style.RESET_ALL)
+            for line in profiler.format_report(profile_top):
+                print("  " + line)
+            if cprofiler:
+                cprofiler.disable()
+                cprofiler.dump_stats(profile_output)
+                print(Fore.GREEN + f"  cProfile 统计已保存到: {profile_output}" + Style.RESET_ALL)
+        
+        if records is not None:
+            print(Fore.GREEN + f"\n分片结果已保存到: {bundle_path}" + Style.RESET_ALL)
+            print(Fore.CYAN + "  所有分片完成后运行 contract-auditor merge <结果包...> 生成报告" + Style.RESET_ALL)
+            sys.exit(0)  # 是否有漏洞由合并后的结果决定
+        
+        _print_report_locations(base_output_dir, bool(classified['single_files']), list(classified['projects']))
         
         if len(all_filtered_issues) > 0:
-            sys.exit(1)  # 有漏洞时返回非0退出码
+            sys.exit(1)  # 有漏洞（使用基线时为有新漏洞）时返回非0退出码
         else:
             sys.exit(0)
     
@@ -373,6 +615,89 @@ def main(input_path, output_dir, format, severity):
         import traceback
         traceback.print_exc()
         sys.exit(1)
+    
+    finally:
+        if reports is not None:
+            reports.close()
+        if parallel is not None:
+            parallel.close()
+            parallel.cost_model.timings.save()
+        if isinstance(parser, ArtifactParser):
+            parser.index.close()
+        store.close()
+
+
+@main.command(
+    help='合并分片审计的结果包（--shard i/N 生成），生成与单机运行相同的报告。',
+    context_settings={'help_option_names': ['-h', '--help']}
+)
+@click.argument('bundles', nargs=-1, required=True, type=click.Path(exists=True, dir_okay=False))
+@click.option('--output-dir', '-o', type=click.Path(),
+              help='指定报告输出目录（默认：第一个结果包所在目录）')
+@click.option('--format', '-f', type=click.Choice(['json', 'html', 'both'], case_sensitive=False),
+              default='both', help='输出格式：json/html/both（默认：both）')
+@click.option('--baseline', type=click.Path(exists=True),
+              help='基线：之前生成的 JSON 报告或报告目录，只报告不在基线中的新问题（按问题指纹比较）')
+def merge(bundles, output_dir, format, baseline):
+    try:
+        layout, meta, records = read_bundles(list(bundles))
+    except ShardError as e:
+        raise click.BadParameter(str(e), param_hint='BUNDLES')
+    
+    known = Baseline()
+    if baseline:
+        try:
+            known = Baseline.load(baseline)
+        except ValueError as e:
+            raise click.BadParameter(str(e), param_hint='--baseline')
+    
+    try:
+        print(Fore.CYAN + Style.BRIGHT + "\n" + "="*60)
+        print("  合并分片结果")
+        print("="*60 + Style.RESET_ALL + "\n")
+        print(Fore.GREEN + f"{len(bundles)} 个分片，共 {len(records)} 个文件（风险等级: {meta['severity']}）"
+              + Style.RESET_ALL)
+        
+        base_output_dir = output_dir or str(Path(bundles[0]).parent)
+        has_both = bool(layout['single_files']) and bool(layout['projects'])
+        profiler = Profiler(enabled=False)
+        issue_store = IssueStore()
+        
+        # 与单机运行相同的分组和报告目录
+        filtered_single_issues = []
+        if layout['single_files']:
+            single_issues, single_data = _merge_files(layout['single_files'], records, issue_store)
+            filtered_single_issues = single_issues.where(exclude_fingerprints=known.fingerprints)
+            single_output_dir = report_dir(base_output_dir, has_both)
+            single_output_dir.mkdir(parents=True, exist_ok=True)
+            _write_reports(filtered_single_issues, single_data, single_output_dir, '单文件', format, profiler)
+        
+        project_issues_map = {}
+        for project_name, project_paths in layout['projects'].items():
+            project_issues, project_data = _merge_files(project_paths, records, issue_store, project_name)
+            project_issues_map[project_name] = project_issues.where(exclude_fingerprints=known.fingerprints)
+            project_output_dir = report_dir(base_output_dir, has_both, project_name)
+            project_output_dir.mkdir(parents=True, exist_ok=True)
+            _write_reports(project_issues_map[project_name], project_data, project_output_dir,
+                           f'{project_name} ', format, profiler)
+        
+        print(Fore.CYAN + Style.BRIGHT + "\n" + "="*60)
+        print("  合并完成")
+        print("="*60 + Style.RESET_ALL)
+        
+        all_filtered_issues = issue_store.view().where(exclude_fingerprints=known.fingerprints)
+        _print_summary(all_filtered_issues, filtered_single_issues, project_issues_map,
+                       bool(layout['single_files']))
+        if baseline:
+            print(f"\n基线: 忽略 {len(issue_store) - len(all_filtered_issues)} 个已知问题"
+                  f"（基线共 {len(known)} 个指纹），新问题 {len(all_filtered_issues)} 个")
+        
+        _print_report_locations(base_output_dir, bool(layout['single_files']), list(layout['projects']))
+        sys.exit(1 if all_filtered_issues else 0)
+    
+    except Exception as e:
+        print(Fore.RED + f"\n错误: {str(e)}" + Style.RESET_ALL)
+        sys.exit(1)
 
 
 if __name__ == '__main__':
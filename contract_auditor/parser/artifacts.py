@@ -0,0 +1,516 @@
+"""编译产物中的AST
+
+已经用 solc/Foundry/Hardhat 编译的项目，编译产物中有编译器生成的精确AST（compact JSON 格式）。
+ArtifactParser 把这些AST映射为与 SolidityParser 相同的模型（AST/ContractNode/FunctionNode...），
+没有对应产物、或产物与当前源码不一致的文件仍用 SolidityParser 解析。
+
+支持的产物（可以混合放在同一目录下）：
+- Foundry/Hardhat 的合约产物（out/A.sol/A.json 等）：顶层的 "ast"
+- solc 标准 JSON 输出：sources.<路径>.ast；Foundry 的 build-info：output.sources.<路径>.ast
+- solc --ast-compact-json 的输出（多个文件的AST之间有 "======= a.sol =======" 标题）
+
+产物通过 mmap 增量读取（见 json_stream），字节码、ABI、元数据只跳过：
+建立索引时只记录每个源文件的AST（SourceUnit）在产物中的位置，解析某个文件时才读取这一个AST，
+并丢弃审计用不到的字段（类型描述、文档注释等）。
+
+产物中的偏移是编译时源码的 UTF-8 字节偏移。源码的字节长度与编译时不同（已修改），
+或合约的位置对不上时，认为产物已过期，改用 SolidityParser。
+换行为 \\r\\n 的文件读取时已转换为 \\n，字节偏移对不上，同样改用 SolidityParser。
+"""
+
+import mmap
+import os
+import re
+from bisect import bisect_left, bisect_right
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+from .ast_builder import (AST, CallNode, ContractNode, FunctionDeclarationNode, FunctionNode, ImportNode,
+                          ModifierNode, StateChangeNode, StateVariableNode)
+from .json_stream import JSONError, JSONReader
+from .solidity_parser import SolidityParser
+from ..utils.budget import BudgetExceeded, check_budget
+
+# 产物文件
+_ARTIFACT_SUFFIXES = ('.json', '_json.ast')
+
+# 建立索引时不进入的键（字节码、ABI、元数据，以及 build-info 中的源码）
+_SKIP_KEYS = frozenset(('abi', 'bytecode', 'deployedBytecode', 'methodIdentifiers', 'rawMetadata', 'metadata',
+                        'evm', 'contracts', 'input', 'storageLayout', 'devdoc', 'userdoc', 'errors', 'ir',
+                        'irOptimized'))
+# 建立索引时查找 SourceUnit 的最大深度（build-info 中为 output.sources.<路径>.ast）
+_MAX_DEPTH = 5
+
+# 读取AST时丢弃的字段
+_DROP_KEYS = frozenset(('documentation', 'typeDescriptions', 'nameLocation', 'nameLocations', 'exportedSymbols',
+                        'argumentTypes', 'isConstant', 'isLValue', 'isPure', 'lValueRequested', 'functionSelector',
+                        'baseFunctions', 'overloadedDeclarations', 'scope', 'literals', 'license', 'hexValue',
+                        'typeString', 'certainKind', 'externalReferences', 'AST', 'evmVersion'))
+
+_EXTERNAL_CALL_TYPES = ('call', 'send', 'transfer', 'delegatecall', 'staticcall')
+_LOW_LEVEL_CALL_TYPES = ('call', 'delegatecall', 'staticcall')
+# 不作为函数调用记录的内置函数（与 SolidityParser 相同）
+_BUILTIN_CALLS = ('require', 'assert', 'revert')
+_SIMPLE_TARGET = re.compile(r'\w+(?:\.\w+)?')
+_WHITESPACE = re.compile(r'\s+')
+
+
+@dataclass
+class ArtifactSource:
+    """产物中一个源文件的AST"""
+    path: str  # AST 中的 absolutePath（编译时的源文件路径）
+    artifact: str  # 产物文件
+    offset: int  # SourceUnit 在产物文件中的字节偏移
+    length: int  # 编译时源码的字节长度
+
+
+class ArtifactIndex:
+    """编译产物中的源文件索引（首次查找时扫描产物建立）"""
+
+    def __init__(self, paths: List[str]):
+        """
+        Args:
+            paths: 产物文件或目录（目录中的 *.json 和 *_json.ast 递归查找）
+        """
+        self.paths = list(paths)
+        self._sources: Optional[Dict[str, ArtifactSource]] = None  # 规范化的 absolutePath -> 位置
+        self._maps: Dict[str, mmap.mmap] = {}
+        self.errors: List[str] = []  # 无法读取的产物
+
+    def __len__(self) -> int:
+        return len(self._index())
+
+    def find(self, file_path: str) -> Optional[ArtifactSource]:
+        """
+        查找文件的AST：产物中的路径（通常相对于项目根目录）与文件路径的最长后缀匹配
+
+        Returns:
+            ArtifactSource；没有时返回 None
+        """
+        sources = self._index()
+        if not sources:
+            return None
+        parts = _normalize(os.path.abspath(file_path)).split('/')
+        for i in range(len(parts)):
+            entry = sources.get('/'.join(parts[i:]))
+            if entry is not None:
+                return entry
+        return None
+
+    def load(self, entry: ArtifactSource) -> dict:
+        """读取一个源文件的AST（丢弃审计用不到的字段）"""
+        reader = JSONReader(self._map(entry.artifact), entry.offset)
+        return reader.read(drop=_DROP_KEYS)
+
+    def close(self):
+        """释放产物文件的映射"""
+        for mapped in self._maps.values():
+            mapped.close()
+        self._maps.clear()
+
+    def _index(self) -> Dict[str, ArtifactSource]:
+        if self._sources is None:
+            self._sources = {}
+            for artifact in self._artifact_files():
+                try:
+                    self._scan_artifact(artifact)
+                except (OSError, ValueError) as e:
+                    self.errors.append(f"{artifact}: {e}")
+        return self._sources
+
+    def _artifact_files(self) -> List[str]:
+        files = []
+        for path in self.paths:
+            if os.path.isfile(path):
+                files.append(path)
+                continue
+            for root, dirs, names in os.walk(path):
+                dirs.sort()
+                files.extend(os.path.join(root, name) for name in sorted(names)
+                             if name.endswith(_ARTIFACT_SUFFIXES))
+        return files
+
+    def _scan_artifact(self, artifact: str):
+        if os.path.getsize(artifact) == 0:
+            return
+        reader = JSONReader(self._map(artifact))
+        while reader.next_document():
+            self._scan(reader, artifact, 0)
+
+    def _scan(self, reader: JSONReader, artifact: str, depth: int):
+        """在一个值中查找 SourceUnit（读取位置在值之前，结束时在值之后）"""
+        char = reader.peek()
+        if char == b'[':
+            for _ in reader.items():
+                if depth < _MAX_DEPTH:
+                    self._scan(reader, artifact, depth + 1)
+                else:
+                    reader.skip()
+            return
+        if char != b'{':
+            reader.skip()
+            return
+
+        start = reader.pos
+        fields = {}
+        for key in reader.keys():
+            if key in ('absolutePath', 'nodeType', 'src') and reader.peek() == b'"':
+                fields[key] = reader.string()
+            elif key in _SKIP_KEYS or fields.get('nodeType') == 'SourceUnit' or depth >= _MAX_DEPTH:
+                reader.skip()
+            else:
+                self._scan(reader, artifact, depth + 1)
+
+        if fields.get('nodeType') == 'SourceUnit' and fields.get('absolutePath') and fields.get('src'):
+            path = _normalize(fields['absolutePath'])
+            # 同一个源文件出现在多个产物中（如 Foundry 同一文件中每个合约一个产物）时用第一个
+            if path not in self._sources:
+                length = int(fields['src'].split(':')[1])
+                self._sources[path] = ArtifactSource(fields['absolutePath'], artifact, start, length)
+
+    def _map(self, artifact: str) -> mmap.mmap:
+        mapped = self._maps.get(artifact)
+        if mapped is None:
+            with open(artifact, 'rb') as f:
+                mapped = self._maps[artifact] = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        return mapped
+
+
+def _normalize(path: str) -> str:
+    path = os.path.normpath(path).replace('\\', '/')
+    return path[2:] if path.startswith('./') else path.lstrip('/')
+
+
+class _SourceMap:
+    """产物中的字节偏移 -> 源码中的字符偏移和行号"""
+
+    def __init__(self, source_code: str):
+        self.text = source_code
+        self._newlines = [match.start() for match in re.finditer('\n', source_code)]
+        # 多字节字符之后的位置（字节偏移）及到该处为止多出的字节数
+        self._byte_positions: List[int] = []
+        self._extra: List[int] = []
+        extra = 0
+        for match in re.finditer(r'[^\x00-\x7f]', source_code):
+            extra += len(match.group().encode('utf-8')) - 1
+            self._byte_positions.append(match.end() + extra)
+            self._extra.append(extra)
+        self.byte_length = len(source_code) + extra
+
+    def offset(self, byte_offset: int) -> int:
+        index = bisect_right(self._byte_positions, byte_offset)
+        return byte_offset - (self._extra[index - 1] if index else 0)
+
+    def range(self, node: dict) -> Tuple[int, int]:
+        """节点的 [start, end)（字符偏移）"""
+        start, length = node['src'].split(':')[:2]
+        start = int(start)
+        return self.offset(start), self.offset(start + int(length))
+
+    def line(self, offset: int) -> int:
+        return bisect_left(self._newlines, offset) + 1
+
+    def source(self, node: dict) -> str:
+        start, end = self.range(node)
+        return self.text[start:end]
+
+
+class ArtifactParser(SolidityParser):
+    """优先使用编译产物中的AST的解析器（没有可用的产物时按 SolidityParser 解析）"""
+
+    def __init__(self, index: ArtifactIndex):
+        super().__init__()
+        self.index = index
+        self.mapped = 0  # 使用产物中的AST的文件数
+        self.stale = 0  # 有产物但与源码不一致、改用正则解析的文件数
+
+    def has_artifact(self, file_path: str) -> bool:
+        """是否有该文件的产物（不检查是否过期）"""
+        return self.index.find(file_path) is not None
+
+    def parse(self, source_code: str, file_path: str = "") -> AST:
+        """解析Solidity源码：有与源码一致的产物时映射产物中的AST，否则用正则解析"""
+        entry = self.index.find(file_path)
+        if entry is not None:
+            try:
+                ast = self._from_artifact(entry, source_code, file_path)
+            except (JSONError, KeyError, ValueError, TypeError):
+                ast = None
+            if ast is not None:
+                self.mapped += 1
+                return ast
+            self.stale += 1
+        return super().parse(source_code, file_path)
+
+    def _from_artifact(self, entry: ArtifactSource, source_code: str, file_path: str) -> Optional[AST]:
+        source_map = _SourceMap(source_code)
+        if source_map.byte_length != entry.length:
+            return None
+        unit = self.index.load(entry)
+        nodes = unit.get('nodes', [])
+
+        ast = AST(source_code=source_code, file_path=file_path)
+        for node in nodes:
+            if node.get('nodeType') == 'ImportDirective':
+                ast.imports.append(_map_import(node, source_map))
+        try:
+            for node in nodes:
+                if node.get('nodeType') != 'ContractDefinition':
+                    continue
+                check_budget()
+                contract = _map_contract(node, source_map)
+                if contract is None:
+                    return None
+                ast.contracts.append(contract)
+        except BudgetExceeded as e:
+            e.partial_result = ast
+            raise
+        return ast
+
+
+def _map_import(node: dict, source_map: _SourceMap) -> ImportNode:
+    start, end = source_map.range(node)
+    return ImportNode(
+        line=source_map.line(start),
+        start=start,
+        end=end,
+        path=node.get('file', ''),
+        symbols=[alias['foreign']['name'] for alias in node.get('symbolAliases') or []],
+        alias=node.get('unitAlias') or None
+    )
+
+
+def _map_contract(node: dict, source_map: _SourceMap) -> Optional[ContractNode]:
+    """映射合约；合约的位置与源码对不上（产物已过期）时返回 None"""
+    start, end = source_map.range(node)
+    kind = node.get('contractKind', 'contract')
+    header = source_map.text[start:start + 80]
+    if not (header.startswith(kind) or header.startswith('abstract')) or node['name'] not in header:
+        return None
+    if header.startswith('abstract'):
+        # 与 SolidityParser 一致，合约从 contract 关键字开始
+        start = source_map.text.find(kind, start)
+
+    contract = ContractNode(
+        name=node['name'],
+        kind=kind,
+        bases=[_base_name(base['baseName']) for base in node.get('baseContracts') or []],
+        line=source_map.line(start),
+        start=start,
+        end=end
+    )
+    for member in node.get('nodes', []):
+        node_type = member.get('nodeType')
+        if node_type == 'FunctionDefinition':
+            func = _map_function(member, source_map)
+            if isinstance(func, FunctionDeclarationNode):
+                contract.declarations.append(func)
+            elif func is not None and member.get('kind') == 'constructor':
+                contract.constructor = func
+            elif func is not None:
+                contract.functions.append(func)
+        elif node_type == 'ModifierDefinition':
+            mod_start, mod_end = source_map.range(member)
+            contract.modifiers.append(ModifierNode(
+                name=member['name'],
+                body=source_map.text[mod_start:mod_end],
+                line=source_map.line(mod_start),
+                start=mod_start,
+                end=mod_end
+            ))
+        elif node_type == 'VariableDeclaration' and member.get('stateVariable'):
+            var_start, var_end = source_map.range(member)
+            type_name = member.get('typeName')
+            contract.state_variables.append(StateVariableNode(
+                name=member['name'],
+                var_type=_WHITESPACE.sub(' ', source_map.source(type_name)) if type_name else "",
+                visibility=member.get('visibility', 'internal'),
+                is_constant=bool(member.get('constant')) or member.get('mutability') == 'constant',
+                line=source_map.line(var_start),
+                start=var_start,
+                end=var_end
+            ))
+    return contract
+
+
+def _base_name(name_node: dict) -> str:
+    """is L.Base 中的基合约名（只保留合约名）"""
+    name = name_node.get('name') or name_node.get('namePath') or ''
+    return name.split('.')[-1]
+
+
+def _map_function(node: dict, source_map: _SourceMap):
+    """
+    映射函数；fallback/receive/constructor 以关键字为函数名（与 SolidityParser 一致）
+
+    Returns:
+        FunctionNode，或 FunctionDeclarationNode（没有函数体）
+    """
+    kind = node.get('kind', 'function')
+    name = node.get('name') or kind
+    start, end = source_map.range(node)
+    mutability = node.get('stateMutability', 'nonpayable')
+    fields = dict(
+        name=name,
+        visibility=node.get('visibility', 'public'),
+        modifiers=[invocation['modifierName'].get('name', '').split('.')[-1]
+                   for invocation in node.get('modifiers') or []
+                   if invocation.get('kind') != 'baseConstructorSpecifier'],
+        parameters=[param.get('name', '') for param in (node.get('parameters') or {}).get('parameters', [])],
+        returns=[param.get('name', '') for param in (node.get('returnParameters') or {}).get('parameters', [])],
+        is_payable=mutability == 'payable',
+        is_view=mutability == 'view',
+        is_pure=mutability == 'pure',
+        line=source_map.line(start),
+        start=start
+    )
+    body = node.get('body')
+    if not body:
+        return FunctionDeclarationNode(end=end, **fields)
+
+    body_start, body_end = source_map.range(body)
+    func = FunctionNode(
+        body=source_map.text[body_start:body_end],
+        body_line=source_map.line(body_start),
+        end=body_end,
+        **fields
+    )
+    func.calls, func.state_changes = _map_body(node, body, source_map)
+    return func
+
+
+def _map_body(func: dict, body: dict, source_map: _SourceMap) -> Tuple[List[CallNode], List[StateChangeNode]]:
+    """函数体中的调用和状态修改"""
+    # 局部变量（参数、返回值和函数体中声明的变量，storage 指针除外）：对它们的赋值不是状态修改
+    locals_ = set()
+    excluded = set()  # emit 和 revert 中的事件/错误调用
+    nodes = []
+    stack = [func.get('parameters'), func.get('returnParameters'), body]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, list):
+            stack.extend(reversed(node))
+            continue
+        if not isinstance(node, dict):
+            continue
+        if len(nodes) & 0x3FF == 0:
+            check_budget()
+        node_type = node.get('nodeType')
+        if node_type == 'VariableDeclaration' and node.get('storageLocation') != 'storage':
+            locals_.add(node.get('id'))
+        elif node_type == 'EmitStatement':
+            excluded.add(id(node.get('eventCall')))
+        elif node_type == 'RevertStatement':
+            excluded.add(id(node.get('errorCall')))
+        elif node_type == 'InlineAssembly':
+            continue
+        nodes.append(node)
+        stack.extend(reversed([value for value in node.values() if isinstance(value, (dict, list))]))
+
+    calls = []
+    changes = []
+    for node in nodes:
+        node_type = node.get('nodeType')
+        if node_type == 'FunctionCall' and id(node) not in excluded:
+            call = _map_call(node, source_map)
+            if call is not None:
+                calls.append(call)
+        elif node_type == 'Assignment':
+            changes.extend(_map_change(node['leftHandSide'], node, node.get('operator', '='), locals_, source_map))
+        elif node_type == 'UnaryOperation' and node.get('operator') in ('++', '--', 'delete'):
+            changes.extend(_map_change(node['subExpression'], node, node['operator'], locals_, source_map))
+
+    # 与 SolidityParser 一致：外部调用按类型在前，其后为函数调用，各自按位置排序
+    order = {call_type: i for i, call_type in enumerate(_EXTERNAL_CALL_TYPES + ('function_call',))}
+    calls.sort(key=lambda call: (order[call.call_type], call.start))
+    changes.sort(key=lambda change: change.start)
+    return calls, changes
+
+
+def _map_call(node: dict, source_map: _SourceMap) -> Optional[CallNode]:
+    if node.get('kind') in ('typeConversion', 'structConstructorCall'):
+        return None
+    callee = node['expression']
+    value = gas = None
+    options_end = None
+    if callee.get('nodeType') == 'FunctionCallOptions':
+        for name, option in zip(callee.get('names', []), callee.get('options', [])):
+            if name == 'value':
+                value = source_map.source(option).strip()
+            elif name == 'gas':
+                gas = source_map.source(option).strip()
+        options_end = source_map.range(callee)[1]
+        callee = callee['expression']
+
+    callee_start, callee_end = source_map.range(callee)
+    text = source_map.text
+    # 调用节点到左括号为止（与 SolidityParser 一致，包含调用选项）
+    paren = text.find('(', options_end or callee_end)
+    end = paren + 1 if paren >= 0 else callee_end
+    node_type = callee.get('nodeType')
+
+    if (node_type == 'MemberAccess' and callee.get('memberName') in _EXTERNAL_CALL_TYPES
+            and callee.get('referencedDeclaration') is None):
+        # 地址的内置成员（合约中同名的函数有 referencedDeclaration）：调用从 '.' 开始
+        member = callee['memberName']
+        dot = text.rfind('.', callee_start, callee_end - len(member))
+        start = dot if dot >= 0 else callee_start
+        return CallNode(
+            call_type=member,
+            value=value,
+            gas=gas,
+            is_low_level=member in _LOW_LEVEL_CALL_TYPES,
+            line=source_map.line(start),
+            start=start,
+            end=end
+        )
+
+    if node_type not in ('Identifier', 'MemberAccess'):
+        return None
+    target = _WHITESPACE.sub('', text[callee_start:callee_end])
+    start = callee_start
+    if not _SIMPLE_TARGET.fullmatch(target):
+        # a.b.c(...)、f()(...)：只保留最后一段
+        target = callee.get('memberName') or target
+        start = callee_end - len(target)
+    if target in _BUILTIN_CALLS:
+        return None
+    return CallNode(
+        call_type="function_call",
+        target=target,
+        value=value,
+        gas=gas,
+        line=source_map.line(start),
+        start=start,
+        end=end
+    )
+
+
+def _map_change(target: dict, node: dict, operation: str, locals_: set,
+                source_map: _SourceMap) -> List[StateChangeNode]:
+    """赋值、++/--、delete 的目标中的状态变量"""
+    if target.get('nodeType') == 'TupleExpression':
+        changes = []
+        for component in target.get('components') or []:
+            if component:
+                changes.extend(_map_change(component, node, operation, locals_, source_map))
+        return changes
+
+    root = target
+    while root.get('nodeType') in ('IndexAccess', 'IndexRangeAccess', 'MemberAccess'):
+        root = root.get('baseExpression') or root.get('expression')
+        if root is None:
+            return []
+    if root.get('nodeType') != 'Identifier' or root.get('referencedDeclaration') in locals_:
+        return []
+    if root.get('name') in ('this', 'super', 'msg', 'block', 'tx'):
+        return []
+
+    start, end = source_map.range(node)
+    return [StateChangeNode(
+        variable=_WHITESPACE.sub('', source_map.source(target)),
+        operation=operation,
+        line=source_map.line(start),
+        start=start,
+        end=end
+    )]
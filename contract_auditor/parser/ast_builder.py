@@ -1,7 +1,7 @@
 """AST节点定义"""
 
 from dataclasses import dataclass, field
-from typing import List, Optional, Dict
+from typing import Any, List, Optional, Dict
 
 
 @dataclass
@@ -9,15 +9,21 @@ class ASTNode:
     """AST节点基类"""
     line: int
     column: int = 0
+    start: int = 0  # 源码中的起始偏移
+    end: int = 0  # 源码中的结束偏移（不含）
 
 
 @dataclass
 class ContractNode(ASTNode):
     """合约节点"""
     name: str = ""
+    kind: str = "contract"  # contract, interface, library
+    bases: List[str] = field(default_factory=list)  # is A, B 中的基合约（按声明顺序）
     functions: List['FunctionNode'] = field(default_factory=list)
+    declarations: List['FunctionDeclarationNode'] = field(default_factory=list)  # 没有函数体的函数（接口、抽象成员）
     state_variables: List['StateVariableNode'] = field(default_factory=list)
     modifiers: List['ModifierNode'] = field(default_factory=list)
+    constructor: Optional['FunctionNode'] = None  # 构造函数（不参与检测和分析，只作为可达性的入口点）
 
 
 @dataclass
@@ -29,11 +35,26 @@ class FunctionNode(ASTNode):
     parameters: List[str] = field(default_factory=list)
     returns: List[str] = field(default_factory=list)
     body: str = ""
+    body_line: int = 0  # 函数体（左大括号）所在行，声明可能跨多行
     is_payable: bool = False
     is_view: bool = False
     is_pure: bool = False
     calls: List['CallNode'] = field(default_factory=list)
     state_changes: List['StateChangeNode'] = field(default_factory=list)
+    ir: Any = field(default=None, repr=False, compare=False)  # 缓存的语句级IR（见 parser.ir.function_ir）
+
+
+@dataclass
+class FunctionDeclarationNode(ASTNode):
+    """没有函数体的函数声明（接口函数、抽象合约中的未实现函数），不参与检测和按函数的分析"""
+    name: str = ""
+    visibility: str = "public"
+    modifiers: List[str] = field(default_factory=list)
+    parameters: List[str] = field(default_factory=list)
+    returns: List[str] = field(default_factory=list)
+    is_payable: bool = False
+    is_view: bool = False
+    is_pure: bool = False
 
 
 @dataclass
@@ -70,10 +91,19 @@ class StateChangeNode(ASTNode):
     operation: str = ""  # =, +=, -=, etc.
 
 
+@dataclass
+class ImportNode(ASTNode):
+    """导入节点"""
+    path: str = ""  # import 语句中的原始路径
+    symbols: List[str] = field(default_factory=list)  # import {A, B as C} 中导入的符号（空表示导入全部）
+    alias: Optional[str] = None  # import "x" as X / import * as X
+
+
 @dataclass
 class AST:
     """完整的AST"""
     contracts: List[ContractNode] = field(default_factory=list)
+    imports: List[ImportNode] = field(default_factory=list)
     source_code: str = ""
     file_path: str = ""
 
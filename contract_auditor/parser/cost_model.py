@@ -0,0 +1,189 @@
+"""解析代价模型和调度
+
+按文件顺序把文件交给工作进程时，排在最后的一个大文件（如上万行的合约）会让其他进程空等。
+代价模型估计每个文件的解析耗时，调度按估计值安排任务：
+- 估计：有之前运行记录的文件用实际耗时（按内容哈希记录，见 TimingCache）；
+  其他文件按大小和函数个数估计，并用有记录的文件的实际耗时与估计值之比校准
+- 最长任务优先（LPT）：接下来要用到的文件（ParallelParser 的 window）中，先提交估计耗时
+  最长的任务（主进程按文件顺序取用结果，只在窗口内重排，结果不会积压）
+- 拆分：估计耗时超过每个进程平均负担的文件按合约拆分为多个任务
+  （SolidityParser.parse_part），各部分分别解析后在主进程中合并
+
+解析完成后把实际耗时记录回 TimingCache，之后的运行估计得更准。
+"""
+
+import hashlib
+import json
+import math
+import os
+import re
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Tuple
+
+from ..utils.source_store import SourceHandle
+
+# 静态估计的系数（秒），由 SolidityParser 在生成的合约上的实测耗时拟合
+BASE_COST = 1e-3
+BYTE_COST = 4e-7
+FUNCTION_COST = 3.5e-4
+
+_FUNCTION_PATTERN = re.compile(rb'\bfunction\b')
+_CONTRACT_PATTERN = re.compile(rb'\b(?:contract|interface|library)\s+\w+\s*(?:is\s+[^{]+)?\{')
+
+TIMINGS_VERSION = 1
+
+
+def source_key(data: bytes) -> str:
+    """耗时记录的键（源码内容的哈希）"""
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+
+class TimingCache:
+    """
+    按源码内容记录的解析耗时（JSON 文件，多次运行之间共享）
+
+    内容不变的文件（包括在其他路径下的副本）使用同一条记录；文件修改后哈希改变，
+    旧记录不再命中。
+    """
+
+    def __init__(self, path: str = None):
+        """
+        Args:
+            path: 记录文件；为 None 时只在内存中记录。文件不存在或无法读取时从空记录开始
+        """
+        self.path = path
+        self._timings: Dict[str, float] = {}
+        self._changed = False
+        if path and os.path.isfile(path):
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+            except (OSError, ValueError):
+                data = None
+            if isinstance(data, dict) and data.get('version') == TIMINGS_VERSION:
+                for key, value in data.get('timings', {}).items():
+                    try:
+                        seconds = float(value)
+                    except (TypeError, ValueError):
+                        continue
+                    if seconds > 0:
+                        self._timings[key] = seconds
+
+    def __len__(self) -> int:
+        return len(self._timings)
+
+    def get(self, key: str) -> Optional[float]:
+        """记录的耗时（秒）；没有记录时返回 None"""
+        return self._timings.get(key)
+
+    def record(self, key: str, seconds: float):
+        """记录一次实际耗时（非正的耗时不是有效的测量，不记录）"""
+        if not seconds > 0:
+            return
+        self._timings[key] = seconds
+        self._changed = True
+
+    def save(self):
+        """写回记录文件（没有新记录时不写）"""
+        if not self.path or not self._changed:
+            return
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(self.path, 'w', encoding='utf-8') as f:
+            json.dump({'version': TIMINGS_VERSION, 'timings': self._timings}, f)
+        self._changed = False
+
+
+@dataclass
+class ParseUnit:
+    """一个解析任务：文件的第 part 部分（共 parts 部分）"""
+    path: str
+    handle: SourceHandle
+    index: int  # 文件的顺序
+    part: int = 0
+    parts: int = 1
+    cost: float = 0.0  # 估计耗时（秒）
+
+
+@dataclass
+class FileEstimate:
+    """文件的解析代价估计"""
+    path: str
+    handle: SourceHandle
+    key: str  # 耗时记录的键
+    static: float  # 按大小和函数个数的估计
+    measured: Optional[float]  # 之前运行记录的实际耗时
+    contracts: int  # 合约个数（最多拆分为这么多部分）
+    cost: float = 0.0  # 最终的估计
+
+
+class CostModel:
+    """解析代价模型"""
+
+    def __init__(self, timings: TimingCache = None):
+        """
+        Args:
+            timings: 之前运行的耗时记录（解析完成后 record 写入其中）
+        """
+        self.timings = timings if timings is not None else TimingCache()
+
+    def static_cost(self, data: bytes) -> float:
+        """按大小和函数个数估计的解析耗时"""
+        return BASE_COST + BYTE_COST * len(data) + FUNCTION_COST * len(_FUNCTION_PATTERN.findall(data))
+
+    def estimate(self, files: List[Tuple[str, SourceHandle]],
+                 read_bytes: Callable[[SourceHandle], bytes]) -> List[FileEstimate]:
+        """
+        估计各文件的解析耗时
+
+        有记录的文件用记录的耗时；其他文件的静态估计乘以有记录的文件的实际耗时与静态估计之比
+        （机器的快慢和源码风格的差异由此校准）。非正的记录不可信，按没有记录处理。
+        """
+        estimates = []
+        for path, handle in files:
+            data = read_bytes(handle)
+            key = source_key(data)
+            measured = self.timings.get(key)
+            if measured is not None and not measured > 0:
+                measured = None
+            estimates.append(FileEstimate(path, handle, key, self.static_cost(data), measured,
+                                          len(_CONTRACT_PATTERN.findall(data))))
+
+        measured = [e for e in estimates if e.measured is not None]
+        static_total = sum(e.static for e in measured)
+        scale = sum(e.measured for e in measured) / static_total if measured and static_total > 0 else 1.0
+        for e in estimates:
+            e.cost = e.measured if e.measured is not None else e.static * scale
+        return estimates
+
+    def schedule(self, estimates: List[FileEstimate], jobs: int, window: int = None) -> List[ParseUnit]:
+        """
+        安排解析任务
+
+        估计耗时超过每个进程平均负担（window 个文件的平均耗时按进程分摊）的文件按合约拆分，
+        最多拆分为 jobs 个部分。
+
+        Args:
+            estimates: estimate 的结果
+            jobs: 工作进程数
+            window: 同时提交给工作进程的最多文件数（默认不限）
+
+        Returns:
+            解析任务（按文件顺序，提交顺序由 ParallelParser 在窗口内按 cost 决定）
+        """
+        units: List[ParseUnit] = []
+        if not estimates:
+            return units
+        total = sum(e.cost for e in estimates)
+        if window:
+            total = min(total, total / len(estimates) * window)
+        share = total / max(jobs, 1)
+
+        for index, e in enumerate(estimates):
+            parts = 1
+            if jobs > 1 and share > 0 and e.cost > share:
+                parts = max(1, min(jobs, e.contracts, math.ceil(e.cost / share)))
+            for part in range(parts):
+                units.append(ParseUnit(e.path, e.handle, index, part, parts, e.cost / parts))
+        return units
@@ -0,0 +1,331 @@
+"""导入解析和文件依赖图
+
+支持的导入路径形式：
+- 相对路径：import "./Token.sol"、import "../libraries/Math.sol"
+- remappings（Foundry/solc 风格）：remappings.txt 或 foundry.toml 中的
+  [context:]prefix=target，按最长前缀匹配
+- node_modules（Hardhat/npm 风格）：import "@openzeppelin/contracts/token/ERC20/ERC20.sol"
+  从导入文件所在目录逐级向上查找 node_modules
+- 相对于项目根目录（存在 remappings.txt、foundry.toml、hardhat.config.* 或 package.json 的目录）
+
+SourceCache 在一次运行中按文件缓存 AST：每个文件只解析一次，所有导入它的项目共享同一个 AST；
+内容完全相同的不同文件（如多份 vendored 副本）也只解析一次。
+"""
+
+import os
+import re
+from dataclasses import dataclass, replace
+from typing import Callable, Dict, List, Optional
+
+import networkx as nx
+
+from .ast_builder import AST
+from ..utils.budget import BudgetExceeded
+from ..utils.dedup import content_hash
+
+
+# 标志项目根目录的文件
+_ROOT_MARKERS = ('remappings.txt', 'foundry.toml', 'hardhat.config.js', 'hardhat.config.ts', 'package.json')
+
+# foundry.toml 中的 remappings = [ "...", "..." ]
+_FOUNDRY_REMAPPINGS_PATTERN = re.compile(r'^\s*remappings\s*=\s*\[([^\]]*)\]', re.MULTILINE)
+_QUOTED_PATTERN = re.compile(r'["\']([^"\']+)["\']')
+
+
+@dataclass
+class Remapping:
+    """导入路径重映射：[context:]prefix=target"""
+    prefix: str
+    target: str  # 绝对路径（相对 target 已按配置文件所在目录展开）
+    context: str = ""  # 只对该目录（绝对路径）下的文件生效，空表示全部
+
+
+def parse_remapping(line: str, base_dir: str) -> Optional[Remapping]:
+    """
+    解析一条 remapping
+
+    Args:
+        line: 形如 "@openzeppelin/=lib/openzeppelin-contracts/" 或 "src:ds-test/=lib/ds-test/src/"
+        base_dir: 配置文件所在目录（相对 target/context 以此为基准）
+
+    Returns:
+        Remapping对象，格式无效时返回 None
+    """
+    line = line.strip()
+    if not line or line.startswith('#') or '=' not in line:
+        return None
+    key, _, target = line.partition('=')
+    context = ""
+    if ':' in key:
+        context, _, key = key.partition(':')
+    if not key:
+        return None
+    return Remapping(
+        prefix=key,
+        target=os.path.normpath(os.path.join(base_dir, target)) + ('/' if target.endswith('/') else ''),
+        context=os.path.normpath(os.path.join(base_dir, context)) if context else ""
+    )
+
+
+def load_remappings(directory: str) -> List[Remapping]:
+    """读取目录下 remappings.txt 和 foundry.toml 中的 remappings"""
+    remappings = []
+
+    remappings_file = os.path.join(directory, 'remappings.txt')
+    if os.path.isfile(remappings_file):
+        with open(remappings_file, 'r', encoding='utf-8') as f:
+            for line in f:
+                remapping = parse_remapping(line, directory)
+                if remapping:
+                    remappings.append(remapping)
+
+    foundry_file = os.path.join(directory, 'foundry.toml')
+    if os.path.isfile(foundry_file):
+        with open(foundry_file, 'r', encoding='utf-8') as f:
+            content = f.read()
+        for match in _FOUNDRY_REMAPPINGS_PATTERN.finditer(content):
+            for item in _QUOTED_PATTERN.findall(match.group(1)):
+                remapping = parse_remapping(item, directory)
+                if remapping:
+                    remappings.append(remapping)
+
+    return remappings
+
+
+class ImportResolver:
+    """导入路径解析器"""
+
+    def __init__(self, remappings: List[Remapping] = None):
+        """
+        Args:
+            remappings: 额外的全局 remappings（项目根目录下的配置文件会自动读取）
+        """
+        self.remappings = list(remappings or [])
+        self._roots: Dict[str, Optional[str]] = {}  # 目录 -> 所属项目根目录
+        self._root_remappings: Dict[str, List[Remapping]] = {}
+
+    def resolve(self, import_path: str, from_file: str) -> Optional[str]:
+        """
+        解析导入路径
+
+        Args:
+            import_path: import 语句中的路径
+            from_file: 导入所在文件的路径
+
+        Returns:
+            被导入文件的路径（规范化后）；无法解析时返回 None
+        """
+        from_dir = os.path.dirname(os.path.abspath(from_file))
+
+        # 相对路径
+        if import_path.startswith('./') or import_path.startswith('../'):
+            return self._existing(os.path.join(from_dir, import_path))
+
+        root = self._find_root(from_dir)
+
+        # remappings（最长前缀优先，带 context 的优先于不带的）
+        remappings = self.remappings + (self._remappings_for(root) if root else [])
+        candidates = [
+            r for r in remappings
+            if import_path.startswith(r.prefix)
+            and (not r.context or from_dir == r.context or from_dir.startswith(r.context + os.sep))
+        ]
+        for remapping in sorted(candidates, key=lambda r: (len(r.prefix), len(r.context)), reverse=True):
+            resolved = self._existing(remapping.target + import_path[len(remapping.prefix):])
+            if resolved:
+                return resolved
+
+        # 相对于项目根目录
+        if root:
+            resolved = self._existing(os.path.join(root, import_path))
+            if resolved:
+                return resolved
+
+        # node_modules：逐级向上查找
+        directory = from_dir
+        while True:
+            resolved = self._existing(os.path.join(directory, 'node_modules', import_path))
+            if resolved:
+                return resolved
+            parent = os.path.dirname(directory)
+            if parent == directory:
+                break
+            directory = parent
+
+        return None
+
+    def _existing(self, path: str) -> Optional[str]:
+        path = os.path.normpath(path)
+        return path if os.path.isfile(path) else None
+
+    def _find_root(self, directory: str) -> Optional[str]:
+        """查找目录所属的项目根目录（结果按目录缓存）"""
+        visited = []
+        root = None
+        current = directory
+        while True:
+            if current in self._roots:
+                root = self._roots[current]
+                break
+            visited.append(current)
+            if any(os.path.isfile(os.path.join(current, marker)) for marker in _ROOT_MARKERS):
+                root = current
+                break
+            parent = os.path.dirname(current)
+            if parent == current:
+                break
+            current = parent
+
+        for path in visited:
+            self._roots[path] = root
+        return root
+
+    def _remappings_for(self, root: str) -> List[Remapping]:
+        if root not in self._root_remappings:
+            self._root_remappings[root] = load_remappings(root)
+        return self._root_remappings[root]
+
+
+class SourceCache:
+    """
+    按文件缓存解析结果，并维护文件依赖图
+
+    依赖图的节点为规范化的绝对路径，边 A -> B 表示 A 导入了 B。
+    Solidity 允许循环导入，因此依赖图不保证无环。
+    """
+
+    def __init__(self, parser, resolver: ImportResolver = None):
+        """
+        Args:
+            parser: SolidityParser对象
+            resolver: 导入解析器
+        """
+        self.parser = parser
+        self.resolver = resolver or ImportResolver()
+        self.graph = nx.DiGraph()
+        self.unresolved: Dict[str, List[str]] = {}  # 文件 -> 无法解析的导入路径
+        self.hits = 0
+        self.misses = 0
+        self.content_hits = 0  # 内容与已解析文件相同、直接复用的文件数
+        self._asts: Dict[str, AST] = {}
+        self._by_content: Dict[str, AST] = {}  # 内容哈希 -> AST
+        self._digests: Dict[str, str] = {}  # 文件 -> 内容哈希（该文件的AST在 _by_content 中时）
+        self._order: Optional[List[str]] = None  # 拓扑顺序缓存（依赖图变化时失效）
+
+    def parse(self, file_path: str, source_code: str = None,
+              parse: Callable[[], AST] = None) -> AST:
+        """
+        解析文件（已解析过时直接返回缓存的AST）
+
+        Args:
+            file_path: 文件路径
+            source_code: 源码；为 None 时从磁盘读取
+            parse: 得到 source_code 的AST的函数（如取工作进程的解析结果）；
+                为 None 时用 self.parser 解析
+
+        Returns:
+            AST对象（与其他导入该文件的项目共享，不应修改）
+        """
+        key = self._key(file_path)
+        ast = self._asts.get(key)
+        if ast is not None:
+            self.hits += 1
+            return ast
+
+        self.misses += 1
+        if source_code is None:
+            with open(file_path, 'r', encoding='utf-8') as f:
+                source_code = f.read()
+        
+        # 内容相同的文件共享合约节点，只重新标记路径（导入按新路径解析）
+        digest = content_hash(source_code)
+        same_content = self._by_content.get(digest)
+        if same_content is not None:
+            self.content_hits += 1
+            ast = replace(same_content, file_path=file_path)
+            self._add(key, ast)
+            return ast
+        
+        try:
+            ast = parse() if parse is not None else self.parser.parse(source_code, file_path)
+        except BudgetExceeded as e:
+            # 部分解析的结果同样缓存，避免其他项目重复解析
+            if e.partial_result is not None:
+                self._add(key, e.partial_result)
+            raise
+        self._by_content[digest] = ast
+        self._digests[key] = digest
+        self._add(key, ast)
+        return ast
+
+    def dependencies(self, file_path: str) -> List[AST]:
+        """
+        获取文件（直接和间接）导入的所有文件的AST，未解析的依赖会从磁盘读取并解析
+
+        Returns:
+            依赖的AST列表（不含文件自身），按依赖图的拓扑顺序（被依赖者在前）
+        """
+        key = self._key(file_path)
+        pending = [key]
+        while pending:
+            current = pending.pop()
+            for target in list(self.graph.successors(current)):
+                if target not in self._asts:
+                    self.parse(self._display_path(target))
+                    pending.append(target)
+
+        reachable = nx.descendants(self.graph, key) - {key}
+        return [self._asts[path] for path in self._topological_order() if path in reachable]
+
+    def get(self, file_path: str) -> Optional[AST]:
+        """获取已缓存的AST"""
+        return self._asts.get(self._key(file_path))
+
+    def release(self, file_path: str) -> bool:
+        """
+        释放不被其他文件导入的文件的AST（文件的各阶段处理完成后调用）
+
+        被导入的文件保留，供导入它的其他文件和项目共享；已释放的文件之后如果又被导入，
+        会从磁盘重新解析。依赖图中的节点和边保留。
+
+        Returns:
+            是否释放
+        """
+        key = self._key(file_path)
+        ast = self._asts.get(key)
+        if ast is None or self.graph.in_degree(key) > 0:
+            return False
+        del self._asts[key]
+        digest = self._digests.pop(key, None)
+        if digest is not None and self._by_content.get(digest) is ast:
+            del self._by_content[digest]
+        return True
+
+    def _add(self, key: str, ast: AST):
+        """缓存AST，并解析其导入加入依赖图"""
+        self._asts[key] = ast
+        self._order = None
+        self.graph.add_node(key)
+        for imp in ast.imports:
+            resolved = self.resolver.resolve(imp.path, ast.file_path or key)
+            if resolved is None:
+                self.unresolved.setdefault(key, []).append(imp.path)
+                continue
+            self.graph.add_edge(key, self._key(resolved))
+
+    def _topological_order(self) -> List[str]:
+        """被依赖者在前的顺序（循环导入的文件按强连通分量整体排序）"""
+        if self._order is None:
+            condensed = nx.condensation(self.graph)
+            self._order = []
+            for component in reversed(list(nx.topological_sort(condensed))):
+                self._order.extend(sorted(condensed.nodes[component]['members']))
+        return self._order
+
+    def _key(self, file_path: str) -> str:
+        return os.path.normpath(os.path.abspath(file_path))
+
+    def _display_path(self, key: str) -> str:
+        """当前目录下的文件使用相对路径（与扫描得到的文件路径一致）"""
+        relative = os.path.relpath(key)
+        return key if relative.startswith('..') else relative
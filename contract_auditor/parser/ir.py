@@ -0,0 +1,394 @@
+"""语句级中间表示（IR）
+
+每个函数体只降级（lower）一次，得到语句序列、调用和标识符索引，所有分析器和检测器
+共用，不再各自用正则重新扫描函数体文本：
+- 语句：赋值、调用、require/assert、分支（if/else）、循环、return 等，带文件中的偏移和行号；
+  for 循环头中的初始化语句单独降级为赋值
+- 调用：解析器的 CallNode，补充接收者（msg.sender、to、targets[i] 等）、value 和 gas
+- 标识符索引：标识符（以及 msg.sender 等全局变量）-> 出现的行号
+
+注释和字符串字面量中的内容不属于任何语句，也不计入标识符索引。
+
+IR 缓存在函数节点上（FunctionNode.ir），与 AST 一起由 SourceCache 保存；
+增量解析平移函数时清除（见 SolidityParser._shift_nodes），下次使用时重新降级。
+IR 不参与序列化，工作进程只解析，降级在使用 IR 的进程中进行。
+"""
+
+import re
+from bisect import bisect_left, bisect_right
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+from .ast_builder import CallNode, FunctionNode, StateChangeNode
+from ..utils.budget import check_budget
+
+# 语句类型
+ASSIGN = 'assign'  # 赋值（含复合赋值和带初始值的声明）
+CALL = 'call'  # 以调用为主的表达式语句
+REQUIRE = 'require'  # require(...) / assert(...)
+REVERT = 'revert'
+IF = 'if'  # if / else if（条件在 condition 中）
+ELSE = 'else'
+LOOP = 'loop'  # for / while / do
+RETURN = 'return'
+EMIT = 'emit'
+BLOCK = 'block'  # unchecked、assembly、try/catch 等其他带代码块的语句头
+OTHER = 'other'
+
+# 结束当前基本块的语句
+BRANCHES = (IF, ELSE, LOOP, RETURN)
+
+_EXTERNAL_CALL_TYPES = ('call', 'send', 'transfer', 'delegatecall', 'staticcall')
+
+# 分段时需要关注的记号：括号和语句分隔符（注释和字符串已替换为空白）
+_TOKEN_PATTERN = re.compile(r'[;{}()\[\]]')
+_COMMENT_OR_STRING = re.compile(r'//[^\n]*|/\*.*?\*/|"(?:[^"\\\n]|\\.)*"|\'(?:[^\'\\\n]|\\.)*\'', re.DOTALL)
+_NAME_PATTERN = re.compile(r'\b[A-Za-z_]\w*\b')
+_GLOBAL_PATTERN = re.compile(r'\b(?:msg|tx|block)\s*\.\s*\w+\b')
+_NEWLINE = re.compile('\n')
+
+# 代码块前的关键字（其余情况下的左大括号是调用选项，如 .call{value: v}）
+_BLOCK_KEYWORDS = ('else', 'do', 'unchecked', 'catch', 'assembly', 'try')
+
+_IF_PATTERN = re.compile(r'(?:else\s+)?if\s*\(')
+_LOOP_PATTERN = re.compile(r'(?:for|while)\s*\(|do\b')
+_FOR_PATTERN = re.compile(r'for\s*\(')
+_REQUIRE_PATTERN = re.compile(r'(?:require|assert)\s*\(')
+_KEYWORD_PATTERNS = ((RETURN, re.compile(r'return\b')), (REVERT, re.compile(r'revert\b')),
+                     (EMIT, re.compile(r'emit\b')))
+_COMPOUND_OPERATORS = ('<<=', '>>=', '+=', '-=', '*=', '/=', '%=', '|=', '&=', '^=')
+_OPTION_PATTERNS = {key: re.compile(rf'\b{key}\s*:\s*([^,}}]+)') for key in ('value', 'gas')}
+
+
+@dataclass
+class Statement:
+    """一条语句（偏移为文件中的偏移，text 为去掉首尾空白和结尾分号的源码）"""
+    kind: str
+    start: int
+    end: int
+    line: int
+    end_line: int
+    text: str
+    target: str = ""  # 赋值的左侧（如 balances[msg.sender]、uint x、(bool success, )）
+    operation: str = ""  # 赋值运算符（=、+= 等）
+    condition: str = ""  # if/while/for/require 的条件
+
+
+@dataclass
+class IRCall:
+    """函数中的一个调用"""
+    node: CallNode
+    receiver: str = ""  # 被调用的对象（.call 等之前的表达式；普通函数调用为 a.f 中的 a）
+    value: Optional[str] = None  # {value: ...}
+    gas: Optional[str] = None  # {gas: ...}
+    statement: int = -1  # 所在语句的下标
+
+    @property
+    def is_external(self) -> bool:
+        """是否是外部调用（call/send/transfer/delegatecall/staticcall）"""
+        return self.node.call_type in _EXTERNAL_CALL_TYPES or self.node.is_low_level
+
+
+@dataclass
+class FunctionIR:
+    """一个函数的中间表示"""
+    statements: List[Statement] = field(default_factory=list)
+    calls: List[IRCall] = field(default_factory=list)  # 与 FunctionNode.calls 的顺序相同
+    writes: List[StateChangeNode] = field(default_factory=list)  # 状态修改（解析器的结果）
+    names: Dict[str, List[int]] = field(default_factory=dict)  # 标识符 -> 出现的行号（升序，同一行只记一次）
+    first_line: int = 0  # 函数体第一行和最后一行
+    last_line: int = 0
+
+    @property
+    def external_calls(self) -> List[IRCall]:
+        return [call for call in self.calls if call.is_external]
+
+    def call_for(self, node: CallNode) -> Optional[IRCall]:
+        """解析器的 CallNode 对应的 IR 调用"""
+        for call in self.calls:
+            if call.node is node:
+                return call
+        return None
+
+    def statements_from(self, line: int) -> List[Statement]:
+        """结束于 line 行或之后的语句（即从 line 行开始的代码）"""
+        return [stmt for stmt in self.statements if stmt.end_line >= line]
+
+    def mentions(self, name: str, first_line: int = None, last_line: int = None) -> bool:
+        """标识符是否在 [first_line, last_line] 行中出现（不指定行时为整个函数）"""
+        lines = self.names.get(name)
+        if not lines:
+            return False
+        low = 0 if first_line is None else bisect_left(lines, first_line)
+        high = len(lines) if last_line is None else bisect_right(lines, last_line)
+        return low < high
+
+    def mentions_any(self, fragment: str) -> bool:
+        """是否有包含 fragment 的标识符（如 nonReentrant 出现在 _nonReentrantBefore 中）"""
+        return any(fragment in name for name in self.names)
+
+    def last_use(self, name: str) -> Optional[int]:
+        """标识符最后出现的行"""
+        lines = self.names.get(name)
+        return lines[-1] if lines else None
+
+
+def function_ir(func: FunctionNode) -> FunctionIR:
+    """函数的 IR（首次使用时降级并缓存在函数节点上）"""
+    if func.ir is None:
+        func.ir = lower(func)
+    return func.ir
+
+
+def lower(func: FunctionNode) -> FunctionIR:
+    """把函数体降级为 IR"""
+    body = func.body
+    body_offset = func.end - len(body)
+    newlines = [match.start() for match in _NEWLINE.finditer(body)]
+
+    def line_at(pos: int) -> int:
+        return func.body_line + bisect_left(newlines, pos)
+
+    ir = FunctionIR(writes=list(func.state_changes), first_line=func.body_line,
+                    last_line=func.body_line + len(newlines))
+
+    # 注释和字符串替换为等长的空白，之后的扫描不会匹配其中的内容，偏移和行号不变
+    code = _COMMENT_OR_STRING.sub(_blank, body)
+
+    for start, end in _segments(code):
+        check_budget()
+        for stmt_start, stmt_end, text in _split_header(code, start, end):
+            ir.statements.append(_statement(stmt_start, stmt_end, text, body, body_offset, line_at))
+
+    # 调用：补充接收者和调用选项，并关联到所在语句
+    starts = [stmt.start for stmt in ir.statements]
+    for node in func.calls:
+        call = IRCall(node)
+        local_start, local_end = node.start - body_offset, node.end - body_offset
+        if node.call_type == 'function_call':
+            call.receiver = node.target.rpartition('.')[0]
+        else:
+            call.receiver = _receiver(code, local_start)
+        options = code[local_start:local_end]
+        for key, pattern in _OPTION_PATTERNS.items():
+            match = pattern.search(options)
+            if match:
+                setattr(call, key, match.group(1).strip())
+        index = bisect_right(starts, node.start) - 1
+        if index >= 0 and node.start < ir.statements[index].end:
+            call.statement = index
+        ir.calls.append(call)
+
+    # 标识符索引
+    for pattern in (_NAME_PATTERN, _GLOBAL_PATTERN):
+        for match in pattern.finditer(code):
+            name = re.sub(r'\s+', '', match.group())
+            line = line_at(match.start())
+            lines = ir.names.setdefault(name, [])
+            if not lines or lines[-1] != line:
+                lines.append(line)
+    return ir
+
+
+def _blank(match: re.Match) -> str:
+    """保留换行的等长空白"""
+    return re.sub(r'[^\n]', ' ', match.group())
+
+
+def _segments(code: str) -> List[Tuple[int, int]]:
+    """
+    把函数体（注释和字符串已替换为空白）分为语句和代码块头，返回函数体中的 [start, end)
+
+    括号内的 ';' 和 '{' 不分段（如 for 循环头）；不在代码块关键字或 ')' 之后的左大括号
+    是调用选项（.call{value: v}），与表达式一起处理。
+    """
+    segments = []
+    start = 1 if code.startswith('{') else 0
+    stop = len(code) - 1 if code.endswith('}') else len(code)
+    depth = 0  # 圆括号和方括号
+    option_depth = 0  # 调用选项的大括号
+
+    for match in _TOKEN_PATTERN.finditer(code, start, stop):
+        token = match.group()
+        if token in '([':
+            depth += 1
+        elif token in ')]':
+            depth = max(depth - 1, 0)
+        elif depth:
+            continue
+        elif token == '{':
+            if option_depth or not _opens_block(code[start:match.start()]):
+                option_depth += 1
+                continue
+            if code[start:match.start()].strip():
+                segments.append((start, match.start()))
+            start = match.end()
+        elif token == '}':
+            if option_depth:
+                option_depth -= 1
+                continue
+            if code[start:match.start()].strip():
+                segments.append((start, match.start()))
+            start = match.end()
+        elif not option_depth:  # ';'
+            segments.append((start, match.end()))
+            start = match.end()
+
+    if code[start:stop].strip():
+        segments.append((start, stop))
+    return segments
+
+
+def _opens_block(prefix: str) -> bool:
+    """左大括号之前（当前语句开始到大括号）的文本是否表示后面是代码块"""
+    prefix = prefix.rstrip()
+    if not prefix or prefix.endswith(')'):
+        return True
+    words = prefix.rsplit(None, 1)
+    return words[-1] in _BLOCK_KEYWORDS
+
+
+def _split_header(code: str, start: int, end: int) -> List[Tuple[int, int, str]]:
+    """去掉首尾空白；for 循环头拆分为初始化语句和循环本身"""
+    text = code[start:end]
+    stripped = text.strip()
+    start += len(text) - len(text.lstrip())
+    end = start + len(stripped)
+    if not _FOR_PATTERN.match(stripped):
+        return [(start, end, stripped)]
+
+    header = _parenthesized(stripped, stripped.find('('))
+    init = header.split(';', 1)[0] if header is not None else ""
+    if not init.strip() or _assignment(init) is None:
+        return [(start, end, stripped)]
+    init_start = start + stripped.find('(') + 1 + len(init) - len(init.lstrip())
+    return [(init_start, init_start + len(init.strip()), init.strip()), (start, end, stripped)]
+
+
+def _statement(start: int, end: int, code_text: str, body: str, body_offset: int, line_at) -> Statement:
+    """构建一条语句（start/end 为函数体中的偏移）"""
+    source_text = body[start:end]
+    if source_text.endswith(';'):
+        source_text = source_text[:-1].rstrip()
+        code_text = code_text[:-1].rstrip()
+    stmt = Statement(kind=OTHER, start=body_offset + start, end=body_offset + end,
+                     line=line_at(start), end_line=line_at(max(end - 1, start)), text=source_text)
+
+    if _IF_PATTERN.match(code_text):
+        stmt.kind = IF
+        stmt.condition = _condition(code_text, body, start, code_text.find('('))
+    elif code_text == 'else':
+        stmt.kind = ELSE
+    elif _LOOP_PATTERN.match(code_text):
+        stmt.kind = LOOP
+        if _FOR_PATTERN.match(code_text):
+            header = _parenthesized(code_text, code_text.find('('))
+            parts = header.split(';') if header is not None else []
+            stmt.condition = parts[1].strip() if len(parts) > 1 else ""
+        elif '(' in code_text:
+            stmt.condition = _condition(code_text, body, start, code_text.find('('))
+    elif _REQUIRE_PATTERN.match(code_text):
+        stmt.kind = REQUIRE
+        stmt.condition = _condition(code_text, body, start, code_text.find('('))
+    else:
+        for kind, pattern in _KEYWORD_PATTERNS:
+            if pattern.match(code_text):
+                stmt.kind = kind
+                break
+        else:
+            assignment = _assignment(code_text)
+            if assignment is not None:
+                position, operation = assignment
+                stmt.kind = ASSIGN
+                stmt.target = source_text[:position].strip()
+                stmt.operation = operation
+            elif code_text.split(None, 1)[0] in _BLOCK_KEYWORDS:
+                stmt.kind = BLOCK
+            elif '(' in code_text:
+                stmt.kind = CALL
+    return stmt
+
+
+def _condition(code_text: str, body: str, start: int, open_paren: int) -> str:
+    """括号中的条件（取源码原文）"""
+    inner = _parenthesized(code_text, open_paren)
+    if inner is None:
+        return ""
+    source = body[start + open_paren + 1:start + open_paren + 1 + len(inner)]
+    return source.strip()
+
+
+def _parenthesized(text: str, open_paren: int) -> Optional[str]:
+    """text[open_paren] 处的左括号与其配对右括号之间的内容"""
+    if open_paren < 0:
+        return None
+    depth = 0
+    for i in range(open_paren, len(text)):
+        if text[i] == '(':
+            depth += 1
+        elif text[i] == ')':
+            depth -= 1
+            if depth == 0:
+                return text[open_paren + 1:i]
+    return None
+
+
+def _assignment(text: str) -> Optional[Tuple[int, str]]:
+    """括号外的第一个赋值运算符：(位置, 运算符)；不是赋值时返回 None"""
+    depth = 0
+    i = 0
+    while i < len(text):
+        char = text[i]
+        if char in '([{':
+            depth += 1
+        elif char in ')]}':
+            depth -= 1
+        elif char == '=' and depth == 0:
+            following = text[i + 1:i + 2]
+            previous = text[i - 1:i]
+            if following in ('=', '>') or previous in ('=', '!'):
+                i += 2 if following in ('=', '>') else 1
+                continue
+            for operator in _COMPOUND_OPERATORS:
+                position = i - len(operator) + 1
+                if position >= 0 and text.startswith(operator, position):
+                    return position, operator
+            if previous in ('<', '>'):
+                # <= 和 >= 是比较
+                i += 1
+                continue
+            return i, '='
+        i += 1
+    return None
+
+
+def _receiver(code: str, dot: int) -> str:
+    """'.call' 等之前的表达式（标识符、成员访问、下标和调用，如 payable(msg.sender)）"""
+    i = dot
+    while i > 0 and code[i - 1].isspace():
+        i -= 1
+    end = i
+    while i > 0:
+        char = code[i - 1]
+        if char.isalnum() or char in '_.':
+            i -= 1
+        elif char in ')]':
+            opening = '(' if char == ')' else '['
+            depth = 0
+            j = i - 1
+            while j >= 0:
+                if code[j] == char:
+                    depth += 1
+                elif code[j] == opening:
+                    depth -= 1
+                    if depth == 0:
+                        break
+                j -= 1
+            if j < 0:
+                break
+            i = j
+        elif char.isspace() and i > 1 and code[i - 2] == '.':
+            i -= 1
+        else:
+            break
+    return re.sub(r'\s+', '', code[i:end])
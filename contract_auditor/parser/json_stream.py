@@ -0,0 +1,228 @@
+"""增量JSON读取
+
+编译产物（solc 标准 JSON 输出、Foundry out/*.json）可能有几百MB，其中大部分是字节码、ABI
+和元数据，审计只用到其中每个源文件的AST。JSONReader 在 mmap 或字节串上按记号读取：
+- skip() 跳过一个值，只扫描括号和字符串边界，不构造任何对象
+- read() 构造一个值，可以丢弃不需要的键（对应的值同样只跳过）
+- 顶层可以有多个值，值之间的非JSON内容被忽略（如 solc --ast-compact-json 输出中的
+  "======= a.sol =======" 标题）
+
+读取位置（pos）是字节偏移，可以记下某个值的位置，之后重新定位到该处只读取这个值。
+"""
+
+import json
+import re
+from typing import Any, Container, List, Tuple
+
+# 值之间的空白和分隔符
+_SPACE = re.compile(rb'[ \t\r\n]*')
+# 字符串的结尾（未转义的引号）：跳过普通字符和转义序列
+_STRING_BODY = re.compile(rb'[^"\\]*(?:\\.[^"\\]*)*"', re.DOTALL)
+_NUMBER = re.compile(rb'-?\d+(?:\.\d+)?(?:[eE][+-]?\d+)?')
+_LITERALS = {b't': (b'true', True), b'f': (b'false', False), b'n': (b'null', None)}
+# 跳过容器时只关注括号和字符串的开始
+_STRUCTURE = re.compile(rb'[{}\[\]"]')
+_DOCUMENT = re.compile(rb'[{\[]')
+
+
+class JSONError(ValueError):
+    """JSON格式错误（带字节偏移）"""
+
+    def __init__(self, message: str, pos: int):
+        super().__init__(f"{message}（偏移 {pos}）")
+        self.pos = pos
+
+
+class JSONReader:
+    """在字节缓冲区（bytes 或 mmap）上按需读取JSON值"""
+
+    def __init__(self, data, pos: int = 0):
+        self.data = data
+        self.pos = pos
+
+    def _space(self) -> int:
+        self.pos = _SPACE.match(self.data, self.pos).end()
+        return self.pos
+
+    def peek(self) -> bytes:
+        """下一个非空白字节（结束时为 b''）"""
+        pos = self._space()
+        return self.data[pos:pos + 1]
+
+    def expect(self, char: bytes):
+        if self.peek() != char:
+            raise JSONError(f"应为 {char.decode()}", self.pos)
+        self.pos += 1
+
+    def next_document(self) -> bool:
+        """定位到下一个顶层对象或数组的开始（跳过之间的非JSON内容），没有时返回 False"""
+        match = _DOCUMENT.search(self.data, self.pos)
+        if match is None:
+            self.pos = len(self.data)
+            return False
+        self.pos = match.start()
+        return True
+
+    def string(self) -> str:
+        """读取一个字符串"""
+        self.expect(b'"')
+        start = self.pos - 1
+        match = _STRING_BODY.match(self.data, self.pos)
+        if match is None:
+            raise JSONError("字符串未结束", start)
+        self.pos = match.end()
+        raw = self.data[start:self.pos]
+        if b'\\' not in raw:
+            return raw[1:-1].decode('utf-8')
+        return json.loads(raw)
+
+    def keys(self):
+        """
+        逐个产生对象的键；每产生一个键后，调用方必须读取或跳过其值
+
+        迭代结束时读取位置在对象之后。
+        """
+        self.expect(b'{')
+        if self.peek() == b'}':
+            self.pos += 1
+            return
+        while True:
+            key = self.string()
+            self.expect(b':')
+            yield key
+            char = self.peek()
+            self.pos += 1
+            if char == b'}':
+                return
+            if char != b',':
+                raise JSONError("应为 , 或 }", self.pos - 1)
+
+    def items(self):
+        """逐个定位到数组的元素；每次产生后，调用方必须读取或跳过该元素"""
+        self.expect(b'[')
+        if self.peek() == b']':
+            self.pos += 1
+            return
+        while True:
+            yield
+            char = self.peek()
+            self.pos += 1
+            if char == b']':
+                return
+            if char != b',':
+                raise JSONError("应为 , 或 ]", self.pos - 1)
+
+    def skip(self) -> Tuple[int, int]:
+        """跳过一个值，返回其字节范围 [start, end)"""
+        char = self.peek()
+        start = self.pos
+        if char == b'"':
+            match = _STRING_BODY.match(self.data, start + 1)
+            if match is None:
+                raise JSONError("字符串未结束", start)
+            self.pos = match.end()
+        elif char in (b'{', b'['):
+            depth = 0
+            pos = start
+            while True:
+                match = _STRUCTURE.search(self.data, pos)
+                if match is None:
+                    raise JSONError("对象或数组未结束", start)
+                token = match.group()
+                if token == b'"':
+                    string = _STRING_BODY.match(self.data, match.end())
+                    if string is None:
+                        raise JSONError("字符串未结束", match.start())
+                    pos = string.end()
+                    continue
+                pos = match.end()
+                depth += 1 if token in (b'{', b'[') else -1
+                if depth == 0:
+                    break
+            self.pos = pos
+        else:
+            self._scalar()
+        return start, self.pos
+
+    def read(self, drop: Container[str] = ()) -> Any:
+        """
+        读取一个值
+
+        Args:
+            drop: 要丢弃的键（任意深度的对象中，这些键的值只跳过，不出现在结果中）
+        """
+        char = self.peek()
+        if char not in (b'{', b'['):
+            return self.string() if char == b'"' else self._scalar()
+
+        # 显式栈：AST的嵌套可能很深
+        root: List[Any] = []
+        stack: List[Tuple[Any, Any]] = [(root, None)]  # (容器, 对象的键迭代器)
+        self._open(stack)
+        while len(stack) > 1:
+            container, keys = stack[-1]
+            if keys is not None:
+                key = next(keys, None)
+                if key is None:
+                    stack.pop()
+                    continue
+                if key in drop:
+                    self.skip()
+                    continue
+                target = (container, key)
+            else:
+                if self.peek() == b']':
+                    self.pos += 1
+                    stack.pop()
+                    continue
+                if container:
+                    self.expect(b',')
+                target = (container, None)
+
+            char = self.peek()
+            if char in (b'{', b'['):
+                self._open(stack, target)
+            else:
+                value = self.string() if char == b'"' else self._scalar()
+                self._store(target, value)
+        return root[0]
+
+    def _open(self, stack: List, target: Tuple = None):
+        """开始读取一个对象或数组，放入父容器并压栈"""
+        if self.peek() == b'{':
+            value = {}
+            keys = self.keys()
+        else:
+            value = []
+            self.expect(b'[')
+            keys = None
+        if target is None:
+            stack[0][0].append(value)
+        else:
+            self._store(target, value)
+        stack.append((value, keys))
+
+    @staticmethod
+    def _store(target: Tuple, value: Any):
+        container, key = target
+        if key is None:
+            container.append(value)
+        else:
+            container[key] = value
+
+    def _scalar(self) -> Any:
+        pos = self._space()
+        char = self.data[pos:pos + 1]
+        literal = _LITERALS.get(char)
+        if literal is not None:
+            text, value = literal
+            if self.data[pos:pos + len(text)] != text:
+                raise JSONError("无效的字面量", pos)
+            self.pos = pos + len(text)
+            return value
+        match = _NUMBER.match(self.data, pos)
+        if match is None:
+            raise JSONError("无效的值", pos)
+        self.pos = match.end()
+        text = match.group()
+        return float(text) if any(c in text for c in b'.eE') else int(text)
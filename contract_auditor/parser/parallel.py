@@ -0,0 +1,193 @@
+"""多进程解析
+
+文件在工作进程中解析。主进程只发送 SourceHandle，工作进程从内存映射（不在磁盘上的源码
+从共享内存块）中读取源码，返回不含源码的紧凑二进制AST（见 utils.serialization），
+主进程用自己读取的源码补全。
+因此源码不经过进程间管道，大的 vendored 文件也不会在进程之间复制。
+
+每个文件的解析在工作进程中受文件预算约束，耗时计入主进程中该文件的预算。
+
+同时提交给工作进程的文件数有上限（window）：主进程每取走一个结果才补交，
+工作进程不会在主进程检测前面的文件时解析出所有文件的结果并积压在内存中。
+
+任务按代价模型（见 cost_model）安排：接下来的 window 个文件中估计耗时最长的任务先提交，
+估计耗时远超平均的大文件按合约拆分为多个任务，由多个工作进程同时解析
+（每个部分各自受文件预算约束，各部分的耗时之和计入该文件的预算）。
+每个文件的实际解析耗时记录回代价模型的 TimingCache。
+"""
+
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Callable, Dict, List, Optional, Tuple
+
+from .ast_builder import AST
+from .cost_model import CostModel, ParseUnit
+from .solidity_parser import SolidityParser
+from ..utils.budget import Budget, BudgetExceeded, BudgetLimits
+from ..utils.serialization import dumps, loads
+from ..utils.source_store import SourceHandle, SourceStore
+
+# 工作进程中的解析器和源码存储（由 _init_worker 创建）
+_worker: Dict = {}
+
+
+def _init_worker(limits: Optional[BudgetLimits]):
+    _worker['parser'] = SolidityParser()
+    _worker['store'] = SourceStore()
+    _worker['limits'] = limits
+
+
+def _parse_in_worker(handle: SourceHandle, part: int = 0, parts: int = 1) -> bytes:
+    """在工作进程中解析一个文件（或其中的一部分合约），返回编码后的 {'ast', 'spent', 'budget'}"""
+    source_code = _worker['store'].read(handle)
+    # 共享内存块中的源码只读取一次，不在工作进程中保持挂载
+    _worker['store'].release(handle)
+    limits = _worker['limits']
+    budget = limits.for_file(handle.path) if limits else Budget()
+    parser = _worker['parser']
+    error = None
+    # 耗时单独计时：不限制预算时 Budget 不计时（spent 始终为 0）
+    started = time.perf_counter()
+    try:
+        with budget:
+            if parts == 1:
+                ast = parser.parse(source_code, handle.path)
+            else:
+                ast = parser.parse_part(source_code, handle.path, part, parts)
+    except BudgetExceeded as e:
+        ast = e.partial_result or AST(source_code=source_code, file_path=handle.path)
+        error = (e.kind, e.limit, e.scope)
+    spent = time.perf_counter() - started
+    return dumps({'ast': ast, 'spent': spent, 'budget': error}, include_source=False)
+
+
+class ParallelParser:
+    """在工作进程池中提前解析文件"""
+
+    def __init__(self, jobs: int, limits: BudgetLimits = None, window: int = None,
+                 cost_model: CostModel = None):
+        """
+        Args:
+            jobs: 工作进程数
+            limits: 预算配置（工作进程中按文件预算解析）
+            window: 同时提交给工作进程的最多文件数（默认为进程数的两倍）
+            cost_model: 解析代价模型（默认不使用之前运行的耗时记录）
+        """
+        self.jobs = jobs
+        self.window = window or jobs * 2
+        self.cost_model = cost_model or CostModel()
+        self._executor = ProcessPoolExecutor(max_workers=jobs, initializer=_init_worker,
+                                             initargs=(limits,))
+        self._store = SourceStore()  # 估计代价时读取源码
+        self._queued: Dict[Tuple[str, int], ParseUnit] = {}  # 等待提交的任务（按文件顺序）
+        self._pending: Dict[Tuple[str, int], Future] = {}
+        self._files: Dict[str, Tuple[int, int, str]] = {}  # 已登记的文件 -> (顺序, 部分数, 耗时记录的键)
+        self._next_index = 0
+        self._cursor = 0  # 主进程下一个要取用的文件的顺序
+        self.parsed = 0  # 由工作进程解析的文件数
+        self.split = 0  # 拆分为多个任务解析的文件数
+
+    def submit(self, files: List[Tuple[str, SourceHandle]]):
+        """
+        登记要解析的文件（只接受 SourceHandle；已经是文本的源码由主进程解析）
+
+        文件应按登记顺序 take；提交顺序在窗口内按估计耗时安排。
+        """
+        handles: Dict[str, SourceHandle] = {}
+        for file_path, source in files:
+            if isinstance(source, SourceHandle) and file_path not in self._files:
+                handles.setdefault(file_path, source)
+
+        estimates = self.cost_model.estimate(list(handles.items()), self._store.read_bytes)
+        keys = {estimate.path: estimate.key for estimate in estimates}
+        for unit in self.cost_model.schedule(estimates, self.jobs, self.window):
+            unit.index += self._next_index
+            self._queued[(unit.path, unit.part)] = unit
+            self._files[unit.path] = (unit.index, unit.parts, keys[unit.path])
+            if unit.parts > 1 and unit.part == 0:
+                self.split += 1
+        self._next_index += len(estimates)
+        self._fill()
+
+    def _fill(self):
+        """补交任务，直到达到 window：接下来 window 个文件的任务中，估计耗时最长的先提交"""
+        horizon = self._cursor + self.window
+        while self._queued and len(self._pending) < self.window:
+            candidates = []
+            for key, unit in self._queued.items():
+                if unit.index >= horizon:
+                    break
+                candidates.append((unit.cost, key))
+            if not candidates:
+                return
+            _, key = max(candidates, key=lambda candidate: candidate[0])
+            self._submit(key)
+
+    def _submit(self, key: Tuple[str, int]):
+        unit = self._queued.pop(key)
+        self._pending[key] = self._executor.submit(_parse_in_worker, unit.handle, unit.part, unit.parts)
+
+    def take(self, file_path: str, source_code: str) -> Optional[Tuple[Callable[[], AST], float]]:
+        """
+        等待文件的解析结果（拆分解析的文件合并各部分的结果）
+
+        Args:
+            file_path: 文件路径
+            source_code: 主进程读取的源码（用于补全AST）
+
+        Returns:
+            (parse, spent)：parse() 返回AST，超出预算时抛出带部分结果的 BudgetExceeded；
+            spent 为工作进程中的解析耗时（各部分之和）。文件未提交时返回 None
+        """
+        entry = self._files.pop(file_path, None)
+        if entry is None:
+            return None
+        index, parts, timing_key = entry
+        self._cursor = max(self._cursor, index + 1)
+        futures = []
+        for part in range(parts):
+            key = (file_path, part)
+            if key not in self._pending and key in self._queued:
+                # 未按登记顺序取用，或还在窗口之外：直接提交
+                self._submit(key)
+            future = self._pending.pop(key, None)
+            if future is None:
+                return None
+            futures.append(future)
+        self._fill()
+
+        results = [loads(future.result(), {file_path: source_code}) for future in futures]
+        self.parsed += 1
+        ast = results[0]['ast']
+        for result in results[1:]:
+            ast.contracts.extend(result['ast'].contracts)
+        ast.contracts.sort(key=lambda contract: contract.start)
+        spent = sum(result['spent'] for result in results)
+        budget = next((result['budget'] for result in results if result['budget'] is not None), None)
+        if budget is None and spent > 0:
+            # 超出预算的解析不完整，耗时不能代表整个文件；计时器精度不足时的 0 不是有效的耗时
+            self.cost_model.timings.record(timing_key, spent)
+
+        def parse() -> AST:
+            if budget is not None:
+                kind, limit, scope = budget
+                error = BudgetExceeded(kind, limit, scope)
+                error.partial_result = ast
+                raise error
+            return ast
+
+        return parse, spent
+
+    def cancel(self):
+        """取消所有未取走的文件（未开始的不再解析，正在解析的结果直接丢弃）"""
+        for future in self._pending.values():
+            future.cancel()
+        self._pending.clear()
+        self._queued.clear()
+        self._files.clear()
+
+    def close(self):
+        """关闭进程池（未取走的结果直接丢弃）"""
+        self.cancel()
+        self._executor.shutdown(wait=True)
+        self._store.close()
@@ -1,8 +1,34 @@
 """Solidity源码解析器"""
 
 import re
-from typing import List, Tuple
-from .ast_builder import AST, ContractNode, FunctionNode, ModifierNode, StateVariableNode, CallNode, StateChangeNode, ASTNode
+from dataclasses import dataclass, field
+from typing import List, Optional, Tuple, Union
+from ..utils.budget import BudgetExceeded, check_budget
+from .ast_builder import AST, ContractNode, FunctionNode, FunctionDeclarationNode, ModifierNode, StateVariableNode, CallNode, StateChangeNode, ASTNode, ImportNode
+
+
+# 编辑附近出现这些关键字时，合约/函数边界可能改变，需要扩大重新解析的范围
+_CONTRACT_KEYWORDS = ('contract', 'interface', 'library')
+_MEMBER_KEYWORDS = ('function', 'modifier', 'constructor', 'receive', 'fallback')
+
+
+@dataclass
+class TextEdit:
+    """文本编辑（start/end 为修改前源码中的偏移，[start, end) 被替换为 text）"""
+    start: int
+    end: int
+    text: str = ""
+
+
+@dataclass
+class ParseUpdate:
+    """增量解析结果"""
+    changed_functions: List[FunctionNode] = field(default_factory=list)  # 重新解析出的函数节点
+    removed_functions: List[FunctionNode] = field(default_factory=list)  # 被替换掉的旧函数节点
+    changed_contracts: List[ContractNode] = field(default_factory=list)  # 整体重新解析的合约
+    full_reparse: bool = False
+    delta: int = 0  # 编辑位置之后节点的偏移变化量
+    delta_lines: int = 0  # 编辑位置之后节点的行号变化量
 
 
 class SolidityParser:
@@ -15,6 +41,19 @@ class SolidityParser:
             re.MULTILINE | re.DOTALL
         )
         
+        # 函数头模式（函数体通过大括号配对单独提取）：function f(...)，以及没有 function 关键字的
+        # constructor/receive/fallback（函数名为关键字本身）
+        self.function_header_pattern = re.compile(
+            r'(?:function\s+(\w+)|(?<![\w.])(constructor|receive|fallback))\s*\(([^)]*)\)\s*',
+            re.MULTILINE
+        )
+        
+        # 函数声明的结束：先遇到 ';' 的是没有函数体的声明
+        self._declaration_end_pattern = re.compile(r'[;{]')
+        
+        # 大括号（用于配对提取代码块）
+        self._brace_pattern = re.compile(r'[{}]')
+        
         # 修饰符模式
         self.modifier_pattern = re.compile(
             r'modifier\s+(\w+)\s*\([^)]*\)\s*\{[^{}]*(?:\{[^{}]*\}[^{}]*)*\}',
@@ -23,7 +62,17 @@ class SolidityParser:
         
         # 合约定义模式
         self.contract_pattern = re.compile(
-            r'(?:contract|interface|library)\s+(\w+)\s*(?:is\s+[^{]+)?\s*\{',
+            r'(?:contract|interface|library)\s+(\w+)\s*(?:is\s+([^{]+))?\s*\{',
+            re.MULTILINE
+        )
+        
+        # 基合约列表中的构造参数，如 is ERC20("Token", "TKN")
+        self._base_args_pattern = re.compile(r'\([^()]*\)')
+        
+        # 导入模式：import "x" [as X]; import * as X from "x"; import {A, B as C} from "x";
+        self.import_pattern = re.compile(
+            r'^[ \t]*import\s+(?:\{([^}]*)\}\s*from\s*|\*\s*as\s+(\w+)\s+from\s*)?'
+            r'["\']([^"\']+)["\'](?:\s*as\s+(\w+))?\s*;',
             re.MULTILINE
         )
         
@@ -33,6 +82,12 @@ class SolidityParser:
             re.MULTILINE
         )
         
+        # 状态变量声明模式（简化版：查找常见的状态变量声明）
+        self.declaration_pattern = re.compile(
+            r'(public|private|internal|external)?\s*(mapping|uint|int|bool|address|string|bytes\d*)\s+(\w+)\s*[=;]',
+            re.MULTILINE
+        )
+        
         # 外部调用模式（在_parse_calls中重新定义，这里保留用于兼容）
         self.external_call_patterns = {
             'call': re.compile(r'\.call\s*(\{[^}]*\})?\s*\(', re.MULTILINE),
@@ -60,28 +115,267 @@ class SolidityParser:
             AST对象
         """
         ast = AST(source_code=source_code, file_path=file_path)
+        ast.imports = self._parse_imports(source_code)
         
         # 查找合约
         contracts = self._find_contracts(source_code)
         
-        for contract_name, contract_start in contracts:
-            contract = ContractNode(name=contract_name, line=self._get_line_number(source_code, contract_start))
-            
-            # 提取合约内容
-            contract_content = self._extract_contract_content(source_code, contract_start)
-            
-            # 解析函数
-            contract.functions = self._parse_functions(contract_content, contract_start)
-            
-            # 解析修饰符
-            contract.modifiers = self._parse_modifiers(contract_content, contract_start)
+        try:
+            for contract_name, contract_start in contracts:
+                check_budget()
+                ast.contracts.append(self.parse_contract(source_code, contract_name, contract_start))
+        except BudgetExceeded as e:
+            # 超出预算时保留已解析的合约
+            e.partial_result = ast
+            raise
+        
+        return ast
+
+    def parse_part(self, source_code: str, file_path: str = "", part: int = 0, parts: int = 1) -> AST:
+        """
+        解析文件的一部分合约（大文件拆分为多个任务并行解析）
+
+        第 part 部分包含第 part、part + parts、part + 2 * parts ... 个合约（大小相近的合约
+        交错分到各部分），导入只在第 0 部分中。各部分的合约按 start 排序合并后与 parse 的结果相同。
+
+        Args:
+            source_code: Solidity源码
+            file_path: 文件路径
+            part: 部分序号（0 开始）
+            parts: 部分数
+
+        Returns:
+            AST对象（只含该部分的合约）
+        """
+        ast = AST(source_code=source_code, file_path=file_path)
+        if part == 0:
+            ast.imports = self._parse_imports(source_code)
+
+        try:
+            for contract_name, contract_start in self._find_contracts(source_code)[part::parts]:
+                check_budget()
+                ast.contracts.append(self.parse_contract(source_code, contract_name, contract_start))
+        except BudgetExceeded as e:
+            e.partial_result = ast
+            raise
+
+        return ast
+
+    def parse_contract(self, source_code: str, contract_name: str, contract_start: int) -> ContractNode:
+        """
+        解析单个合约（增量解析时只重新解析被修改的合约）
+        
+        Args:
+            source_code: 完整的Solidity源码
+            contract_name: 合约名
+            contract_start: 合约定义在源码中的起始偏移
             
-            # 解析状态变量
-            contract.state_variables = self._parse_state_variables(contract_content, contract_start)
+        Returns:
+            ContractNode对象，行号和偏移均相对于整个文件
+        """
+        contract = ContractNode(name=contract_name, line=self._get_line_number(source_code, contract_start),
+                                start=contract_start, end=contract_start)
+        
+        # 合约类型和基合约
+        header = self.contract_pattern.match(source_code, contract_start)
+        if header:
+            contract.kind = header.group(0).split(None, 1)[0]
+            contract.bases = self._parse_bases(header.group(2) or "")
+        
+        # 提取合约内容
+        contract_content = self._extract_contract_content(source_code, contract_start)
+        if not contract_content:
+            return contract
+        
+        content_start = source_code.find('{', contract_start)
+        contract.end = content_start + len(contract_content)
+        base_line = self._get_line_number(source_code, content_start)
+        
+        # 解析函数
+        contract.functions, contract.declarations, contract.constructor = self._parse_functions(
+            contract_content, content_start, base_line)
+        
+        # 解析修饰符
+        contract.modifiers = self._parse_modifiers(contract_content, content_start, base_line)
+        
+        # 解析状态变量
+        contract.state_variables = self._parse_state_variables(contract_content, content_start, base_line)
+        
+        return contract
+    
+    def update(self, ast: AST, edit: TextEdit) -> ParseUpdate:
+        """
+        增量解析：将编辑应用到AST（原地修改）
+        
+        编辑完全位于某个函数体内时只重新解析该函数；位于合约体内时重新解析该合约；
+        其余情况整体重新解析。编辑位置之后的节点只平移偏移和行号。
+        
+        Args:
+            ast: 之前解析得到的AST（ast.source_code 为修改前的源码）
+            edit: 文本编辑
             
-            ast.contracts.append(contract)
+        Returns:
+            ParseUpdate对象，列出需要失效的函数
+        """
+        old_source = ast.source_code
+        removed = old_source[edit.start:edit.end]
+        new_source = old_source[:edit.start] + edit.text + old_source[edit.end:]
+        ast.source_code = new_source
         
-        return ast
+        result = ParseUpdate(delta=len(edit.text) - len(removed),
+                             delta_lines=edit.text.count('\n') - removed.count('\n'))
+        
+        if self._edit_touches(old_source, new_source, edit, _CONTRACT_KEYWORDS):
+            return self._update_full(ast, result)
+        
+        # 编辑范围必须只与一个合约重叠，且完全位于其合约体内
+        overlapping = [
+            i for i, contract in enumerate(ast.contracts)
+            if contract.start < edit.end and edit.start < contract.end
+        ]
+        if len(overlapping) != 1:
+            return self._update_full(ast, result)
+        
+        index = overlapping[0]
+        contract = ast.contracts[index]
+        content_start = old_source.find('{', contract.start)
+        if not (content_start != -1 and content_start < edit.start and edit.end < contract.end):
+            return self._update_full(ast, result)
+        
+        if not self._update_function(contract, new_source, edit, result):
+            new_contract = self.parse_contract(new_source, contract.name, contract.start)
+            if new_contract.end != contract.end + result.delta:
+                return self._update_full(ast, result)
+            ast.contracts[index] = new_contract
+            result.removed_functions.extend(contract.functions)
+            result.changed_functions.extend(new_contract.functions)
+            result.changed_contracts.append(new_contract)
+        
+        # 编辑位置之后的合约只需平移
+        for later in ast.contracts[index + 1:]:
+            if later.start >= edit.end:
+                self._shift_contract(later, result.delta, result.delta_lines)
+        self._shift_nodes([imp for imp in ast.imports if imp.start >= edit.end],
+                          result.delta, result.delta_lines)
+        
+        return result
+    
+    def _update_full(self, ast: AST, result: ParseUpdate) -> ParseUpdate:
+        """整体重新解析"""
+        new_ast = self.parse(ast.source_code, ast.file_path)
+        result.full_reparse = True
+        result.removed_functions = [f for c in ast.contracts for f in c.functions]
+        result.changed_functions = [f for c in new_ast.contracts for f in c.functions]
+        result.changed_contracts = list(new_ast.contracts)
+        ast.contracts = new_ast.contracts
+        ast.imports = new_ast.imports
+        return result
+    
+    def _update_function(self, contract: ContractNode, new_source: str, edit: TextEdit,
+                         result: ParseUpdate) -> bool:
+        """
+        只重新解析包含编辑范围的函数
+        
+        Returns:
+            是否成功（失败时调用方回退为重新解析整个合约）
+        """
+        # 编辑必须只位于一个函数的函数体内
+        candidates = [
+            i for i, func in enumerate(contract.functions)
+            if func.end - len(func.body) < edit.start and edit.end < func.end
+        ]
+        if len(candidates) != 1:
+            return False
+        
+        index = candidates[0]
+        old_func = contract.functions[index]
+        body_start = old_func.end - len(old_func.body)
+        new_end = old_func.end + result.delta
+        
+        # 函数体内出现嵌套的 function/modifier 文本时，可能影响其他成员的匹配
+        new_body = new_source[body_start:new_end]
+        if any(kw in new_body or kw in old_func.body for kw in _MEMBER_KEYWORDS):
+            return False
+        
+        match = self.function_header_pattern.match(new_source, old_func.start)
+        if not match:
+            return False
+        new_func = self._build_function(new_source, match, 0, old_func.line, old_func.start)
+        if not isinstance(new_func, FunctionNode) or new_func.end != new_end:
+            return False
+        
+        contract.functions[index] = new_func
+        result.removed_functions.append(old_func)
+        result.changed_functions.append(new_func)
+        
+        # 状态变量模式也会匹配函数体内的声明，重新扫描该函数体
+        body_vars = self._parse_state_variables(new_source, 0, new_func.body_line, body_start, new_end)
+        before = [v for v in contract.state_variables if v.start < body_start]
+        after = [v for v in contract.state_variables if v.start >= old_func.end]
+        self._shift_nodes(after, result.delta, result.delta_lines)
+        contract.state_variables = before + body_vars + after
+        
+        # 平移之后的成员
+        for func in contract.functions[index + 1:]:
+            self._shift_nodes([func, *func.calls, *func.state_changes], result.delta, result.delta_lines)
+        self._shift_nodes([m for m in contract.modifiers if m.start >= old_func.end],
+                          result.delta, result.delta_lines)
+        self._shift_nodes([d for d in contract.declarations if d.start >= old_func.end],
+                          result.delta, result.delta_lines)
+        constructor = contract.constructor
+        if constructor is not None and constructor.start >= old_func.end:
+            self._shift_nodes([constructor, *constructor.calls, *constructor.state_changes],
+                              result.delta, result.delta_lines)
+        contract.end += result.delta
+        return True
+    
+    def _edit_touches(self, old_source: str, new_source: str, edit: TextEdit, keywords) -> bool:
+        """编辑前后的编辑区域附近是否出现关键字（关键字可能跨越编辑边界）"""
+        margin = max(len(kw) for kw in keywords)
+        old_window = old_source[max(edit.start - margin, 0):edit.end + margin]
+        new_window = new_source[max(edit.start - margin, 0):edit.start + len(edit.text) + margin]
+        return any(kw in old_window or kw in new_window for kw in keywords)
+    
+    def _shift_contract(self, contract: ContractNode, delta: int, delta_lines: int):
+        """平移合约中所有节点的偏移和行号"""
+        nodes = [contract, *contract.modifiers, *contract.state_variables, *contract.declarations]
+        for func in contract.functions + ([contract.constructor] if contract.constructor else []):
+            nodes.append(func)
+            nodes.extend(func.calls)
+            nodes.extend(func.state_changes)
+        self._shift_nodes(nodes, delta, delta_lines)
+    
+    def _shift_nodes(self, nodes: List[ASTNode], delta: int, delta_lines: int):
+        """平移节点的偏移和行号"""
+        if not delta and not delta_lines:
+            return
+        for node in nodes:
+            node.start += delta
+            node.end += delta
+            node.line += delta_lines
+            if isinstance(node, FunctionNode):
+                node.body_line += delta_lines
+                node.ir = None  # IR 中的偏移和行号已过时
+    
+    def _parse_imports(self, source_code: str) -> List[ImportNode]:
+        """解析 import 语句"""
+        imports = []
+        for match in self.import_pattern.finditer(source_code):
+            symbols_str, star_alias, path, alias = match.groups()
+            symbols = []
+            if symbols_str:
+                # {A, B as C} 只记录原始符号名
+                symbols = [item.split()[0] for item in symbols_str.split(',') if item.strip()]
+            start = match.start() + len(match.group(0)) - len(match.group(0).lstrip())
+            imports.append(ImportNode(
+                line=self._get_line_number(source_code, start),
+                start=start,
+                end=match.end(),
+                path=path,
+                symbols=symbols,
+                alias=star_alias or alias
+            ))
+        return imports
     
     def _find_contracts(self, source_code: str) -> List[Tuple[str, int]]:
         """查找所有合约定义"""
@@ -92,114 +386,148 @@ class SolidityParser:
             contracts.append((contract_name, start_pos))
         return contracts
     
+    def _parse_bases(self, bases_str: str) -> List[str]:
+        """解析基合约列表（去掉构造参数；L.Base 形式只保留合约名）"""
+        previous = None
+        while previous != bases_str:
+            previous = bases_str
+            bases_str = self._base_args_pattern.sub('', bases_str)
+        return [base.strip().split('.')[-1] for base in bases_str.split(',') if base.strip()]
+    
     def _extract_contract_content(self, source_code: str, start_pos: int) -> str:
         """提取合约内容（大括号内的代码）"""
-        brace_count = 0
         start_brace = source_code.find('{', start_pos)
         if start_brace == -1:
             return ""
         
-        for i in range(start_brace, len(source_code)):
-            if source_code[i] == '{':
-                brace_count += 1
-            elif source_code[i] == '}':
-                brace_count -= 1
-                if brace_count == 0:
-                    return source_code[start_brace:i+1]
-        return ""
+        return self._extract_braced_content(source_code, start_brace)
     
-    def _parse_functions(self, contract_content: str, offset: int) -> List[FunctionNode]:
-        """解析函数"""
+    def _parse_functions(self, contract_content: str, offset: int,
+                         base_line: int) -> Tuple[List[FunctionNode], List[FunctionDeclarationNode],
+                                                  Optional[FunctionNode]]:
+        """
+        解析函数（offset/base_line 为合约内容在文件中的起始偏移和行号）
+        
+        Returns:
+            (有函数体的函数, 没有函数体的声明, 构造函数)
+        """
         functions = []
+        declarations = []
+        constructor = None
         
-        # 改进的函数匹配 - 处理嵌套大括号
-        function_pattern = re.compile(
-            r'function\s+(\w+)\s*\(([^)]*)\)\s*',
-            re.MULTILINE
+        for match in self.function_header_pattern.finditer(contract_content):
+            check_budget()
+            func = self._build_function(contract_content, match, offset, base_line)
+            if isinstance(func, FunctionDeclarationNode):
+                declarations.append(func)
+            elif func and match.group(2) == 'constructor':
+                constructor = constructor or func
+            elif func:
+                functions.append(func)
+        
+        return functions, declarations, constructor
+    
+    def _build_function(self, text: str, match: re.Match, offset: int, base_line: int,
+                        base_pos: int = 0) -> Optional[Union[FunctionNode, FunctionDeclarationNode]]:
+        """
+        根据函数头匹配结果构建函数节点（没有函数体的声明构建为 FunctionDeclarationNode）
+        
+        Args:
+            text: 被匹配的文本
+            match: function_header_pattern 的匹配结果
+            offset: text 在文件中的起始偏移
+            base_line: base_pos 处的行号
+            base_pos: 计算行号的起点
+        """
+        func_start = match.start()
+        func_name = match.group(1) or match.group(2)
+        params = match.group(3) or ""
+        
+        # 查找函数体开始位置：声明部分（修饰符、returns）中没有 ';' 和 '{'，
+        # 先遇到 ';' 时是没有函数体的声明，不再向后查找（否则会取到后面函数的函数体）
+        end_match = self._declaration_end_pattern.search(text, match.end())
+        if end_match is None:
+            return None
+        if end_match.group() == ';':
+            return self._build_declaration(text, match, end_match.end(), offset, base_line, base_pos)
+        body_start = end_match.start()
+        
+        # 提取函数体（处理嵌套大括号）
+        body = self._extract_braced_content(text, body_start)
+        if not body:
+            return None
+        
+        # 提取函数声明部分（从function到{之前）
+        decl_part = text[func_start:body_start]
+        
+        func = FunctionNode(
+            name=func_name,
+            parameters=self._parse_parameters(params),
+            body=body,
+            line=base_line + text.count('\n', base_pos, func_start),
+            body_line=base_line + text.count('\n', base_pos, body_start),
+            start=offset + func_start,
+            end=offset + body_start + len(body)
         )
+        self._parse_declaration(decl_part, func)
         
-        for match in function_pattern.finditer(contract_content):
-            func_start = match.start()
-            func_name = match.group(1)
-            params = match.group(2) or ""
-            
-            # 查找函数体开始位置
-            body_start = contract_content.find('{', match.end())
-            if body_start == -1:
-                continue
-            
-            # 提取函数体（处理嵌套大括号）
-            body = self._extract_braced_content(contract_content, body_start)
-            if not body:
-                continue
-            
-            # 提取函数声明部分（从function到{之前）
-            decl_part = contract_content[func_start:body_start]
-            
-            # 解析可见性和修饰符
-            visibility = "public"
-            is_payable = False
-            is_view = False
-            is_pure = False
-            returns = ""
-            
-            if 'external' in decl_part:
-                visibility = "external"
-            elif 'internal' in decl_part:
-                visibility = "internal"
-            elif 'private' in decl_part:
-                visibility = "private"
-            
-            if 'payable' in decl_part:
-                is_payable = True
-            if 'view' in decl_part:
-                is_view = True
-            if 'pure' in decl_part:
-                is_pure = True
-            
-            # 提取returns
-            returns_match = re.search(r'returns\s*\(([^)]*)\)', decl_part)
-            if returns_match:
-                returns = returns_match.group(1)
-            
-            # 提取修饰符
-            modifiers = self._extract_modifiers_from_function(decl_part, 0)
-            
-            func = FunctionNode(
-                name=func_name,
-                visibility=visibility,
-                modifiers=modifiers,
-                parameters=self._parse_parameters(params),
-                returns=self._parse_parameters(returns),
-                body=body,
-                is_payable=is_payable,
-                is_view=is_view,
-                is_pure=is_pure,
-                line=self._get_line_number(contract_content, func_start) + self._get_line_number(contract_content[:offset], 0)
-            )
-            
-            # 解析函数体中的调用
-            func.calls = self._parse_calls(body, func.line)
-            
-            # 解析状态修改
-            func.state_changes = self._parse_state_changes(body, func.line)
-            
-            functions.append(func)
+        # 解析函数体中的调用
+        func.calls = self._parse_calls(body, func.body_line, offset + body_start)
+        
+        # 解析状态修改
+        func.state_changes = self._parse_state_changes(body, func.body_line, offset + body_start)
+        
+        return func
+    
+    def _build_declaration(self, text: str, match: re.Match, end: int, offset: int, base_line: int,
+                           base_pos: int = 0) -> FunctionDeclarationNode:
+        """构建没有函数体的函数声明（end 为结尾 ';' 之后的位置）"""
+        func_start = match.start()
+        declaration = FunctionDeclarationNode(
+            name=match.group(1) or match.group(2),
+            parameters=self._parse_parameters(match.group(3) or ""),
+            line=base_line + text.count('\n', base_pos, func_start),
+            start=offset + func_start,
+            end=offset + end
+        )
+        self._parse_declaration(text[func_start:end - 1], declaration)
+        return declaration
+    
+    def _parse_declaration(self, decl_part: str,
+                           func: Union[FunctionNode, FunctionDeclarationNode]):
+        """从函数声明部分（function 到函数体或 ';' 之前）解析可见性、状态可变性、returns 和修饰符"""
+        if 'external' in decl_part:
+            func.visibility = "external"
+        elif 'internal' in decl_part:
+            func.visibility = "internal"
+        elif 'private' in decl_part:
+            func.visibility = "private"
+        
+        func.is_payable = 'payable' in decl_part
+        func.is_view = 'view' in decl_part
+        func.is_pure = 'pure' in decl_part
+        
+        # 提取returns
+        returns_match = re.search(r'returns\s*\(([^)]*)\)', decl_part)
+        func.returns = self._parse_parameters(returns_match.group(1) if returns_match else "")
         
-        return functions
+        # 提取修饰符
+        func.modifiers = self._extract_modifiers_from_function(decl_part, 0)
     
     def _extract_braced_content(self, content: str, start_pos: int) -> str:
         """提取大括号内容（处理嵌套）"""
         brace_count = 0
-        start_brace = start_pos
         
-        for i in range(start_brace, len(content)):
-            if content[i] == '{':
+        # 只遍历大括号，并定期检查预算（深度嵌套的大文件可能非常慢）
+        for n, match in enumerate(self._brace_pattern.finditer(content, start_pos)):
+            if n & 0x3FF == 0:
+                check_budget()
+            if match.group() == '{':
                 brace_count += 1
-            elif content[i] == '}':
+            else:
                 brace_count -= 1
                 if brace_count == 0:
-                    return content[start_brace:i+1]
+                    return content[start_pos:match.end()]
         return ""
     
     def _extract_modifiers_from_function(self, decl_part: str, func_start: int) -> List[str]:
@@ -227,7 +555,7 @@ class SolidityParser:
         
         return modifiers
     
-    def _parse_modifiers(self, contract_content: str, offset: int) -> List[ModifierNode]:
+    def _parse_modifiers(self, contract_content: str, offset: int, base_line: int) -> List[ModifierNode]:
         """解析修饰符"""
         modifiers = []
         for match in self.modifier_pattern.finditer(contract_content):
@@ -235,21 +563,21 @@ class SolidityParser:
             mod = ModifierNode(
                 name=mod_name,
                 body=match.group(0),
-                line=self._get_line_number(contract_content, match.start()) + self._get_line_number(contract_content[:offset], 0)
+                line=base_line + contract_content.count('\n', 0, match.start()),
+                start=offset + match.start(),
+                end=offset + match.end()
             )
             modifiers.append(mod)
         return modifiers
     
-    def _parse_state_variables(self, contract_content: str, offset: int) -> List[StateVariableNode]:
-        """解析状态变量"""
+    def _parse_state_variables(self, contract_content: str, offset: int, base_line: int,
+                               base_pos: int = 0, end_pos: Optional[int] = None) -> List[StateVariableNode]:
+        """解析状态变量（只扫描 contract_content[base_pos:end_pos]，base_line 为 base_pos 处的行号）"""
         variables = []
-        # 简化版：查找常见的状态变量声明
-        var_pattern = re.compile(
-            r'(public|private|internal|external)?\s*(mapping|uint|int|bool|address|string|bytes\d*)\s+(\w+)\s*[=;]',
-            re.MULTILINE
-        )
+        if end_pos is None:
+            end_pos = len(contract_content)
         
-        for match in var_pattern.finditer(contract_content):
+        for match in self.declaration_pattern.finditer(contract_content, base_pos, end_pos):
             visibility = match.group(1) or "internal"
             var_type = match.group(2)
             var_name = match.group(3)
@@ -258,20 +586,30 @@ class SolidityParser:
                 name=var_name,
                 var_type=var_type,
                 visibility=visibility,
-                line=self._get_line_number(contract_content, match.start()) + self._get_line_number(contract_content[:offset], 0)
+                line=base_line + contract_content.count('\n', base_pos, match.start()),
+                start=offset + match.start(),
+                end=offset + match.end()
             )
             variables.append(var)
         
         return variables
     
-    def _parse_calls(self, body: str, base_line: int) -> List[CallNode]:
-        """解析函数体中的调用"""
+    def _strip_body(self, body: str) -> Tuple[str, int]:
+        """去掉函数体外层大括号，返回内容及其在函数体中的偏移"""
+        stripped = body.strip()
+        content_offset = len(body) - len(body.lstrip())
+        if stripped.startswith('{') and stripped.endswith('}'):
+            inner = stripped[1:-1]
+            content_offset += 1 + len(inner) - len(inner.lstrip())
+            stripped = inner.strip()
+        return stripped, content_offset
+    
+    def _parse_calls(self, body: str, base_line: int, body_offset: int = 0) -> List[CallNode]:
+        """解析函数体中的调用（base_line/body_offset 为函数体在文件中的起始行和偏移）"""
         calls = []
         
         # 移除外层大括号（如果存在）
-        body_content = body.strip()
-        if body_content.startswith('{') and body_content.endswith('}'):
-            body_content = body_content[1:-1].strip()
+        body_content, content_offset = self._strip_body(body)
         
         # 查找各种外部调用（改进模式以匹配 .call{value:...}() 格式）
         call_patterns = {
@@ -284,6 +622,7 @@ class SolidityParser:
         
         for call_type, pattern in call_patterns.items():
             for match in pattern.finditer(body_content):
+                check_budget()
                 # 提取value参数（如果存在）
                 value_match = re.search(r'value:\s*(\w+)', match.group(0) if match.groups() else '')
                 value = value_match.group(1) if value_match else None
@@ -293,13 +632,16 @@ class SolidityParser:
                     target="",
                     value=value,
                     is_low_level=(call_type in ['call', 'delegatecall', 'staticcall']),
-                    line=base_line + self._get_line_number(body_content, match.start())
+                    line=base_line + body.count('\n', 0, content_offset + match.start()),
+                    start=body_offset + content_offset + match.start(),
+                    end=body_offset + content_offset + match.end()
                 )
                 calls.append(call)
         
         # 查找函数调用（改进以处理 msg.sender.call 等情况）
         func_call_pattern = re.compile(r'(\w+(?:\.\w+)?)\s*(\{[^}]*\})?\s*\(', re.MULTILINE)
         for match in func_call_pattern.finditer(body_content):
+            check_budget()
             target = match.group(1)
             # 排除关键字和已处理的外部调用
             if target in ['if', 'while', 'for', 'require', 'assert', 'revert', 'emit', 'new', 'delete']:
@@ -311,20 +653,20 @@ class SolidityParser:
             call = CallNode(
                 call_type="function_call",
                 target=target,
-                line=base_line + self._get_line_number(body_content, match.start())
+                line=base_line + body.count('\n', 0, content_offset + match.start()),
+                start=body_offset + content_offset + match.start(),
+                end=body_offset + content_offset + match.end()
             )
             calls.append(call)
         
         return calls
     
-    def _parse_state_changes(self, body: str, base_line: int) -> List[StateChangeNode]:
-        """解析状态修改"""
+    def _parse_state_changes(self, body: str, base_line: int, body_offset: int = 0) -> List[StateChangeNode]:
+        """解析状态修改（base_line/body_offset 为函数体在文件中的起始行和偏移）"""
         changes = []
         
         # 移除外层大括号（如果存在）
-        body_content = body.strip()
-        if body_content.startswith('{') and body_content.endswith('}'):
-            body_content = body_content[1:-1].strip()
+        body_content, content_offset = self._strip_body(body)
         
         # 查找变量赋值（改进模式，支持数组索引和复合赋值）
         # 匹配: variable = ... 或 variable[xxx] = ... 或 variable += ... 等
@@ -337,6 +679,7 @@ class SolidityParser:
         
         for pattern in assignment_patterns:
             for match in pattern.finditer(body_content):
+                check_budget()
                 if len(match.groups()) == 2:
                     # 简单变量
                     var_name = match.group(1)
@@ -357,7 +700,9 @@ class SolidityParser:
                 change = StateChangeNode(
                     variable=var_name,
                     operation=operation,
-                    line=base_line + self._get_line_number(body_content, match.start())
+                    line=base_line + body.count('\n', 0, content_offset + match.start()),
+                    start=body_offset + content_offset + match.start(),
+                    end=body_offset + content_offset + match.end()
                 )
                 changes.append(change)
         
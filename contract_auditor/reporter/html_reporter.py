@@ -6,6 +6,7 @@ from datetime import datetime
 from jinja2 import Template
 from typing import List, Dict
 from ..detectors.base_detector import Issue
+from ..detectors.issue_store import IssueView
 from ..analyzer.call_graph import CallGraphAnalyzer
 from ..analyzer.taint_analysis import TaintAnalyzer
 
@@ -104,15 +105,19 @@ class HTMLReporter:
     
     def generate(self, issues: List[Issue], call_graph: Dict = None, 
                  taint_paths: List = None, control_flow: Dict = None,
-                 data_flow: Dict = None, output_path: str = "report.html"):
+                 data_flow: Dict = None, output_path: str = "report.html",
+                 partial: List[Dict] = None, truncated: Dict = None, entry_points: Dict = None):
         """
         生成HTML报告
         
         Args:
-            issues: 漏洞列表
+            issues: 漏洞列表或 IssueView（IssueView 的摘要直接取存储中的计数）
             call_graph: 调用图数据
             taint_paths: 污点分析路径
             output_path: 输出文件路径
+            partial: 超出预算、只完成部分分析的文件/检测器
+            truncated: 提前结束（--fail-fast/--max-issues）时的截断信息
+            entry_points: 各合约的入口点和不可达的函数
         """
         # 读取模板
         with open(self.template_path, 'r', encoding='utf-8') as f:
@@ -153,7 +158,10 @@ class HTMLReporter:
             call_graph=call_graph_data,
             taint_paths=taint_paths_data,
             control_flow=control_flow_summary,
-            data_flow=data_flow
+            data_flow=data_flow,
+            entry_points=entry_points,
+            partial=partial,
+            truncated=truncated
         )
         
         # 写入文件
@@ -161,9 +169,12 @@ class HTMLReporter:
             f.write(html_content)
     
     def _generate_summary(self, issues: List[Issue]) -> Dict:
-        """生成摘要"""
+        """生成摘要（IssueView 直接使用存储中的汇总计数）"""
         from ..utils.severity import Severity
         
+        if isinstance(issues, IssueView):
+            return issues.summary()
+        
         summary = {
             "total_issues": len(issues),
             "critical": 0,
@@ -1,8 +1,9 @@
 """JSON报告生成器"""
 
 import json
-from typing import List, Dict
+from typing import Dict, Iterator, List
 from ..detectors.base_detector import Issue
+from ..detectors.issue_store import IssueView
 from ..analyzer.call_graph import CallGraphAnalyzer
 from ..analyzer.taint_analysis import TaintAnalyzer
 
@@ -11,25 +12,31 @@ class JSONReporter:
     """JSON报告生成器"""
     
     def __init__(self):
-        pass
+        self._encoder = json.JSONEncoder(indent=2, ensure_ascii=False)
     
     def generate(self, issues: List[Issue], call_graph: Dict = None, 
                  taint_paths: List = None, control_flow: Dict = None,
-                 data_flow: Dict = None, output_path: str = "report.json"):
+                 data_flow: Dict = None, output_path: str = "report.json",
+                 performance: Dict = None, partial: List[Dict] = None, truncated: Dict = None,
+                 entry_points: Dict = None):
         """
         生成JSON报告
         
         Args:
-            issues: 漏洞列表
+            issues: 漏洞列表或 IssueView（IssueView 的摘要直接取存储中的计数）
             call_graph: 调用图数据
             taint_paths: 污点分析路径
             output_path: 输出文件路径
+            performance: 性能剖析数据（启用 --profile 时）
+            partial: 超出预算、只完成部分分析的文件/检测器
+            truncated: 提前结束（--fail-fast/--max-issues）时的截断信息，写在摘要之后
+            entry_points: 各合约的入口点和不可达的函数
         """
-        report = {
-            "summary": self._generate_summary(issues),
-            "issues": [issue.to_dict() for issue in issues],
-            "analysis": {}
-        }
+        report = {"summary": self._generate_summary(issues)}
+        if truncated:
+            report["truncated"] = truncated
+        report["issues"] = (issue.to_dict() for issue in issues)  # 写入时逐个生成
+        report["analysis"] = {}
         
         # 添加调用图
         if call_graph:
@@ -54,14 +61,56 @@ class JSONReporter:
         if data_flow:
             report["analysis"]["data_flow"] = data_flow
         
+        # 添加入口点
+        if entry_points:
+            report["analysis"]["entry_points"] = entry_points
+        
+        # 添加部分分析记录
+        if partial:
+            report["partial_analysis"] = partial
+        
+        # 添加性能剖析
+        if performance:
+            report["performance"] = performance
+        
         # 写入文件
         with open(output_path, 'w', encoding='utf-8') as f:
-            json.dump(report, f, indent=2, ensure_ascii=False)
+            self._write(f, report)
+    
+    def _write(self, f, report: Dict):
+        """
+        流式写出报告，输出与 json.dump(report, f, indent=2, ensure_ascii=False) 相同
+        
+        值为生成器的键（issues）逐个元素编码写出，不在内存中构造完整的列表和JSON文本。
+        """
+        f.write('{')
+        for i, (key, value) in enumerate(report.items()):
+            f.write(',\n  ' if i else '\n  ')
+            f.write(json.dumps(key, ensure_ascii=False) + ': ')
+            if not isinstance(value, Iterator):
+                self._encode(f, value, 1)
+                continue
+            empty = True
+            for item in value:
+                f.write(',\n    ' if not empty else '[\n    ')
+                self._encode(f, item, 2)
+                empty = False
+            f.write('[]' if empty else '\n  ]')
+        f.write('\n}' if report else '}')
+    
+    def _encode(self, f, value, depth: int):
+        """分块编码并写出嵌套在 depth 层的值（JSON字符串中的换行已转义，按换行缩进是安全的）"""
+        newline = '\n' + '  ' * depth
+        for chunk in self._encoder.iterencode(value):
+            f.write(chunk.replace('\n', newline))
     
     def _generate_summary(self, issues: List[Issue]) -> Dict:
-        """生成摘要"""
+        """生成摘要（IssueView 直接使用存储中的汇总计数）"""
         from ..utils.severity import Severity
         
+        if isinstance(issues, IssueView):
+            return issues.summary()
+        
         summary = {
             "total_issues": len(issues),
             "critical": 0,
@@ -0,0 +1,106 @@
+"""问题指纹和基线
+
+问题指纹由问题类型、所在函数的限定名（合约.函数）和问题所在行的规范化代码计算，
+不包含文件路径和行号，因此代码整体移动（上方增删代码、文件改名）后指纹不变。
+同一函数中类型和代码都相同的问题按出现顺序编号，编号计入指纹，新增的重复问题不会被
+已有的指纹掩盖。
+
+基线是之前运行生成的 JSON 报告（或包含报告的目录）中所有问题的指纹集合，
+--baseline 只报告不在基线中的新问题（见 IssueView.where）。
+"""
+
+import hashlib
+import json
+import re
+from pathlib import Path
+from typing import Dict, FrozenSet, List, Tuple
+
+from ..detectors.base_detector import Issue
+
+
+# 单行中的注释或字符串字面量（字符串中的 // 和 /* 不是注释；未闭合的块注释到行尾为止）
+_COMMENT_OR_STRING = re.compile(r'//.*|/\*.*?(?:\*/|$)|"(?:[^"\\]|\\.)*"|\'(?:[^\'\\]|\\.)*\'')
+
+
+def _strip_comment(match: re.Match) -> str:
+    """注释替换为空白，字符串原样保留"""
+    text = match.group()
+    return ' ' if text.startswith('/') else text
+
+
+def normalize_snippet(line: str) -> str:
+    """规范化代码行（合并空白，去掉注释，字符串字面量保持不变）"""
+    code = _COMMENT_OR_STRING.sub(_strip_comment, line)
+    return ' '.join(code.split())
+
+
+def issue_fingerprint(issue: Issue, snippet: str, occurrence: int = 0) -> str:
+    """
+    问题指纹
+
+    Args:
+        issue: 问题（需已设置 contract）
+        snippet: 问题所在行的源码
+        occurrence: 同一函数中类型和代码都相同的问题的序号
+    """
+    parts = [issue.type, f"{issue.contract}.{issue.function}", normalize_snippet(snippet), str(occurrence)]
+    return hashlib.blake2b('\0'.join(parts).encode('utf-8'), digest_size=12).hexdigest()
+
+
+def fingerprint_issues(issues: List[Issue], contract: str, lines: List[str]):
+    """
+    为同一函数中的一组问题设置 contract 和 fingerprint
+
+    Args:
+        issues: 一个检测器在一个函数中发现的问题
+        contract: 所在合约名
+        lines: 文件源码的各行
+    """
+    occurrences: Dict[Tuple[str, str], int] = {}
+    for issue in issues:
+        issue.contract = contract
+        snippet = lines[issue.line - 1] if 0 < issue.line <= len(lines) else ''
+        key = (issue.type, normalize_snippet(snippet))
+        occurrence = occurrences.get(key, 0)
+        occurrences[key] = occurrence + 1
+        issue.fingerprint = issue_fingerprint(issue, snippet, occurrence)
+
+
+class Baseline:
+    """已知问题的指纹集合"""
+
+    def __init__(self, fingerprints=()):
+        self.fingerprints: FrozenSet[str] = frozenset(fingerprints)
+
+    @classmethod
+    def load(cls, path: str) -> 'Baseline':
+        """
+        从 JSON 报告加载基线
+
+        Args:
+            path: report.json，或包含报告的目录（递归查找所有 report.json）
+
+        Raises:
+            ValueError: 报告无法读取，或其中的问题没有指纹（旧版本生成的报告）
+        """
+        root = Path(path)
+        reports = sorted(root.rglob('report.json')) if root.is_dir() else [root]
+        if not reports:
+            raise ValueError(f"目录中没有 report.json: {path}")
+
+        fingerprints = set()
+        for report in reports:
+            try:
+                with open(report, 'r', encoding='utf-8') as f:
+                    issues = json.load(f).get('issues', [])
+            except (OSError, ValueError, AttributeError) as e:
+                raise ValueError(f"无法读取基线报告 {report}: {e}") from e
+            for issue in issues:
+                fingerprint = issue.get('fingerprint')
+                if not fingerprint:
+                    raise ValueError(f"基线报告中的问题没有指纹，请用当前版本重新生成: {report}")
+                fingerprints.add(fingerprint)
+        return cls(fingerprints)
+
+    def __len__(self) -> int:
+        return len(self.fingerprints)
@@ -0,0 +1,147 @@
+"""时间和内存预算
+
+解析、检测和分析的循环中调用 check_budget() 作为检查点；当前线程上任一生效的
+预算超限时抛出 BudgetExceeded，调用方据此取消剩余工作并把文件/检测器标记为
+"部分分析"，其余文件继续扫描。
+
+预算可以嵌套（例如文件预算内嵌检测器预算），也可以多次进入同一个预算对象，
+耗时会累计（同一文件的解析、检测、分析分阶段进行）。
+"""
+
+import os
+import threading
+import time
+import tracemalloc
+from dataclasses import dataclass
+from typing import Dict, Optional
+
+_local = threading.local()
+
+# 读取内存占用的开销较大，两次内存检查之间至少间隔这么久（秒）
+_MEMORY_CHECK_INTERVAL = 0.05
+
+
+class BudgetExceeded(Exception):
+    """超出时间或内存预算"""
+
+    def __init__(self, kind: str, limit: float, scope: str = ""):
+        """
+        Args:
+            kind: 'time' 或 'memory'
+            limit: 预算上限（秒或字节）
+            scope: 预算范围描述，如文件路径或检测器名
+        """
+        self.kind = kind
+        self.limit = limit
+        self.scope = scope
+        self.partial_result = None  # 超限前已得到的部分结果（如部分解析的AST）
+        unit = "s" if kind == 'time' else " bytes"
+        super().__init__(f"{scope or '任务'} 超出{'时间' if kind == 'time' else '内存'}预算 ({limit}{unit})")
+
+    @property
+    def reason(self) -> str:
+        return 'timeout' if self.kind == 'time' else 'memory'
+
+
+def _current_memory() -> Optional[int]:
+    """当前内存占用（字节）：优先使用 tracemalloc，其次 /proc/self/statm；都不可用时返回 None"""
+    if tracemalloc.is_tracing():
+        return tracemalloc.get_traced_memory()[0]
+    try:
+        with open('/proc/self/statm', 'rb') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError, AttributeError):
+        return None
+
+
+class Budget:
+    """时间/内存预算（with budget: ... 期间生效）"""
+
+    def __init__(self, time_limit: Optional[float] = None, memory_limit: Optional[int] = None,
+                 scope: str = ""):
+        """
+        Args:
+            time_limit: 时间上限（秒），None 表示不限制
+            memory_limit: 内存增长上限（字节，相对于进入预算时），None 表示不限制
+            scope: 预算范围描述（用于报告）
+        """
+        self.time_limit = time_limit
+        self.memory_limit = memory_limit
+        self.scope = scope
+        self.spent = 0.0  # 之前各次进入累计的耗时
+        self._started = None
+        self._memory_base = None
+        self._next_memory_check = 0.0
+
+    @property
+    def unlimited(self) -> bool:
+        return self.time_limit is None and self.memory_limit is None
+
+    def __enter__(self):
+        if self.unlimited:
+            return self
+        self._started = time.perf_counter()
+        if self.memory_limit is not None and self._memory_base is None:
+            self._memory_base = _current_memory()
+        stack = getattr(_local, 'stack', None)
+        if stack is None:
+            stack = _local.stack = []
+        stack.append(self)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if self.unlimited:
+            return False
+        self.spent += time.perf_counter() - self._started
+        self._started = None
+        _local.stack.remove(self)
+        return False
+
+    def check(self):
+        """检查是否超限，超限时抛出 BudgetExceeded"""
+        now = time.perf_counter()
+        if self.time_limit is not None and self.spent + (now - self._started) > self.time_limit:
+            raise BudgetExceeded('time', self.time_limit, self.scope)
+
+        if self.memory_limit is not None and self._memory_base is not None \
+                and now >= self._next_memory_check:
+            self._next_memory_check = now + _MEMORY_CHECK_INTERVAL
+            current = _current_memory()
+            if current is not None and current - self._memory_base > self.memory_limit:
+                raise BudgetExceeded('memory', self.memory_limit, self.scope)
+
+
+def check_budget():
+    """检查点：当前线程上任一生效的预算超限时抛出 BudgetExceeded"""
+    stack = getattr(_local, 'stack', None)
+    if stack:
+        for budget in stack:
+            budget.check()
+
+
+@dataclass
+class BudgetLimits:
+    """每个文件和每个检测器的预算配置（None 表示不限制）"""
+    file_time: Optional[float] = None  # 秒
+    file_memory: Optional[int] = None  # 字节
+    detector_time: Optional[float] = None  # 秒
+    detector_memory: Optional[int] = None  # 字节
+
+    def for_file(self, file_path: str) -> Budget:
+        """创建文件预算（同一文件的解析、检测、分析共用）"""
+        return Budget(self.file_time, self.file_memory, scope=file_path)
+
+    def for_detector(self, detector_name: str, file_path: str) -> Budget:
+        """创建某个检测器在某个文件上的预算"""
+        return Budget(self.detector_time, self.detector_memory, scope=f"{detector_name}: {file_path}")
+
+
+def partial_record(file_path: str, stage: str, error: BudgetExceeded, detector: str = None) -> Dict:
+    """生成"部分分析"记录（用于报告）"""
+    return {
+        "file": file_path,
+        "stage": stage,
+        "detector": detector,
+        "reason": error.reason,
+        "limit": error.limit
+    }
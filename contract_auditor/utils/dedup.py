@@ -0,0 +1,114 @@
+"""内容寻址去重
+
+两个层级：
+- 文件：内容完全相同的文件只解析一次（见 SourceCache），
+  AST 以各自的路径重新标记
+- 函数：规范化后内容相同的函数共享同一份分析结果和检测结果，
+  复用时按行号偏移重新定位（见 BaseDetector.relocate 和各分析器的 relocate）
+
+规范化只去掉每行首尾的空白，保留换行，因此同一指纹的函数内部行号结构相同，
+结果只需整体平移行号。
+"""
+
+import hashlib
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from ..parser.ast_builder import AST, ContractNode, FunctionNode
+
+
+def content_hash(text: str) -> str:
+    """文本内容的哈希"""
+    return hashlib.blake2b(text.encode('utf-8'), digest_size=16).hexdigest()
+
+
+def normalize_function(source_code: str, func: FunctionNode) -> str:
+    """规范化函数源码（去掉每行首尾空白，保留行结构）"""
+    text = source_code[func.start:func.end]
+    return '\n'.join(line.strip() for line in text.split('\n'))
+
+
+def function_fingerprint(ast: AST, contract: ContractNode, func: FunctionNode, view=None) -> str:
+    """
+    函数指纹：规范化源码的哈希
+
+    检测结果还取决于函数是否为旧式构造函数（与合约同名），以及函数使用的修饰符的定义
+    （可能来自基合约，view 为合约的 ContractView），一并计入指纹。
+    """
+    is_constructor = func.name == contract.name
+    parts = [str(int(is_constructor)), normalize_function(ast.source_code, func)]
+    if view is not None:
+        for modifier in view.function_modifiers(ast, func):
+            parts.append('\n'.join(line.strip() for line in modifier.body.split('\n')))
+    return content_hash('\n\0'.join(parts))
+
+
+class ResultCache:
+    """
+    按函数指纹缓存结果
+
+    每个结果记录首次计算时函数所在的行号，复用时调用方按行号偏移重新定位。
+    指定 max_entries 时按最近使用淘汰（LRU），长期复用的缓存（如 Auditor）不会无限增长。
+    """
+
+    def __init__(self, max_entries: Optional[int] = None):
+        """
+        Args:
+            max_entries: 最多缓存的结果数，None 表示不限制（一次命令行审计）
+        """
+        self.max_entries = max_entries
+        self._results: 'OrderedDict[Tuple[str, str], Tuple[int, Any]]' = OrderedDict()
+        self.hits: Dict[str, int] = {}
+        self.misses: Dict[str, int] = {}
+
+    def get_or_compute(self, kind: str, fingerprint: str, line: int,
+                       compute: Callable[[], Any],
+                       relocate: Optional[Callable[[Any, int], Any]] = None) -> Any:
+        """
+        获取缓存的结果，未命中时计算并缓存
+
+        Args:
+            kind: 结果类型，如 detector.ReentrancyDetector、analysis.taint
+            fingerprint: 函数指纹
+            line: 当前函数所在行号
+            compute: 计算结果
+            relocate: relocate(result, delta_lines) 将结果平移到当前函数；为 None 表示结果与位置无关
+
+        Returns:
+            当前函数的结果
+        """
+        key = (kind, fingerprint)
+        cached = self._results.get(key)
+        if cached is None:
+            self.misses[kind] = self.misses.get(kind, 0) + 1
+            result = compute()
+            self._results[key] = (line, result)
+            if self.max_entries is not None and len(self._results) > self.max_entries:
+                self._results.popitem(last=False)
+            return result
+
+        self.hits[kind] = self.hits.get(kind, 0) + 1
+        if self.max_entries is not None:
+            self._results.move_to_end(key)
+        cached_line, result = cached
+        if relocate is None:
+            return result
+        return relocate(result, line - cached_line)
+
+    def __len__(self) -> int:
+        return len(self._results)
+
+    def clear(self):
+        """丢弃所有缓存的结果和命中统计"""
+        self._results.clear()
+        self.hits.clear()
+        self.misses.clear()
+
+    def stats(self) -> Dict[str, Dict]:
+        """各类型的命中统计"""
+        stats = {}
+        for kind in sorted(set(self.hits) | set(self.misses)):
+            hits = self.hits.get(kind, 0)
+            total = hits + self.misses.get(kind, 0)
+            stats[kind] = {"hits": hits, "total": total, "hit_rate": round(hits / total, 4) if total else 0.0}
+        return stats
@@ -5,25 +5,32 @@ from pathlib import Path
 from typing import List, Tuple, Dict, Any
 
 
-def find_solidity_files(path: str) -> List[Tuple[str, str]]:
+def find_solidity_files(path: str, store=None) -> List[Tuple[str, Any]]:
     """
     查找所有Solidity文件
     
     Args:
         path: 文件或目录路径
+        store: SourceStore对象；提供时不读取文件内容，返回 SourceHandle（由 store.read 按需读取）
         
     Returns:
-        List of (file_path, content) tuples
+        List of (file_path, content) tuples（提供 store 时 content 为 SourceHandle）
     """
     files = []
     path_obj = Path(path)
     
     if path_obj.is_file():
-        if path_obj.suffix == '.sol':
-            with open(path_obj, 'r', encoding='utf-8') as f:
-                files.append((str(path_obj), f.read()))
+        sol_files = [path_obj] if path_obj.suffix == '.sol' else []
     elif path_obj.is_dir():
-        for sol_file in path_obj.rglob('*.sol'):
+        # Foundry 的产物目录 out/A.sol/ 也以 .sol 结尾
+        sol_files = (sol_file for sol_file in path_obj.rglob('*.sol') if sol_file.is_file())
+    else:
+        sol_files = []
+    
+    for sol_file in sol_files:
+        if store is not None:
+            files.append((str(sol_file), store.add_file(str(sol_file))))
+        else:
             with open(sol_file, 'r', encoding='utf-8') as f:
                 files.append((str(sol_file), f.read()))
     
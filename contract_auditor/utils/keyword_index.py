@@ -0,0 +1,88 @@
+"""关键词预过滤
+
+每个文件只做一次多关键词扫描，记录各触发词出现的位置；检测器声明自己的触发词
+（BaseDetector.TRIGGER_TOKENS），文件或函数范围内没有任何触发词时直接跳过该检测器。
+
+扫描结果与 Aho-Corasick 自动机相同（所有关键词的全部出现位置，包括相互重叠的，
+如 msg.sender 中的 .send）。纯 Python 的自动机需要逐字符循环，比正则引擎慢一个数量级，
+因此扫描用正则交替在正则引擎内完成：每个位置匹配最长的关键词，再补上作为它前缀的
+更短关键词。只有关键词之间可能错位重叠时才使用零宽前瞻逐位置匹配（慢数倍），
+检测器的触发词（.call、.send 等）互不重叠，走普通的交替匹配。
+"""
+
+import re
+from bisect import bisect_left
+from typing import Dict, Iterable, List, Set
+
+
+class KeywordScanner:
+    """多关键词扫描器（同一组关键词编译一次，可用于任意多个文件）"""
+
+    def __init__(self, keywords: Iterable[str]):
+        self.keywords = sorted({keyword for keyword in keywords if keyword}, key=len, reverse=True)
+        # 在同一位置匹配到某个关键词时，以同一位置开头的更短关键词也一并出现
+        self._prefixes: Dict[str, List[str]] = {
+            keyword: [other for other in self.keywords if keyword.startswith(other)]
+            for keyword in self.keywords
+        }
+        if self.keywords:
+            alternatives = '|'.join(re.escape(keyword) for keyword in self.keywords)
+            if self._overlapping(self.keywords):
+                self._pattern = re.compile(f'(?=({alternatives}))')
+            else:
+                self._pattern = re.compile(f'({alternatives})')
+        else:
+            self._pattern = None
+
+    @staticmethod
+    def _overlapping(keywords: List[str]) -> bool:
+        """是否存在错位重叠的关键词：一个出现在另一个的中间，或一个的后缀是另一个的前缀"""
+        for keyword in keywords:
+            for other in keywords:
+                if other in keyword[1:]:
+                    return True
+                if any(keyword.endswith(other[:i]) for i in range(1, min(len(keyword), len(other)))):
+                    return True
+        return False
+
+    def scan(self, text: str) -> Dict[str, List[int]]:
+        """
+        扫描文本
+
+        Returns:
+            关键词 -> 出现的起始位置（升序）；未出现的关键词不在结果中
+        """
+        positions: Dict[str, List[int]] = {}
+        if self._pattern is None:
+            return positions
+        for match in self._pattern.finditer(text):
+            start = match.start()
+            for keyword in self._prefixes[match.group(1)]:
+                positions.setdefault(keyword, []).append(start)
+        return positions
+
+
+class KeywordIndex:
+    """单个文件的关键词索引，按源码范围（如函数的 start/end）查询"""
+
+    def __init__(self, scanner: KeywordScanner, text: str):
+        self.positions = scanner.scan(text)
+
+    @property
+    def present(self) -> Set[str]:
+        """文件中出现过的关键词"""
+        return set(self.positions)
+
+    def contains(self, keyword: str, start: int = 0, end: int = None) -> bool:
+        """关键词是否完整地出现在 [start, end) 范围内"""
+        positions = self.positions.get(keyword)
+        if not positions:
+            return False
+        if end is None:
+            return positions[-1] >= start
+        i = bisect_left(positions, start)
+        return i < len(positions) and positions[i] + len(keyword) <= end
+
+    def any_of(self, keywords: Iterable[str], start: int = 0, end: int = None) -> bool:
+        """任一关键词是否出现在 [start, end) 范围内"""
+        return any(self.contains(keyword, start, end) for keyword in keywords)
@@ -0,0 +1,112 @@
+"""流水线
+
+阶段之间用有界队列连接，上游在后台线程中运行：
+- Prefetch：在后台线程中对输入逐个执行一个阶段（如读取源码），结果放入有界队列，
+  下游按输入顺序取用；队列满时上游阻塞（背压），因此提前处理的数量有上限
+- BackgroundTasks：在后台线程中依次执行任务（如写报告），未完成的任务达到上限时
+  提交方等待最早的任务完成
+
+上游的异常在下游取用（或等待）时重新抛出。
+剖析器的阶段栈不是线程安全的，后台线程中的工作应使用单独的 Profiler，完成后再合并。
+"""
+
+import queue
+import threading
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Deque, Iterable, Iterator, List
+
+_DONE = object()
+
+
+class Prefetch:
+    """在后台线程中提前执行一个阶段的有界迭代器"""
+
+    def __init__(self, items: Iterable, stage: Callable[[Any], Any], maxsize: int = 8,
+                 name: str = 'prefetch'):
+        """
+        Args:
+            items: 输入
+            stage: 对每个输入执行的函数
+            maxsize: 队列容量（最多提前完成的结果数）
+            name: 线程名
+        """
+        self._queue: queue.Queue = queue.Queue(maxsize=max(maxsize, 1))
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, args=(items, stage), name=name, daemon=True)
+        self._thread.start()
+
+    def _run(self, items: Iterable, stage: Callable[[Any], Any]):
+        try:
+            for item in items:
+                if self._stopped.is_set():
+                    return
+                self._put((True, stage(item)))
+        except BaseException as e:
+            self._put((False, e))
+        self._put((True, _DONE))
+
+    def _put(self, entry):
+        # 下游提前结束时不再阻塞
+        while not self._stopped.is_set():
+            try:
+                self._queue.put(entry, timeout=0.1)
+                return
+            except queue.Full:
+                continue
+
+    def __iter__(self) -> Iterator:
+        while True:
+            ok, value = self._queue.get()
+            if not ok:
+                self.close()
+                raise value
+            if value is _DONE:
+                return
+            yield value
+
+    def close(self):
+        """停止上游（下游不再取用时调用）"""
+        self._stopped.set()
+        self._thread.join()
+
+    def __enter__(self) -> 'Prefetch':
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+
+class BackgroundTasks:
+    """在一个后台线程中依次执行任务，最多 maxsize 个任务未完成"""
+
+    def __init__(self, maxsize: int = 1, name: str = 'background'):
+        self.maxsize = max(maxsize, 1)
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix=name)
+        self._pending: Deque[Future] = deque()
+        self._done: List[Future] = []
+
+    def submit(self, task: Callable[..., Any], *args, **kwargs) -> Future:
+        """提交任务；未完成的任务已达上限时等待最早的任务完成"""
+        while len(self._pending) >= self.maxsize:
+            self._finish(self._pending.popleft())
+        future = self._executor.submit(task, *args, **kwargs)
+        self._pending.append(future)
+        return future
+
+    def wait(self) -> List[Any]:
+        """等待所有任务完成，按提交顺序返回所有任务的结果"""
+        while self._pending:
+            self._finish(self._pending.popleft())
+        return [future.result() for future in self._done]
+
+    def close(self):
+        """关闭线程（不再等待未开始的任务）"""
+        for future in self._pending:
+            future.cancel()
+        self._executor.shutdown(wait=True)
+
+    def _finish(self, future: Future):
+        future.result()  # 重新抛出任务中的异常
+        self._done.append(future)
@@ -0,0 +1,226 @@
+"""性能剖析工具
+
+记录每个阶段、每个检测器、每个文件和每个函数的墙钟时间、CPU时间、
+峰值内存（tracemalloc 统计的 Python 堆内存）和处理数量。
+未启用时所有记录操作都是空操作，不影响正常运行。
+"""
+
+import time
+import tracemalloc
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+
+@dataclass
+class StageStats:
+    """单个阶段（或文件/函数）的统计"""
+    wall: float = 0.0  # 墙钟时间（秒）
+    cpu: float = 0.0  # CPU时间（秒）
+    peak_memory: int = 0  # 峰值内存（字节）
+    calls: int = 0
+    items: int = 0
+
+    def add(self, other: 'StageStats'):
+        """累加另一份统计"""
+        self.wall += other.wall
+        self.cpu += other.cpu
+        self.peak_memory = max(self.peak_memory, other.peak_memory)
+        self.calls += other.calls
+        self.items += other.items
+
+    def to_dict(self) -> Dict:
+        return {
+            "wall_time": round(self.wall, 6),
+            "cpu_time": round(self.cpu, 6),
+            "peak_memory": self.peak_memory,
+            "calls": self.calls,
+            "items": self.items
+        }
+
+
+class _StageContext:
+    """阶段计时上下文（with profiler.stage(...) as record: record.items += n）"""
+
+    def __init__(self, profiler: 'Profiler', name: str, file: Optional[str], items: int):
+        self.profiler = profiler
+        self.name = name
+        self.file = file
+        self.items = items
+        self._peak = 0
+
+    def __enter__(self):
+        profiler = self.profiler
+        if profiler.enabled:
+            if profiler.track_memory:
+                # 嵌套阶段会重置峰值，先把目前为止的峰值记到外层阶段上
+                peak = tracemalloc.get_traced_memory()[1]
+                if profiler._stack:
+                    outer = profiler._stack[-1]
+                    outer._peak = max(outer._peak, peak)
+                tracemalloc.reset_peak()
+            profiler._stack.append(self)
+            self._wall = time.perf_counter()
+            self._cpu = time.process_time()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        profiler = self.profiler
+        if not profiler.enabled:
+            return False
+
+        stats = StageStats(wall=time.perf_counter() - self._wall,
+                           cpu=time.process_time() - self._cpu,
+                           calls=1, items=self.items)
+        profiler._stack.pop()
+        if profiler.track_memory:
+            stats.peak_memory = max(self._peak, tracemalloc.get_traced_memory()[1])
+            if profiler._stack:
+                outer = profiler._stack[-1]
+                outer._peak = max(outer._peak, stats.peak_memory)
+            tracemalloc.reset_peak()
+
+        profiler.stages.setdefault(self.name, StageStats()).add(stats)
+        if self.file:
+            profiler.files.setdefault(self.file, StageStats()).add(stats)
+        return False
+
+
+class _FunctionTimer:
+    """轻量的函数级计时（只记录时间，不统计内存）"""
+
+    def __init__(self, profiler: 'Profiler', key: str):
+        self.profiler = profiler
+        self.key = key
+
+    def __enter__(self):
+        if self.profiler.enabled:
+            self._wall = time.perf_counter()
+            self._cpu = time.process_time()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if self.profiler.enabled:
+            stats = self.profiler.functions.setdefault(self.key, StageStats())
+            stats.wall += time.perf_counter() - self._wall
+            stats.cpu += time.process_time() - self._cpu
+            stats.calls += 1
+        return False
+
+
+class Profiler:
+    """性能剖析器"""
+
+    def __init__(self, enabled: bool = True, track_memory: bool = True):
+        """
+        Args:
+            enabled: 是否启用（False 时所有记录都是空操作）
+            track_memory: 是否通过 tracemalloc 统计峰值内存
+        """
+        self.enabled = enabled
+        self.track_memory = enabled and track_memory
+        self.stages: Dict[str, StageStats] = {}
+        self.files: Dict[str, StageStats] = {}
+        self.functions: Dict[str, StageStats] = {}
+        self.counters: Dict[str, int] = {}
+        self._stack: List[_StageContext] = []
+        self._owns_tracemalloc = False
+
+    def start(self):
+        """开始剖析（启动内存跟踪）"""
+        if self.track_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._owns_tracemalloc = True
+
+    def stop(self):
+        """结束剖析"""
+        if self._owns_tracemalloc:
+            tracemalloc.stop()
+            self._owns_tracemalloc = False
+
+    def child(self) -> 'Profiler':
+        """创建共享设置的子剖析器（例如每个报告单独统计，之后合并回来）"""
+        child = Profiler(enabled=self.enabled, track_memory=self.track_memory)
+        child._stack = self._stack
+        return child
+
+    def merge(self, other: 'Profiler'):
+        """合并子剖析器的统计"""
+        for target, source in ((self.stages, other.stages), (self.files, other.files),
+                               (self.functions, other.functions)):
+            for key, stats in source.items():
+                target.setdefault(key, StageStats()).add(stats)
+        for key, value in other.counters.items():
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def stage(self, name: str, file: Optional[str] = None, items: int = 0) -> _StageContext:
+        """
+        记录一个阶段
+
+        Args:
+            name: 阶段名，如 parse、detector.ReentrancyDetector、analysis.taint
+            file: 所属文件（同时计入该文件的统计）
+            items: 处理数量（也可以在 with 块内累加 record.items）
+        """
+        return _StageContext(self, name, file, items)
+
+    def function(self, key: str) -> _FunctionTimer:
+        """记录单个函数上的耗时（key 通常为 文件:合约.函数）"""
+        return _FunctionTimer(self, key)
+
+    def count(self, name: str, value: int = 1):
+        """累加计数器"""
+        if self.enabled:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def skip_rates(self) -> Dict[str, float]:
+        """成对计数器 X.skipped / X.total 的跳过率（如 prefilter.ReentrancyDetector.functions）"""
+        rates = {}
+        for name, total in self.counters.items():
+            base = name[:-len('.total')]
+            if name.endswith('.total') and total and f'{base}.skipped' in self.counters:
+                rates[base] = round(self.counters.get(f'{base}.skipped', 0) / total, 4)
+        return rates
+
+    def to_dict(self, top: int = 10) -> Dict:
+        """转换为字典格式（用于JSON报告的 performance 部分）"""
+        def slowest(table: Dict[str, StageStats]) -> List[Dict]:
+            ranked = sorted(table.items(), key=lambda kv: kv[1].wall, reverse=True)[:top]
+            return [{"name": name, **stats.to_dict()} for name, stats in ranked]
+
+        return {
+            "stages": {name: stats.to_dict() for name, stats in self.stages.items()},
+            "slowest_files": slowest(self.files),
+            "slowest_functions": slowest(self.functions),
+            "counters": dict(self.counters),
+            "skip_rates": self.skip_rates()
+        }
+
+    def format_report(self, top: int = 10) -> List[str]:
+        """生成文本格式的剖析报告"""
+        lines = [f"{'阶段':<36}{'墙钟(ms)':>12}{'CPU(ms)':>12}{'峰值内存(KB)':>14}{'数量':>8}"]
+        for name, stats in sorted(self.stages.items(), key=lambda kv: kv[1].wall, reverse=True):
+            lines.append(f"{name:<36}{stats.wall * 1000:>12.1f}{stats.cpu * 1000:>12.1f}"
+                         f"{stats.peak_memory / 1024:>14.1f}{stats.items:>8}")
+
+        for title, table in (("最慢的文件", self.files), ("最慢的函数", self.functions)):
+            ranked = sorted(table.items(), key=lambda kv: kv[1].wall, reverse=True)[:top]
+            if ranked:
+                lines.append("")
+                lines.append(f"{title}（前 {len(ranked)} 个）:")
+                for name, stats in ranked:
+                    lines.append(f"  {stats.wall * 1000:>10.1f} ms  {name}")
+
+        if self.counters:
+            lines.append("")
+            lines.append("计数:")
+            for name, value in sorted(self.counters.items()):
+                lines.append(f"  {name}: {value}")
+
+        rates = self.skip_rates()
+        if rates:
+            lines.append("")
+            lines.append("跳过率:")
+            for name, rate in sorted(rates.items()):
+                lines.append(f"  {name}: {self.counters[name + '.skipped']}/{self.counters[name + '.total']}"
+                             f" ({rate:.1%})")
+        return lines
@@ -0,0 +1,605 @@
+"""紧凑二进制序列化
+
+用于缓存和进程间传递 AST、检测结果和分析结果，比 pickle 和 JSON 更小：
+- 字符串表：所有名称、类型、路径等字符串只存一份，其余位置只写索引
+- 变长整数（varint）：偏移和行号按与前一个节点的差值编码（zigzag），通常只占 1 字节
+- 不复制源码：函数体、修饰符体是源码的片段，只记录长度，解码时从源码切片得到；
+  源码本身每个文件只存一份，也可以不存（解码时由调用方提供）
+
+格式：
+    b'CAB' + 版本号(1字节)
+    整数段：4 字节长度（小端）+ varint 序列
+        字符串表的数量和每个字符串的长度（字符数），然后是一个带类型标记的值（见 _Tag）
+    文本段：其余部分，UTF-8 编码的字符串表内容和源码，按出现顺序拼接
+
+所有整数集中在一段、所有文本集中在一段：解码时整数段在一个循环里展开为整数列表，
+之后按字段顺序逐个取用；文本段一次性解码后按长度切片，不逐个字符串解码。
+
+版本号不同的数据直接拒绝（SerializationError），调用方应当作缓存未命中处理。
+"""
+
+import struct
+from typing import Dict, List, Optional
+
+from ..parser.ast_builder import (AST, ASTNode, CallNode, ContractNode, FunctionDeclarationNode, FunctionNode,
+                                  ImportNode, ModifierNode, StateChangeNode, StateVariableNode)
+from ..analyzer.control_flow import ControlFlowGraph
+from ..analyzer.taint_analysis import TaintPath, TaintSink, TaintSource
+from ..detectors.base_detector import Issue
+from .severity import Severity
+
+MAGIC = b'CAB'
+FORMAT_VERSION = 6
+
+_SEVERITIES = list(Severity)
+_LENGTH = struct.Struct('<I')
+_HEADER_SIZE = len(MAGIC) + 1 + _LENGTH.size
+
+
+class SerializationError(ValueError):
+    """数据无法解码（格式错误、版本不符或缺少源码）"""
+
+
+class _Tag:
+    """值的类型标记"""
+    NONE = 0
+    FALSE = 1
+    TRUE = 2
+    INT = 3
+    FLOAT = 4  # 以 repr 存入字符串表
+    STR = 5
+    LIST = 6
+    TUPLE = 7
+    DICT = 8
+    AST = 9
+    ISSUE = 10
+    TAINT_PATH = 11
+    CFG = 12
+
+
+# FunctionNode/FunctionDeclarationNode 的布尔属性按位存储
+_PAYABLE = 1
+_VIEW = 2
+_PURE = 4
+
+
+def dumps(value, include_source: bool = True) -> bytes:
+    """
+    序列化
+
+    Args:
+        value: AST、Issue、TaintPath、ControlFlowGraph，或由它们和
+            None/bool/int/float/str/list/tuple/dict 组成的结构
+        include_source: 是否包含 AST 的源码；为 False 时解码需要通过 sources 提供
+
+    Returns:
+        编码后的字节串
+    """
+    body = _Encoder(include_source)
+    body.value(value)
+
+    ints = _encode_varints([len(body.table)] + [len(text) for text in body.table] + body.ints)
+    text = ''.join(body.table) + ''.join(body.sources)
+    return MAGIC + bytes([FORMAT_VERSION]) + _LENGTH.pack(len(ints)) + ints + text.encode('utf-8')
+
+
+def loads(data: bytes, sources: Dict[str, str] = None):
+    """
+    反序列化
+
+    Args:
+        data: dumps 的结果
+        sources: 文件路径 -> 源码（编码时未包含源码的 AST 从这里取）
+
+    Raises:
+        SerializationError: 数据格式错误、版本不符，或缺少 AST 的源码
+    """
+    if data[:3] != MAGIC:
+        raise SerializationError("不是有效的序列化数据")
+    if len(data) < _HEADER_SIZE or data[3] != FORMAT_VERSION:
+        raise SerializationError(f"不支持的格式版本: {data[3] if len(data) > 3 else None}")
+
+    size = _LENGTH.unpack_from(data, 4)[0]
+    ints = data[_HEADER_SIZE:_HEADER_SIZE + size]
+    try:
+        values = _decode_varints(ints)
+        text = data[_HEADER_SIZE + size:].decode('utf-8')
+    except UnicodeDecodeError as e:
+        raise SerializationError(f"数据已损坏: {e}") from e
+
+    try:
+        decoder = _Decoder(values, text, sources or {})
+        value = decoder.value()
+        remaining = next(decoder.values, None)
+    except (StopIteration, IndexError) as e:
+        raise SerializationError("数据已损坏: 内容不完整") from e
+    if remaining is not None or decoder.text_pos != len(text):
+        raise SerializationError("数据已损坏: 长度不符")
+    return value
+
+
+def _encode_varints(values: List[int]) -> bytes:
+    """整数序列编码为 varint（都小于 128 时每个整数就是一个字节）"""
+    if not values or max(values) < 0x80:
+        return bytes(values)
+    out = bytearray()
+    append = out.append
+    for n in values:
+        while n > 0x7f:
+            append((n & 0x7f) | 0x80)
+            n >>= 7
+        append(n)
+    return bytes(out)
+
+
+def _decode_varints(data: bytes) -> List[int]:
+    """一次性展开 varint 序列（没有多字节 varint 时直接按字节取值）"""
+    if data.isascii():
+        return list(data)
+    if data[-1] & 0x80:
+        raise SerializationError("数据已损坏: varint 不完整")
+    values = []
+    append = values.append
+    n = 0
+    shift = 0
+    for byte in data:
+        if byte < 0x80:
+            if shift:
+                append(n | (byte << shift))
+                n = 0
+                shift = 0
+            else:
+                append(byte)
+        else:
+            n |= (byte & 0x7f) << shift
+            shift += 7
+    return values
+
+
+class _Encoder:
+
+    def __init__(self, include_source: bool):
+        self.include_source = include_source
+        self.ints: List[int] = []  # 最后统一编码为 varint（见 _encode_varints）
+        self.uint = self.ints.append
+        self.table: List[str] = []
+        self.sources: List[str] = []  # 按出现顺序包含的源码
+        self._indexes: Dict[str, int] = {}
+        self._source: Optional[str] = None
+        self._start = 0  # 上一个节点的起始偏移
+        self._line = 0  # 上一个节点的行号
+
+    def sint(self, n: int):
+        self.uint(n << 1 if n >= 0 else ((-n) << 1) - 1)
+
+    def string(self, text: str):
+        index = self._indexes.get(text)
+        if index is None:
+            index = self._indexes[text] = len(self.table)
+            self.table.append(text)
+        self.uint(index)
+
+    def optional_string(self, text: Optional[str]):
+        if text is None:
+            self.uint(0)
+        else:
+            index = self._indexes.get(text)
+            if index is None:
+                index = self._indexes[text] = len(self.table)
+                self.table.append(text)
+            self.uint(index + 1)
+
+    def strings(self, items: List[str]):
+        self.uint(len(items))
+        for text in items:
+            self.string(text)
+
+    def value(self, value):
+        tag = type(value)
+        if value is None:
+            self.uint(_Tag.NONE)
+        elif tag is bool:
+            self.uint(_Tag.TRUE if value else _Tag.FALSE)
+        elif tag is int:
+            self.uint(_Tag.INT)
+            self.sint(value)
+        elif tag is float:
+            self.uint(_Tag.FLOAT)
+            self.string(repr(value))
+        elif tag is str:
+            self.uint(_Tag.STR)
+            self.string(value)
+        elif tag is list or tag is tuple:
+            self.uint(_Tag.LIST if tag is list else _Tag.TUPLE)
+            self.uint(len(value))
+            for item in value:
+                self.value(item)
+        elif tag is dict:
+            self.uint(_Tag.DICT)
+            self.uint(len(value))
+            for key, item in value.items():
+                self.value(key)
+                self.value(item)
+        elif tag is AST:
+            self.uint(_Tag.AST)
+            self.ast(value)
+        elif tag is Issue:
+            self.uint(_Tag.ISSUE)
+            self.issue(value)
+        elif tag is TaintPath:
+            self.uint(_Tag.TAINT_PATH)
+            self.taint_path(value)
+        elif tag is ControlFlowGraph:
+            self.uint(_Tag.CFG)
+            self.strings(value.nodes)
+            self.uint(len(value.edges))
+            for source, target in value.edges:
+                self.string(source)
+                self.string(target)
+            self.uint(len(value.node_labels))
+            for node, label in value.node_labels.items():
+                self.string(node)
+                self.string(label)
+        else:
+            raise TypeError(f"不支持序列化的类型: {tag.__name__}")
+
+    # AST
+
+    def ast(self, ast: AST):
+        self.string(ast.file_path)
+        if self.include_source:
+            self.uint(len(ast.source_code) + 1)
+            self.sources.append(ast.source_code)
+        else:
+            self.uint(0)
+        self._source = ast.source_code
+        self._start = 0
+        self._line = 0
+
+        self.uint(len(ast.imports))
+        for node in ast.imports:
+            self.position(node)
+            self.string(node.path)
+            self.strings(node.symbols)
+            self.optional_string(node.alias)
+
+        self.uint(len(ast.contracts))
+        for contract in ast.contracts:
+            self.contract(contract)
+        self._source = None
+
+    def position(self, node: ASTNode):
+        self.sint(node.start - self._start)
+        self.sint(node.end - node.start)
+        self.sint(node.line - self._line)
+        self.uint(node.column)
+        self._start = node.start
+        self._line = node.line
+
+    def text(self, text: str, node: ASTNode):
+        """源码片段：以节点结束位置结尾时只记录长度，否则存入字符串表"""
+        start = node.end - len(text)
+        if text and start >= 0 and self._source.startswith(text, start):
+            self.uint(len(text) + 1)
+        else:
+            self.uint(0)
+            self.string(text)
+
+    def contract(self, contract: ContractNode):
+        self.position(contract)
+        self.string(contract.name)
+        self.string(contract.kind)
+        self.strings(contract.bases)
+
+        self.uint(len(contract.state_variables))
+        for var in contract.state_variables:
+            self.position(var)
+            self.string(var.name)
+            self.string(var.var_type)
+            self.string(var.visibility)
+            self.uint(int(var.is_constant))
+
+        self.uint(len(contract.modifiers))
+        for modifier in contract.modifiers:
+            self.position(modifier)
+            self.string(modifier.name)
+            self.text(modifier.body, modifier)
+
+        self.uint(len(contract.functions))
+        for func in contract.functions:
+            self.function(func)
+
+        self.uint(len(contract.declarations))
+        for declaration in contract.declarations:
+            self.signature(declaration)
+            self.uint(self.flags(declaration))
+
+        self.uint(int(contract.constructor is not None))
+        if contract.constructor is not None:
+            self.function(contract.constructor)
+
+    def signature(self, func):
+        """函数和声明共有的部分"""
+        self.position(func)
+        self.string(func.name)
+        self.string(func.visibility)
+        self.strings(func.modifiers)
+        self.strings(func.parameters)
+        self.strings(func.returns)
+
+    def flags(self, func) -> int:
+        return ((_PAYABLE if func.is_payable else 0) | (_VIEW if func.is_view else 0)
+                | (_PURE if func.is_pure else 0))
+
+    def function(self, func: FunctionNode):
+        self.signature(func)
+        self.text(func.body, func)
+        self.sint(func.body_line - func.line)
+        self.uint(self.flags(func))
+
+        # 函数内的节点相对函数编码，之后恢复游标，使下一个函数相对当前函数编码
+        start, line = self._start, self._line
+        self.uint(len(func.calls))
+        for call in func.calls:
+            self.position(call)
+            self.string(call.call_type)
+            self.string(call.target)
+            self.optional_string(call.value)
+            self.optional_string(call.gas)
+            self.strings(call.args)
+            self.uint(int(call.is_low_level))
+
+        self.uint(len(func.state_changes))
+        for change in func.state_changes:
+            self.position(change)
+            self.string(change.variable)
+            self.string(change.operation)
+        self._start, self._line = start, line
+
+    # 结果
+
+    def issue(self, issue: Issue):
+        self.string(issue.type)
+        self.uint(_SEVERITIES.index(issue.severity))
+        self.string(issue.file_path)
+        self.sint(issue.line)
+        self.string(issue.function)
+        self.string(issue.description)
+        self.string(issue.recommendation)
+        self.string(issue.contract)
+        self.optional_string(issue.fingerprint)
+        self.strings(issue.detectors)
+        self.strings(issue.merged_types)
+        self.strings(issue.entry_points)
+        self.uint(len(issue.related_lines))
+        for line in issue.related_lines:
+            self.sint(line - issue.line)
+
+    def taint_path(self, path: TaintPath):
+        for endpoint in (path.source, path.sink):
+            self.string(endpoint.name)
+            self.sint(endpoint.line)
+            self.string(endpoint.type)
+        self.strings(path.path)
+
+
+def _zigzag(n: int) -> int:
+    return (n >> 1) if not n & 1 else -((n + 1) >> 1)
+
+
+class _Decoder:
+    """
+    解码器
+
+    整数通过 self.next（整数列表迭代器的 __next__）逐个读取；各方法把它和字符串表
+    绑定为局部变量，热点路径上不再经过 Python 层的函数调用。
+    """
+
+    def __init__(self, values: List[int], text: str, sources: Dict[str, str]):
+        self.values = iter(values)
+        self.next = self.values.__next__
+        self.text = text
+        self.sources = sources
+        self._source = ""
+        self._start = 0
+        self._line = 0
+
+        nxt = self.next
+        self.table: List[str] = []
+        pos = 0
+        for _ in range(nxt()):
+            size = nxt()
+            self.table.append(text[pos:pos + size])
+            pos += size
+        self.text_pos = pos  # 文本段中下一个源码的位置
+
+    def strings(self) -> List[str]:
+        nxt = self.next
+        table = self.table
+        return [table[nxt()] for _ in range(nxt())]
+
+    def optional_string(self) -> Optional[str]:
+        index = self.next()
+        return self.table[index - 1] if index else None
+
+    def value(self):
+        nxt = self.next
+        table = self.table
+        tag = nxt()
+        if tag == _Tag.NONE:
+            return None
+        if tag == _Tag.FALSE:
+            return False
+        if tag == _Tag.TRUE:
+            return True
+        if tag == _Tag.INT:
+            return _zigzag(nxt())
+        if tag == _Tag.FLOAT:
+            return float(table[nxt()])
+        if tag == _Tag.STR:
+            return table[nxt()]
+        if tag == _Tag.LIST:
+            return [self.value() for _ in range(nxt())]
+        if tag == _Tag.TUPLE:
+            return tuple(self.value() for _ in range(nxt()))
+        if tag == _Tag.DICT:
+            result = {}
+            for _ in range(nxt()):
+                key = self.value()
+                result[key] = self.value()
+            return result
+        if tag == _Tag.AST:
+            return self.ast()
+        if tag == _Tag.ISSUE:
+            return self.issue()
+        if tag == _Tag.TAINT_PATH:
+            return self.taint_path()
+        if tag == _Tag.CFG:
+            cfg = ControlFlowGraph()
+            cfg.nodes = self.strings()
+            cfg.edges = [(table[nxt()], table[nxt()]) for _ in range(nxt())]
+            for _ in range(nxt()):
+                node = table[nxt()]
+                cfg.node_labels[node] = table[nxt()]
+            return cfg
+        raise SerializationError(f"未知的类型标记: {tag}")
+
+    # AST
+
+    def ast(self) -> AST:
+        nxt = self.next
+        file_path = self.table[nxt()]
+        size = nxt()
+        if size:
+            source_code = self.text[self.text_pos:self.text_pos + size - 1]
+            self.text_pos += size - 1
+        elif file_path in self.sources:
+            source_code = self.sources[file_path]
+        else:
+            raise SerializationError(f"缺少源码: {file_path}")
+        self._source = source_code
+        self._start = 0
+        self._line = 0
+
+        imports = []
+        for _ in range(nxt()):
+            line, column, start, end = self.position()
+            imports.append(ImportNode(line=line, column=column, start=start, end=end,
+                                      path=self.table[nxt()], symbols=self.strings(),
+                                      alias=self.optional_string()))
+
+        contracts = [self.contract() for _ in range(nxt())]
+        return AST(contracts=contracts, imports=imports, source_code=source_code, file_path=file_path)
+
+    def position(self):
+        nxt = self.next
+        start = self._start + _zigzag(nxt())
+        end = start + _zigzag(nxt())
+        line = self._line + _zigzag(nxt())
+        self._start = start
+        self._line = line
+        return line, nxt(), start, end
+
+    def text_slice(self, end: int) -> str:
+        """源码片段（见 _Encoder.text）"""
+        size = self.next()
+        if size:
+            return self._source[end - size + 1:end]
+        return self.table[self.next()]
+
+    def contract(self) -> ContractNode:
+        nxt = self.next
+        table = self.table
+        line, column, start, end = self.position()
+        contract = ContractNode(line=line, column=column, start=start, end=end,
+                                name=table[nxt()], kind=table[nxt()], bases=self.strings())
+
+        for _ in range(nxt()):
+            line, column, start, end = self.position()
+            contract.state_variables.append(StateVariableNode(
+                line=line, column=column, start=start, end=end, name=table[nxt()],
+                var_type=table[nxt()], visibility=table[nxt()], is_constant=bool(nxt())))
+
+        for _ in range(nxt()):
+            line, column, start, end = self.position()
+            name = table[nxt()]
+            contract.modifiers.append(ModifierNode(line=line, column=column, start=start, end=end,
+                                                   name=name, body=self.text_slice(end)))
+
+        contract.functions = [self.function() for _ in range(nxt())]
+
+        for _ in range(nxt()):
+            line, column, start, end = self.position()
+            declaration = FunctionDeclarationNode(
+                line=line, column=column, start=start, end=end, name=table[nxt()],
+                visibility=table[nxt()], modifiers=self.strings(), parameters=self.strings(),
+                returns=self.strings())
+            self.set_flags(declaration, nxt())
+            contract.declarations.append(declaration)
+
+        if nxt():
+            contract.constructor = self.function()
+        return contract
+
+    def set_flags(self, func, flags: int):
+        func.is_payable = bool(flags & _PAYABLE)
+        func.is_view = bool(flags & _VIEW)
+        func.is_pure = bool(flags & _PURE)
+
+    def function(self) -> FunctionNode:
+        nxt = self.next
+        table = self.table
+        strings = self.strings
+        position = self.position
+        line, column, start, end = position()
+        func = FunctionNode(line=line, column=column, start=start, end=end,
+                            name=table[nxt()], visibility=table[nxt()], modifiers=strings(),
+                            parameters=strings(), returns=strings())
+        func.body = self.text_slice(end)
+        func.body_line = line + _zigzag(nxt())
+        self.set_flags(func, nxt())
+
+        saved = self._start, self._line
+        calls = func.calls
+        for _ in range(nxt()):
+            line, column, start, end = position()
+            call_type = table[nxt()]
+            target = table[nxt()]
+            value = nxt()
+            gas = nxt()
+            calls.append(CallNode(line=line, column=column, start=start, end=end,
+                                  call_type=call_type, target=target,
+                                  value=table[value - 1] if value else None,
+                                  gas=table[gas - 1] if gas else None,
+                                  args=strings(), is_low_level=bool(nxt())))
+
+        changes = func.state_changes
+        for _ in range(nxt()):
+            line, column, start, end = position()
+            changes.append(StateChangeNode(line=line, column=column, start=start, end=end,
+                                           variable=table[nxt()], operation=table[nxt()]))
+        self._start, self._line = saved
+        return func
+
+    # 结果
+
+    def issue(self) -> Issue:
+        nxt = self.next
+        table = self.table
+        issue = Issue(issue_type=table[nxt()], severity=_SEVERITIES[nxt()],
+                      file_path=table[nxt()], line=_zigzag(nxt()), function=table[nxt()],
+                      description=table[nxt()], recommendation=table[nxt()])
+        issue.contract = table[nxt()]
+        issue.fingerprint = self.optional_string()
+        issue.detectors = self.strings()
+        issue.merged_types = self.strings()
+        issue.entry_points = self.strings()
+        issue.related_lines = [issue.line + _zigzag(nxt()) for _ in range(nxt())]
+        return issue
+
+    def taint_path(self) -> TaintPath:
+        nxt = self.next
+        table = self.table
+        source = TaintSource(table[nxt()], _zigzag(nxt()), table[nxt()])
+        sink = TaintSink(table[nxt()], _zigzag(nxt()), table[nxt()])
+        return TaintPath(source, sink, self.strings())
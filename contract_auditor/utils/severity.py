@@ -13,6 +13,15 @@ class Severity(Enum):
     def __str__(self):
         return self.value
     
+    @property
+    def rank(self) -> int:
+        """等级高低（Critical 最高）"""
+        return _RANKS[self]
+    
+    def at_least(self, other: 'Severity') -> bool:
+        """是否不低于给定等级"""
+        return self.rank >= other.rank
+    
     @classmethod
     def from_string(cls, s):
         """从字符串转换为Severity"""
@@ -22,3 +31,11 @@ class Severity(Enum):
                 return severity
         return cls.LOW
 
+
+_RANKS = {
+    Severity.CRITICAL: 4,
+    Severity.HIGH: 3,
+    Severity.MEDIUM: 2,
+    Severity.LOW: 1
+}
+
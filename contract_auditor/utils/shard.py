@@ -0,0 +1,153 @@
+"""分片审计
+
+大的代码库可以拆成 N 个分片，在不同的机器上分别审计（--shard i/N），每个分片写出一个
+结果包，之后用 merge 命令合并，得到与单机运行相同的报告。
+
+分片的划分是确定的，与文件的发现顺序和机器无关：
+- 项目按项目名的哈希分配，整个项目在同一个分片中（导入和继承需要整个项目）
+- 单文件按内容哈希分配（内容相同的文件在同一个分片中，共享检测结果）
+
+结果包（utils.serialization 编码）按文件记录结果：问题（已合并）、调用图的贡献
+（CallGraphAnalyzer.summarize）、污点路径、控制流、数据流、入口点和部分分析记录。
+合并时按完整的文件分类（每个结果包中都有一份，必须一致）逐组、逐文件重放这些记录，
+调用图由各文件的贡献按文件顺序重建。
+
+单文件组的继承关系（以及依赖它的入口点可达性）只在同一分片的单文件之间解析：没有导入关系、只按合约名引用的基合约
+如果被分到其他分片，将无法解析（这样的代码本身也无法编译）。
+"""
+
+import hashlib
+from typing import Dict, List, Optional, Tuple
+
+from .serialization import SerializationError, dumps, loads
+
+BUNDLE_VERSION = 1
+
+
+class ShardError(ValueError):
+    """分片参数无效，或结果包无法合并"""
+
+
+def parse_shard(spec: str) -> Tuple[int, int]:
+    """
+    解析分片参数
+
+    Args:
+        spec: "i/N"，1 <= i <= N
+
+    Returns:
+        (i, N)
+    """
+    try:
+        index, count = (int(part) for part in spec.split('/'))
+    except ValueError:
+        raise ShardError(f"分片应为 i/N 的形式（如 1/4）: {spec}")
+    if count < 1 or not 1 <= index <= count:
+        raise ShardError(f"分片序号应在 1 到 {max(count, 1)} 之间: {spec}")
+    return index, count
+
+
+def _bucket(data: bytes, count: int) -> int:
+    """按哈希分配到 1..count"""
+    digest = hashlib.blake2b(data, digest_size=8).digest()
+    return int.from_bytes(digest, 'little') % count + 1
+
+
+def project_shard(name: str, count: int) -> int:
+    """项目所在的分片"""
+    return _bucket(name.encode('utf-8'), count)
+
+
+def file_shard(content: bytes, count: int) -> int:
+    """单文件所在的分片（按内容）"""
+    return _bucket(content, count)
+
+
+def layout_of(classified: Dict) -> Dict:
+    """文件分类的路径（结果包中保存，合并时检查各分片一致）"""
+    return {
+        'single_files': [path for path, _ in classified['single_files']],
+        'projects': {name: [path for path, _ in files] for name, files in classified['projects'].items()}
+    }
+
+
+def select_shard(classified: Dict, index: int, count: int, read_bytes) -> Dict:
+    """
+    分片中的文件（与 classify_files 的结果格式相同）
+
+    Args:
+        classified: 所有文件的分类
+        index: 分片序号（1 开始）
+        count: 分片数
+        read_bytes: 读取单文件内容（字节）的函数，参数为 (路径, 源码)
+    """
+    return {
+        'single_files': [(path, source) for path, source in classified['single_files']
+                         if file_shard(read_bytes(path, source), count) == index],
+        'projects': {name: files for name, files in classified['projects'].items()
+                     if project_shard(name, count) == index}
+    }
+
+
+def write_bundle(path: str, index: int, count: int, layout: Dict, records: Dict[str, Dict], meta: Dict):
+    """
+    写出分片的结果包
+
+    Args:
+        path: 输出文件
+        index: 分片序号
+        count: 分片数
+        layout: 所有文件的分类（layout_of）
+        records: 文件路径 -> 该文件的结果（见 api.iter_files 的 records）
+        meta: 其他运行参数（如风险等级），合并时检查各分片一致
+    """
+    bundle = {'version': BUNDLE_VERSION, 'shard': (index, count), 'layout': layout,
+              'meta': meta, 'records': records}
+    with open(path, 'wb') as f:
+        f.write(dumps(bundle))
+
+
+def read_bundles(paths: List[str]) -> Tuple[Dict, Dict, Dict[str, Dict]]:
+    """
+    读取并检查一组结果包
+
+    Returns:
+        (layout, meta, records)：所有文件的分类、运行参数和所有文件的结果
+
+    Raises:
+        ShardError: 结果包无法读取、分片不完整或重复、各分片的分类或参数不一致
+    """
+    layout: Optional[Dict] = None
+    meta: Optional[Dict] = None
+    count = None
+    seen = {}
+    records: Dict[str, Dict] = {}
+    for path in paths:
+        try:
+            with open(path, 'rb') as f:
+                bundle = loads(f.read())
+        except (OSError, SerializationError) as e:
+            raise ShardError(f"无法读取结果包 {path}: {e}") from e
+        if not isinstance(bundle, dict) or bundle.get('version') != BUNDLE_VERSION:
+            raise ShardError(f"结果包版本不符，请用当前版本重新生成: {path}")
+
+        index, bundle_count = bundle['shard']
+        if layout is None:
+            layout, meta, count = bundle['layout'], bundle['meta'], bundle_count
+        elif bundle_count != count:
+            raise ShardError(f"分片数不一致: {path} 为 {index}/{bundle_count}，之前的结果包为 ?/{count}")
+        elif bundle['layout'] != layout:
+            raise ShardError(f"文件分类与其他结果包不一致（输入文件不同？）: {path}")
+        elif bundle['meta'] != meta:
+            raise ShardError(f"运行参数与其他结果包不一致: {path}")
+        if index in seen:
+            raise ShardError(f"分片 {index}/{count} 重复: {seen[index]} 和 {path}")
+        seen[index] = path
+        records.update(bundle['records'])
+
+    if layout is None:
+        raise ShardError("没有结果包")
+    missing = [str(index) for index in range(1, count + 1) if index not in seen]
+    if missing:
+        raise ShardError(f"缺少分片: {', '.join(f'{index}/{count}' for index in missing)}")
+    return layout, meta, records
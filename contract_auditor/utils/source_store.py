@@ -0,0 +1,107 @@
+"""源码存储
+
+源码按需从内存映射中读取，进程之间只传递 SourceHandle（路径、偏移、长度），
+不通过管道复制文件内容：
+- 磁盘上的文件直接 mmap，各进程映射同一个文件，共享操作系统的页缓存
+- 不在磁盘上的源码（如编辑器中未保存的内容）放入 multiprocessing.shared_memory 块，
+  工作进程按块名挂载
+
+读取时才解码为 str，并与 open(..., 'r') 一样把 \\r\\n 和 \\r 转换为 \\n，
+因此得到的文本（以及解析结果中的偏移和行号）与直接读取文件相同。
+"""
+
+import mmap
+import os
+from dataclasses import dataclass
+from multiprocessing import shared_memory
+from typing import Dict, List, Optional, Union
+
+
+@dataclass(frozen=True)
+class SourceHandle:
+    """源码的位置（可以发送给其他进程）"""
+    path: str  # 文件路径（也是 AST 中的 file_path）
+    offset: int = 0  # 字节偏移
+    length: int = 0  # 字节长度
+    block: Optional[str] = None  # 共享内存块名；None 表示映射文件 path 本身
+
+
+class SourceStore:
+    """源码存储（每个进程一个；映射在首次读取时建立，close() 时释放）"""
+
+    def __init__(self):
+        self._maps: Dict[str, mmap.mmap] = {}
+        self._blocks: Dict[str, shared_memory.SharedMemory] = {}
+        self._owned: List[shared_memory.SharedMemory] = []  # 本进程创建、需要释放的共享内存块
+
+    def add_file(self, path: str) -> SourceHandle:
+        """登记磁盘上的文件（不读取内容）"""
+        return SourceHandle(path=path, offset=0, length=os.path.getsize(path))
+
+    def add_text(self, path: str, text: str) -> SourceHandle:
+        """把不在磁盘上的源码放入共享内存块"""
+        data = text.encode('utf-8')
+        block = shared_memory.SharedMemory(create=True, size=max(len(data), 1))
+        block.buf[:len(data)] = data
+        self._owned.append(block)
+        self._blocks[block.name] = block
+        return SourceHandle(path=path, offset=0, length=len(data), block=block.name)
+
+    def release(self, handle: SourceHandle):
+        """释放 add_text 创建的共享内存块（之后不能再读取该源码；映射的文件不受影响）"""
+        block = self._blocks.pop(handle.block, None) if handle.block is not None else None
+        if block is None:
+            return
+        block.close()
+        if block in self._owned:
+            self._owned.remove(block)
+            block.unlink()
+
+    def read(self, source: Union[SourceHandle, str]) -> str:
+        """
+        读取源码
+
+        Args:
+            source: SourceHandle，或已经是文本的源码（原样返回）
+        """
+        if isinstance(source, str):
+            return source
+        if source.length == 0:
+            return ""
+        buffer = self._buffer(source)
+        with memoryview(buffer)[source.offset:source.offset + source.length] as view:
+            text = str(view, 'utf-8')
+        if '\r' in text:
+            text = text.replace('\r\n', '\n').replace('\r', '\n')
+        return text
+
+    def read_bytes(self, handle: SourceHandle) -> bytes:
+        """读取源码的原始字节（不解码，用于计算哈希和估计代价）"""
+        if handle.length == 0:
+            return b""
+        return bytes(self._buffer(handle)[handle.offset:handle.offset + handle.length])
+
+    def close(self):
+        """释放映射和本进程创建的共享内存块"""
+        for mapped in self._maps.values():
+            mapped.close()
+        self._maps.clear()
+        for block in self._blocks.values():
+            block.close()
+        for block in self._owned:
+            block.unlink()
+        self._blocks.clear()
+        self._owned.clear()
+
+    def _buffer(self, handle: SourceHandle):
+        if handle.block is not None:
+            block = self._blocks.get(handle.block)
+            if block is None:
+                block = self._blocks[handle.block] = shared_memory.SharedMemory(name=handle.block)
+            return block.buf
+
+        mapped = self._maps.get(handle.path)
+        if mapped is None:
+            with open(handle.path, 'rb') as f:
+                mapped = self._maps[handle.path] = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        return mapped
@@ -0,0 +1,7 @@
+// SPDX-License-Identifier: MIT
+pragma solidity ^0.8.20;
+
+interface IVault {
+    function deposit() external payable;
+    function withdraw(uint256 amount) external;
+}
@@ -0,0 +1,42 @@
+// SPDX-License-Identifier: MIT
+pragma solidity ^0.8.20;
+
+import "./IVault.sol";
+
+/// 编译产物示例：out/ 中是 forge build 生成的产物（含AST）
+contract Vault is IVault {
+    mapping(address => uint256) public balances;
+    address public owner;
+    uint256 public totalDeposits;
+
+    modifier onlyOwner() {
+        require(msg.sender == owner, "not owner");
+        _;
+    }
+
+    constructor() {
+        owner = msg.sender;
+    }
+
+    function deposit() external payable {
+        balances[msg.sender] += msg.value;
+        totalDeposits += msg.value;
+    }
+
+    // 漏洞: 先转账后修改余额（重入）
+    function withdraw(uint256 amount) external {
+        require(balances[msg.sender] >= amount, "insufficient");
+        (bool success, ) = msg.sender.call{value: amount}("");
+        require(success, "transfer failed");
+        balances[msg.sender] -= amount;
+        totalDeposits -= amount;
+    }
+
+    function execute(address target, bytes calldata data) external onlyOwner {
+        target.delegatecall(data);
+    }
+
+    receive() external payable {
+        balances[msg.sender] += msg.value;
+    }
+}
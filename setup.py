@@ -12,7 +12,7 @@ setup(
     author="tr3",
     long_description=long_description,
     long_description_content_type="text/markdown",
-    packages=find_packages(),
+    packages=find_packages(exclude=["benchmarks", "benchmarks.*"]),
     include_package_data=True,
     package_data={
         'contract_auditor': [
@@ -29,6 +29,7 @@ setup(
     entry_points={
         "console_scripts": [
             "contract-auditor=contract_auditor.main:main",
+            "contract-auditor-lsp=contract_auditor.lsp.server:main",
         ],
     },
     python_requires=">=3.11",